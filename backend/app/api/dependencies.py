@@ -3,7 +3,7 @@ from typing import Generator
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.core.security import get_current_user, get_current_active_user, get_current_active_superuser
 from app.models.user import User, UserRole
 
@@ -1,13 +1,17 @@
 
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, Path
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from sqlalchemy.orm import Session
 import uuid
 
 from app.api.dependencies import get_current_active_user, get_db
 from app.models.user import User
 from app.models.agent import AgentProfile
-from app.schemas.agent import AgentProfileCreate, AgentProfileResponse, AgentProfileUpdate
+from app.ml.model_loader import model_registry
+from app.ml.set_index import set_index_store, set_tokens
+from app.schemas.agent import (
+    AgentProfileCreate, AgentProfileResponse, AgentProfileUpdate, SimilarAgentResponse,
+)
 
 router = APIRouter()
 
@@ -23,6 +27,37 @@ async def get_agents(
     agents = db.query(AgentProfile).offset(skip).limit(limit).all()
     return agents
 
+@router.get("/coverage", response_model=List[SimilarAgentResponse])
+async def get_agents_by_coverage(
+    languages: Optional[List[str]] = Query(None),
+    regions: Optional[List[str]] = Query(None),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get the agents whose languages and regions of operation best cover the
+    given ones, scored by estimated Jaccard similarity
+    """
+    tokens = set_tokens({"languages": languages, "regions_of_operation": regions})
+    if not tokens:
+        raise HTTPException(status_code=400, detail="At least one language or region is required")
+    
+    matches = await model_registry.run_inference(
+        lambda: set_index_store.get(db, "agent_coverage").query(tokens, top_n=limit)
+    )
+    if not matches:
+        return []
+    
+    agents = db.query(AgentProfile).filter(
+        AgentProfile.id.in_([uuid.UUID(agent_id) for agent_id, _ in matches])
+    ).all()
+    by_id = {str(a.id): a for a in agents}
+    return [
+        {"agent": by_id[agent_id], "score": score}
+        for agent_id, score in matches
+        if agent_id in by_id
+    ]
+
 @router.get("/{agent_id}", response_model=AgentProfileResponse)
 async def get_agent(
     agent_id: uuid.UUID = Path(...),
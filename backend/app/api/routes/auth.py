@@ -1,10 +1,10 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
-from app.api.dependencies import get_db
+from app.api.dependencies import get_async_db
 from app.core.config import settings
 from app.core.security import create_access_token
 from app.crud.user import user as user_crud
@@ -15,12 +15,12 @@ router = APIRouter()
 
 @router.post("/login", response_model=Token)
 async def login_access_token(
-    db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+    db: AsyncSession = Depends(get_async_db), form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = user_crud.authenticate(
+    user = await user_crud.authenticate(
         db, email=form_data.username, password=form_data.password
     )
     if not user:
@@ -42,15 +42,15 @@ async def login_access_token(
     }
 
 @router.post("/register", response_model=User)
-async def register_user(user_in: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Register new user
     """
-    user = user_crud.get_by_email(db, email=user_in.email)
+    user = await user_crud.get_by_email(db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="The user with this email already exists in the system",
         )
-    user = user_crud.create(db, obj_in=user_in)
+    user = await user_crud.create(db, obj_in=user_in)
     return user
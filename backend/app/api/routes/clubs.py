@@ -1,27 +1,38 @@
 
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, Path
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
 from sqlalchemy.orm import Session
 import uuid
 
 from app.api.dependencies import get_current_active_user, get_db
+from app.db.pagination import keyset, page, set_next_cursor
 from app.models.user import User
 from app.models.club import ClubProfile
-from app.schemas.club import ClubProfileCreate, ClubProfileResponse, ClubProfileUpdate
+from app.models.player import PlayerProfile
+from app.ml.feature_store import feature_store
+from app.ml.model_loader import model_registry
+from app.ml.requirements import compiled_for
+from app.schemas.club import (
+    ClubCandidateResponse, ClubProfileCreate, ClubProfileResponse, ClubProfileUpdate,
+)
 
 router = APIRouter()
 
 @router.get("/", response_model=List[ClubProfileResponse])
 async def get_clubs(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db),
 ) -> Any:
     """
-    Get all club profiles
+    Get all club profiles, newest first
+    
+    The cursor of the next page, if any, is returned in the X-Next-Cursor header.
     """
-    clubs = db.query(ClubProfile).offset(skip).limit(limit).all()
-    return clubs
+    columns = (ClubProfile.created_at, ClubProfile.id)
+    clubs = keyset(db.query(ClubProfile), columns, cursor, limit).all()
+    return set_next_cursor(response, page(clubs, columns, limit))
 
 @router.get("/{club_id}", response_model=ClubProfileResponse)
 async def get_club(
@@ -36,6 +47,42 @@ async def get_club(
         raise HTTPException(status_code=404, detail="Club not found")
     return club
 
+@router.get("/{club_id}/candidates", response_model=List[ClubCandidateResponse])
+async def get_club_candidates(
+    club_id: uuid.UUID = Path(...),
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get the players satisfying a club's requirements and budget, ranked by fit
+    
+    The requirements are compiled into vectorized predicates over the player
+    feature matrix, see app/ml/requirements.py for the understood keys.
+    """
+    club = db.query(ClubProfile).filter(ClubProfile.id == club_id).first()
+    if not club:
+        raise HTTPException(status_code=404, detail="Club not found")
+    try:
+        compiled = compiled_for(club.requirements, club.budget)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    player_matrix = await model_registry.run_inference(feature_store.get, db)
+    rows, scores = await model_registry.run_inference(compiled.top_k, player_matrix, limit)
+    if len(rows) == 0:
+        return []
+    
+    player_ids = [player_matrix.ids[row] for row in rows]
+    players = db.query(PlayerProfile).filter(
+        PlayerProfile.id.in_([uuid.UUID(i) for i in player_ids])
+    ).all()
+    by_id = {str(p.id): p for p in players}
+    return [
+        {"player": by_id[i], "score": float(score)}
+        for i, score in zip(player_ids, scores)
+        if i in by_id
+    ]
+
 @router.post("/", response_model=ClubProfileResponse)
 async def create_club_profile(
     club_in: ClubProfileCreate,
@@ -1,13 +1,17 @@
 
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, Path
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from sqlalchemy.orm import Session
 import uuid
 
 from app.api.dependencies import get_current_active_user, get_db
 from app.models.user import User
 from app.models.coach import CoachProfile
-from app.schemas.coach import CoachProfileCreate, CoachProfileResponse, CoachProfileUpdate
+from app.ml.model_loader import model_registry
+from app.ml.set_index import set_index_store, set_tokens
+from app.schemas.coach import (
+    CoachProfileCreate, CoachProfileResponse, CoachProfileUpdate, SimilarCoachResponse,
+)
 
 router = APIRouter()
 
@@ -23,6 +27,37 @@ async def get_coaches(
     coaches = db.query(CoachProfile).offset(skip).limit(limit).all()
     return coaches
 
+@router.get("/credentials", response_model=List[SimilarCoachResponse])
+async def get_coaches_by_credentials(
+    certifications: Optional[List[str]] = Query(None),
+    formations: Optional[List[str]] = Query(None),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get the coaches whose certifications and preferred formations best match
+    the given ones, scored by estimated Jaccard similarity
+    """
+    tokens = set_tokens({"certifications": certifications, "preferred_formations": formations})
+    if not tokens:
+        raise HTTPException(status_code=400, detail="At least one certification or formation is required")
+    
+    matches = await model_registry.run_inference(
+        lambda: set_index_store.get(db, "coach_credentials").query(tokens, top_n=limit)
+    )
+    if not matches:
+        return []
+    
+    coaches = db.query(CoachProfile).filter(
+        CoachProfile.id.in_([uuid.UUID(coach_id) for coach_id, _ in matches])
+    ).all()
+    by_id = {str(c.id): c for c in coaches}
+    return [
+        {"coach": by_id[coach_id], "score": score}
+        for coach_id, score in matches
+        if coach_id in by_id
+    ]
+
 @router.get("/{coach_id}", response_model=CoachProfileResponse)
 async def get_coach(
     coach_id: uuid.UUID = Path(...),
@@ -1,94 +1,108 @@
 
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 import uuid
+import numpy as np
 
 from app.api.dependencies import get_current_active_user, get_db
+from app.core.config import settings
+from app.crud.match import match as match_crud
 from app.models.user import User, UserRole
+from app.ml.diversity import mmr_rerank, player_diversity_features
+from app.ml.feature_store import feature_store
+from app.ml.match_refresh import SUPPORTED_MATCH_TYPES, refresh_user_matches
 from app.ml.model_loader import model_registry
 from app.schemas.match import Match, MatchCreate, MatchList
 
 router = APIRouter()
 
+MATCH_TYPES = {
+    "players": UserRole.PLAYER,
+    "clubs": UserRole.CLUB,
+    "agents": UserRole.AGENT,
+    "coaches": UserRole.COACH,
+}
+
+def _stored_matches(db: Session, user_id: Any, match_type: str, skip: int, limit: int) -> dict:
+    matches = match_crud.get_top_for_user(
+        db, user_id=user_id, match_type=match_type, skip=skip, limit=limit
+    )
+    total = match_crud.count_for_user(db, user_id=user_id, match_type=match_type)
+    model_version = (matches[0].match_data or {}).get("model_version") if matches else None
+    return {"matches": matches, "total": total, "model_version": model_version}
+
+def _diversified_matches(db: Session, user_id: Any, match_type: str, skip: int, limit: int,
+                         diversity: float) -> dict:
+    """
+    _stored_matches re-ranked by maximal marginal relevance over every stored match
+    """
+    result = _stored_matches(db, user_id, match_type, 0, max(settings.MATCH_TOP_K, skip + limit))
+    matches = result["matches"]
+    if not matches:
+        return result
+    
+    player_matrix = feature_store.get(db)
+    vectors, categories = player_diversity_features(
+        player_matrix, [(m.match_data or {}).get("player_id") for m in matches]
+    )
+    picked = mmr_rerank(
+        np.array([m.score for m in matches]), skip + limit, diversity, vectors, categories
+    )
+    result["matches"] = [matches[i] for i in picked[skip:]]
+    return result
+
 @router.get("/", response_model=MatchList)
 async def get_matches(
+    background_tasks: BackgroundTasks,
     match_type: str = Query(..., description="Type of matches to retrieve: players, clubs, agents, coaches"),
     skip: int = 0,
     limit: int = 20,
+    diversity: float = Query(0.0, ge=0.0, le=1.0, description="Weight of diversity against match score"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ) -> Any:
     """
     Get AI-powered matches for the current user based on their profile and preferences.
-    """
-    # Get user profile and extract features
-    user_features = {}
-    
-    # Fill user_features based on user role and profile data
-    if current_user.role == UserRole.PLAYER:
-        # Extract player features from profile
-        pass
-    elif current_user.role == UserRole.CLUB:
-        # Extract club features from profile
-        pass
-    elif current_user.role == UserRole.AGENT:
-        # Extract agent features from profile
-        pass
-    elif current_user.role == UserRole.COACH:
-        # Extract coach features from profile
-        pass
     
-    # Get role to match with
-    target_role = None
-    if match_type == "players":
-        target_role = UserRole.PLAYER
-    elif match_type == "clubs":
-        target_role = UserRole.CLUB
-    elif match_type == "agents":
-        target_role = UserRole.AGENT
-    elif match_type == "coaches":
-        target_role = UserRole.COACH
-    else:
+    Matches are precomputed into the matches table by a background job, so this
+    is an indexed read whose cost does not depend on the size of the user pool.
+    With `diversity` > 0 the stored matches are re-ranked so that near-identical
+    players (same position, age, nationality) do not crowd the top results.
+    """
+    if match_type not in MATCH_TYPES:
         raise HTTPException(status_code=400, detail="Invalid match type")
     
-    # Get target users
-    target_users = db.query(User).filter(User.role == target_role).all()
-    
-    # Get feature vectors for each target user
-    target_features = []
-    for target_user in target_users:
-        # Extract features based on user role and profile
-        target_feature = {}
-        # Fill target_feature
-        target_features.append(target_feature)
-    
-    # Use the ML model to find matches
-    # This is a placeholder - in a real implementation you'd use the model_registry
-    # to get predictions based on the features
-    matches = [
-        Match(
-            id=uuid.uuid4(),
-            user_id=current_user.id,
-            target_id=target_user.id,
-            score=0.85,  # placeholder score
-            match_data={}
+    if diversity > 0:
+        result = await model_registry.run_inference(
+            _diversified_matches, db, current_user.id, match_type, skip, limit, diversity
         )
-        for target_user in target_users[:limit]
-    ]
+    else:
+        result = _stored_matches(db, current_user.id, match_type, skip, limit)
+    if result["total"] == 0 and match_type in SUPPORTED_MATCH_TYPES:
+        # Nothing computed yet for this user; fill it in for the next request
+        background_tasks.add_task(refresh_user_matches, current_user.id, match_type)
     
-    return {"matches": matches, "total": len(target_users)}
+    return result
 
 @router.post("/calculate", response_model=MatchList)
 async def calculate_matches(
+    background_tasks: BackgroundTasks,
     match_type: str = Query(..., description="Type of matches to calculate: players, clubs, agents, coaches"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ) -> Any:
     """
     Recalculate AI-powered matches for the current user.
+    
+    The refresh runs in the background; the currently stored matches are
+    returned until it completes. Only match types that the match jobs
+    compute are refreshed.
     """
-    # Similar to get_matches but forces a recalculation
-    # In a real implementation, you might update the database with new match data
+    if match_type not in MATCH_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid match type")
+    
+    if match_type in SUPPORTED_MATCH_TYPES:
+        background_tasks.add_task(refresh_user_matches, current_user.id, match_type)
     
-    return {"matches": [], "total": 0}
+    return _stored_matches(db, current_user.id, match_type, 0, 20)
@@ -1,11 +1,12 @@
 
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Path
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Path, Query, Response
 from sqlalchemy.orm import Session
 import uuid
 import json
 
 from app.api.dependencies import get_current_active_user, get_db
+from app.db.pagination import keyset, page, set_next_cursor
 from app.models.user import User
 from app.models.message import Message
 from app.schemas.message import MessageCreate, MessageResponse, ConversationResponse
@@ -48,20 +49,26 @@ async def get_conversations(
 
 @router.get("/{recipient_id}", response_model=List[MessageResponse])
 async def get_messages(
+    response: Response,
     recipient_id: uuid.UUID = Path(...),
-    skip: int = 0,
-    limit: int = 50,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous (newer) page"),
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ) -> Any:
     """
     Get messages between current user and recipient
+    
+    Pages go back in time from the newest message; the cursor of the next
+    (older) page, if any, is returned in the X-Next-Cursor header.
     """
     # Get the messages
-    messages = db.query(Message).filter(
+    query = db.query(Message).filter(
         ((Message.sender_id == current_user.id) & (Message.receiver_id == recipient_id)) |
         ((Message.sender_id == recipient_id) & (Message.receiver_id == current_user.id))
-    ).order_by(Message.created_at.desc()).offset(skip).limit(limit).all()
+    )
+    columns = (Message.created_at, Message.id)
+    messages = set_next_cursor(response, page(keyset(query, columns, cursor, limit).all(), columns, limit))
     
     # Mark unread messages as read
     db.query(Message).filter(
@@ -0,0 +1,49 @@
+
+from typing import Any, Dict
+from fastapi import APIRouter, BackgroundTasks, Depends, Query
+
+from app.api.dependencies import get_current_active_superuser
+from app.models.user import User
+from app.ml.model_loader import model_registry
+from app.ml.result_cache import result_cache
+
+router = APIRouter()
+
+@router.get("/")
+async def get_model_versions(
+    current_user: User = Depends(get_current_active_superuser),
+) -> Dict[str, Any]:
+    """
+    Get the versions of the active ML models.
+    This is only accessible by superusers.
+    """
+    return {
+        "versions": model_registry.model_versions(),
+        "cache": result_cache.snapshot(),
+        "inference": model_registry.inference_executor().snapshot(),
+        "batching": model_registry.match_batcher().snapshot(),
+    }
+
+@router.post("/reload", status_code=202)
+async def reload_models(
+    background_tasks: BackgroundTasks,
+    force: bool = Query(False, description="Reload even if no model file changed"),
+    current_user: User = Depends(get_current_active_superuser),
+) -> Dict[str, Any]:
+    """
+    Load the latest model files in the background and swap them in atomically.
+    Requests keep being served by the current models until the swap.
+    """
+    background_tasks.add_task(model_registry.reload, force=force)
+    return {"status": "reloading", "versions": model_registry.model_versions()}
+
+@router.post("/cache/clear")
+async def clear_match_cache(
+    current_user: User = Depends(get_current_active_superuser),
+) -> Dict[str, Any]:
+    """
+    Invalidate every cached match result.
+    This is only accessible by superusers.
+    """
+    result_cache.invalidate()
+    return {"cache": result_cache.snapshot()}
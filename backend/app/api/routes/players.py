@@ -1,57 +1,201 @@
 
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, Path, Query
-from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Path, Query, Response, UploadFile
+from sqlalchemy.orm import Session, raiseload, selectinload
+from starlette.concurrency import run_in_threadpool
+import io
 import uuid
 
-from app.api.dependencies import get_current_active_user, get_db
+from app.api.dependencies import get_current_active_superuser, get_current_active_user, get_db
+from app.core.config import settings
+from app.db.pagination import keyset, page, set_next_cursor
+from app.db.player_import import IMPORT_FORMATS, import_format, import_players
 from app.models.user import User
 from app.models.player import PlayerProfile
-from app.schemas.player import PlayerProfileCreate, PlayerProfileResponse, PlayerProfileUpdate
+from app.models.profile import Profile
+from app.ml.feature_store import feature_store, player_features
+from app.ml.model_loader import model_registry
+from app.ml.set_index import set_index_store, set_tokens
+from app.schemas.player import (
+    PlayerImportReport, PlayerProfileCreate, PlayerProfileExpandedResponse, PlayerProfileResponse,
+    PlayerProfileUpdate, SimilarPlayerResponse,
+)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[PlayerProfileResponse])
-async def get_players(
-    skip: int = 0,
-    limit: int = 100,
-    position: Optional[str] = None,
-    age_min: Optional[int] = None,
-    age_max: Optional[int] = None,
-    db: Session = Depends(get_db),
-) -> Any:
-    """
-    Get all player profiles with optional filtering
+# Sort key of the keyset pages of GET /api/players
+PLAYER_PAGE_KEY = (PlayerProfile.created_at, PlayerProfile.id)
+
+# Related rows a player response can include with ?expand=
+PLAYER_EXPANSIONS = {
+    "experiences": PlayerProfile.experiences,
+    "highlights": PlayerProfile.highlights,
+}
+
+def _expansion(expand: Optional[str]) -> Tuple[List[str], list]:
     """
-    query = db.query(PlayerProfile)
+    Parse ?expand= into the requested relationships and their loader options
     
-    # Apply filters if provided
+    Requested relationships are loaded with one SELECT ... IN per relationship
+    for the whole page; the others raise if touched, so a serializer can
+    never fall back to one lazy query per player.
+    
+    Raises:
+        HTTPException: 400 if a name is not in PLAYER_EXPANSIONS
+    """
+    names = [name.strip() for name in (expand or "").split(",") if name.strip()]
+    unknown = [name for name in names if name not in PLAYER_EXPANSIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown expand field: {', '.join(unknown)}; allowed: {', '.join(PLAYER_EXPANSIONS)}",
+        )
+    options = [
+        selectinload(relationship) if name in names else raiseload(relationship)
+        for name, relationship in PLAYER_EXPANSIONS.items()
+    ]
+    return names, options
+
+def _expanded(player: PlayerProfile, names: List[str]) -> Dict[str, Any]:
+    """Response fields of a player plus the requested related rows"""
+    fields = {column.key: getattr(player, column.key) for column in PlayerProfile.__table__.columns}
+    fields.update({name: getattr(player, name) for name in names})
+    return fields
+
+def players_page_query(query: Any, cursor: Optional[str], limit: int, position: Optional[str] = None,
+                       age_min: Optional[int] = None, age_max: Optional[int] = None) -> Any:
+    """One keyset page of GET /api/players, newest first, with its optional filters"""
     if position:
         query = query.filter(PlayerProfile.position == position)
     if age_min is not None:
         query = query.filter(PlayerProfile.age >= age_min)
     if age_max is not None:
         query = query.filter(PlayerProfile.age <= age_max)
+    return keyset(query, PLAYER_PAGE_KEY, cursor, limit)
+
+@router.get("/", response_model=List[PlayerProfileExpandedResponse], response_model_exclude_unset=True)
+async def get_players(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=500),
+    position: Optional[str] = None,
+    age_min: Optional[int] = None,
+    age_max: Optional[int] = None,
+    expand: Optional[str] = Query(None, description="Related rows to include: experiences,highlights"),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get all player profiles with optional filtering, newest first
     
-    players = query.offset(skip).limit(limit).all()
-    return players
+    The cursor of the next page, if any, is returned in the X-Next-Cursor header.
+    """
+    names, options = _expansion(expand)
+    query = players_page_query(db.query(PlayerProfile).options(*options), cursor, limit, position, age_min, age_max)
+    players = set_next_cursor(response, page(query.all(), PLAYER_PAGE_KEY, limit))
+    return [_expanded(player, names) for player in players]
 
-@router.get("/{player_id}", response_model=PlayerProfileResponse)
+@router.get("/{player_id}", response_model=PlayerProfileExpandedResponse, response_model_exclude_unset=True)
 async def get_player(
     player_id: uuid.UUID = Path(...),
+    expand: Optional[str] = Query(None, description="Related rows to include: experiences,highlights"),
     db: Session = Depends(get_db),
 ) -> Any:
     """
     Get a specific player profile
     """
+    names, options = _expansion(expand)
+    player = db.query(PlayerProfile).options(*options).filter(PlayerProfile.id == player_id).first()
+    if not player:
+        raise HTTPException(status_code=404, detail="Player not found")
+    return _expanded(player, names)
+
+@router.get("/{player_id}/similar", response_model=List[SimilarPlayerResponse])
+async def get_similar_players(
+    player_id: uuid.UUID = Path(...),
+    limit: int = Query(10, ge=1, le=100),
+    position: Optional[List[str]] = Query(None),
+    age_min: Optional[int] = None,
+    age_max: Optional[int] = None,
+    preferred_foot: Optional[str] = None,
+    nationality: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get the players most similar to a player, optionally filtered by
+    position, age band, preferred foot and nationality
+    
+    Filters are applied before the top results are picked, so every
+    returned player matches them.
+    """
+    player_matrix = await model_registry.run_inference(feature_store.get, db)
+    features = player_matrix.features_for(player_id)
+    if features is None:
+        raise HTTPException(status_code=404, detail="Player not found")
+    
+    filters = {
+        "position": position,
+        "age_min": age_min,
+        "age_max": age_max,
+        "preferred_foot": preferred_foot,
+        "nationality": nationality,
+    }
+    # One extra result so dropping the player itself still leaves `limit`
+    matches = await model_registry.afind_matches(
+        features, model_name='similarity', top_n=limit + 1,
+        filters=filters, attributes=player_matrix,
+    )
+    scores = {
+        m["id"]: m["score"] for m in matches
+        if m["id"] != str(player_id) and m["id"] in player_matrix.row_of
+    }
+    if not scores:
+        return []
+    
+    players = db.query(PlayerProfile).filter(
+        PlayerProfile.id.in_([uuid.UUID(i) for i in scores])
+    ).all()
+    by_id = {str(p.id): p for p in players}
+    return [
+        {"player": by_id[i], "score": score}
+        for i, score in scores.items()
+        if i in by_id
+    ][:limit]
+
+@router.get("/{player_id}/similar-skills", response_model=List[SimilarPlayerResponse])
+async def get_players_with_similar_skills(
+    player_id: uuid.UUID = Path(...),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get the players whose skill sets are most like a player's, scored by
+    estimated Jaccard similarity
+    """
     player = db.query(PlayerProfile).filter(PlayerProfile.id == player_id).first()
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
-    return player
+    
+    tokens = set_tokens({"skills": player.skills})
+    matches = await model_registry.run_inference(
+        lambda: set_index_store.get(db, "player_skills").query(tokens, top_n=limit, exclude=str(player_id))
+    )
+    if not matches:
+        return []
+    
+    players = db.query(PlayerProfile).filter(
+        PlayerProfile.id.in_([uuid.UUID(i) for i, _ in matches])
+    ).all()
+    by_id = {str(p.id): p for p in players}
+    return [
+        {"player": by_id[i], "score": score}
+        for i, score in matches
+        if i in by_id
+    ]
 
 @router.post("/", response_model=PlayerProfileResponse)
 async def create_player_profile(
     player_in: PlayerProfileCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ) -> Any:
@@ -69,14 +213,56 @@ async def create_player_profile(
             detail="User already has a player profile"
         )
     
-    # Create new profile
-    # This is a simplified version, in real application you would create a Profile first
-    # if it doesn't exist, then create the PlayerProfile
+    profile = db.query(Profile).filter(Profile.id == player_in.profile_id).first()
+    if not profile or profile.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="The user doesn't have enough privileges")
+    
+    player = PlayerProfile(**player_in.dict())
+    db.add(player)
+    db.commit()
+    db.refresh(player)
     
-    return {}
+    # Similar-player lookups and filters read the feature store, not the index
+    feature_store.invalidate()
+    # Make the new player matchable without rebuilding the index
+    background_tasks.add_task(model_registry.upsert_vector, str(player.id), player_features(player))
+    
+    return player
+
+@router.post("/import", response_model=PlayerImportReport)
+async def bulk_import_players(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or jsonl, defaults to the file extension"),
+    current_user: User = Depends(get_current_active_superuser),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Bulk import player profiles and their experiences from CSV or JSONL
+    
+    Rows are validated and loaded in batches through COPY; invalid rows,
+    including rows that are not valid UTF-8, are reported by line and
+    skipped. Each committed batch is written to the similarity index in one
+    update, which also drops the cached match results. Only accessible by
+    superusers.
+    """
+    fmt = format or import_format(file.filename)
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported import format, expected csv or jsonl")
+    
+    def index_batch(merged: List[Tuple[uuid.UUID, Any]]):
+        model_registry.upsert_vectors({str(player_id): player_features(row) for player_id, row in merged})
+    
+    # The upload is spooled to disk, so the import reads it as a stream
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="surrogateescape", newline="")
+    return await run_in_threadpool(
+        import_players, db, stream, fmt,
+        batch_size=settings.PLAYER_IMPORT_BATCH_SIZE, max_errors=settings.PLAYER_IMPORT_MAX_ERRORS,
+        on_merged=index_batch,
+    )
 
 @router.put("/{player_id}", response_model=PlayerProfileResponse)
 async def update_player_profile(
+    background_tasks: BackgroundTasks,
     player_id: uuid.UUID = Path(...),
     player_in: PlayerProfileUpdate = None,
     current_user: User = Depends(get_current_active_user),
@@ -85,6 +271,22 @@ async def update_player_profile(
     """
     Update a player profile
     """
-    # In a real implementation, check if the user owns this profile
+    player = db.query(PlayerProfile).filter(PlayerProfile.id == player_id).first()
+    if not player:
+        raise HTTPException(status_code=404, detail="Player not found")
+    if (player.profile is None or player.profile.user_id != current_user.id) and not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="The user doesn't have enough privileges")
+    
+    update_data = player_in.dict(exclude_unset=True) if player_in else {}
+    for field, value in update_data.items():
+        setattr(player, field, value)
+    db.add(player)
+    db.commit()
+    db.refresh(player)
     
-    return {}
+    # Filters must judge the player on the new position and age
+    feature_store.invalidate()
+    # Replace the player's vector in the matching index
+    background_tasks.add_task(model_registry.upsert_vector, str(player.id), player_features(player))
+    
+    return player
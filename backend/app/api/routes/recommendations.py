@@ -5,53 +5,86 @@ from sqlalchemy.orm import Session
 import uuid
 
 from app.api.dependencies import get_current_active_user, get_db
+from app.core.config import settings
 from app.models.user import User, UserRole
+from app.ml.diversity import details_diversity_features, mmr_rerank
+from app.ml.feature_store import details_features
 from app.ml.model_loader import model_registry
 from app.schemas.recommendation import RecommendationResponse, RecommendationItem
 from app.db.supabase_client import get_supabase_client
 
 router = APIRouter()
 
+RECOMMENDATION_TYPES = ["players", "clubs", "agents", "coaches"]
+
 @router.get("/", response_model=RecommendationResponse)
 async def get_recommendations(
     recommendation_type: str = Query(..., description="Type of recommendations: players, clubs, agents, coaches"),
-    skip: int = 0,
-    limit: int = 20,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1),
+    diversity: float = Query(0.0, ge=0.0, le=1.0, description="Weight of diversity against match score"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
     supabase = Depends(get_supabase_client),
 ) -> Any:
     """
     Get AI-powered recommendations for the current user
+    
+    A window of RECOMMENDATION_WINDOW candidates is fetched and scored
+    against the user with one batched similarity model call, and the best
+    `limit` after `skip` are returned. With `diversity` > 0 the scored
+    candidates are re-ranked by maximal marginal relevance. Pages must lie
+    within the window, which bounds the work of every request.
     """
-    if recommendation_type not in ["players", "clubs", "agents", "coaches"]:
+    if recommendation_type not in RECOMMENDATION_TYPES:
         raise HTTPException(status_code=400, detail="Invalid recommendation type")
+    if skip + limit > settings.RECOMMENDATION_WINDOW:
+        raise HTTPException(
+            status_code=400,
+            detail=f"skip + limit must not exceed {settings.RECOMMENDATION_WINDOW}",
+        )
     
-    # Get user profile and type
-    user_profile = supabase.table("profiles").select("*").eq("id", str(current_user.id)).execute()
+    # Get user profile and type, with the details of every type in the same round-trip
+    user_profile = supabase.table("profiles").select(
+        "*, " + ", ".join(f"{name[:-1]}_details(*)" for name in RECOMMENDATION_TYPES)
+    ).eq("id", str(current_user.id)).execute()
     
     if len(user_profile.data) == 0:
         raise HTTPException(status_code=404, detail="User profile not found")
     
     user_type = user_profile.data[0]["user_type"]
+    user_features = details_features(user_profile.data[0].get(f"{user_type}_details"))
     
     # Determine the corresponding details table based on recommendation_type
     details_table = f"{recommendation_type[:-1]}_details"  # e.g., "player_details" for "players"
     
-    # Get recommendations from Supabase
+    # Over-fetch a window of candidates so the top results are the best-scoring
+    # ones of the window rather than the first rows Supabase returns
     recommended_profiles = supabase.table("profiles").select(
         "*, " + details_table + "(*)"
-    ).eq("user_type", recommendation_type[:-1]).neq("id", str(current_user.id)).limit(limit).execute()
+    ).eq("user_type", recommendation_type[:-1]).neq("id", str(current_user.id)).limit(
+        settings.RECOMMENDATION_WINDOW
+    ).execute()
+    candidates = recommended_profiles.data
+    
+    candidate_features = [details_features(profile.get(details_table)) for profile in candidates]
+    scores = await model_registry.ascore_candidates(user_features, candidate_features, model_name='similarity')
+    if diversity > 0:
+        vectors, categories = details_diversity_features(
+            [profile.get(details_table) for profile in candidates]
+        )
+        ranked = mmr_rerank(scores, skip + limit, diversity, vectors, categories).tolist()
+    else:
+        ranked = sorted(range(len(scores)), key=lambda i: -scores[i])
     
     # Convert to RecommendationItem objects
     items = []
-    for profile in recommended_profiles.data:
-        # Calculate a simple recommendation score (in a real app, this would be more sophisticated)
-        # In a complete implementation, you would use the ML models here
-        score = 0.85  # placeholder score
+    for i in ranked[skip:skip + limit]:
+        profile = candidates[i]
+        score = float(scores[i])
         
         # Create metadata object based on user type
-        metadata = profile.get(f"{recommendation_type[:-1]}_details", {})
+        metadata = profile.get(details_table, {})
         if metadata is None:
             metadata = {}
             
@@ -67,5 +100,6 @@ async def get_recommendations(
     
     return {
         "items": items,
-        "total": len(items)
+        "total": len(candidates),
+        "model_version": model_registry.get_model_version('similarity'),
     }
@@ -1,19 +1,20 @@
 
-from typing import Any, List
-from fastapi import APIRouter, Body, Depends, HTTPException, Path
+from typing import Any, List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, Response
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
 
-from app.api.dependencies import get_current_active_superuser, get_current_active_user, get_db
+from app.api.dependencies import get_async_db, get_current_active_superuser, get_current_active_user
 from app.crud.user import user as user_crud
+from app.db.pagination import set_next_cursor
 from app.models.user import User
 from app.schemas.user import User as UserSchema, UserCreate, UserUpdate
 
 router = APIRouter()
 
 @router.get("/me", response_model=UserSchema)
-def read_user_me(
+async def read_user_me(
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     """
@@ -22,28 +23,28 @@ def read_user_me(
     return current_user
 
 @router.put("/me", response_model=UserSchema)
-def update_user_me(
+async def update_user_me(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_in: UserUpdate,
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     """
     Update own user
     """
-    user = user_crud.update(db, db_obj=current_user, obj_in=user_in)
+    user = await user_crud.update(db, db_obj=current_user, obj_in=user_in)
     return user
 
 @router.get("/{user_id}", response_model=UserSchema)
-def read_user_by_id(
+async def read_user_by_id(
     user_id: uuid.UUID = Path(...),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Any:
     """
     Get a specific user by id
     """
-    user = user_crud.get(db, id=user_id)
+    user = await user_crud.get(db, id=user_id)
     if user == current_user or current_user.is_superuser:
         return user
     raise HTTPException(
@@ -51,41 +52,43 @@ def read_user_by_id(
     )
 
 @router.get("/", response_model=List[UserSchema])
-def read_users(
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
+async def read_users(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=500),
     current_user: User = Depends(get_current_active_superuser),
 ) -> Any:
     """
-    Retrieve users - only for superusers
+    Retrieve users, newest first - only for superusers
+    
+    The cursor of the next page, if any, is returned in the X-Next-Cursor header.
     """
-    users = user_crud.get_multi(db, skip=skip, limit=limit)
-    return users
+    return set_next_cursor(response, await user_crud.get_page(db, cursor=cursor, limit=limit))
 
 @router.post("/", response_model=UserSchema)
-def create_user(
+async def create_user(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_in: UserCreate,
     current_user: User = Depends(get_current_active_superuser),
 ) -> Any:
     """
     Create new user - only for superusers
     """
-    user = user_crud.get_by_email(db, email=user_in.email)
+    user = await user_crud.get_by_email(db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system",
         )
-    user = user_crud.create(db, obj_in=user_in)
+    user = await user_crud.create(db, obj_in=user_in)
     return user
 
 @router.put("/{user_id}", response_model=UserSchema)
-def update_user(
+async def update_user(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: uuid.UUID = Path(...),
     user_in: UserUpdate,
     current_user: User = Depends(get_current_active_superuser),
@@ -93,11 +96,11 @@ def update_user(
     """
     Update a user - only for superusers
     """
-    user = user_crud.get(db, id=user_id)
+    user = await user_crud.get(db, id=user_id)
     if not user:
         raise HTTPException(
             status_code=404,
             detail="The user with this ID does not exist in the system",
         )
-    user = user_crud.update(db, db_obj=user, obj_in=user_in)
+    user = await user_crud.update(db, db_obj=user, obj_in=user_in)
     return user
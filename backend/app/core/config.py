@@ -1,7 +1,9 @@
 
 import os
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
-from typing import List
+from sqlalchemy.engine import make_url
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # API Settings
@@ -28,6 +30,11 @@ class Settings(BaseSettings):
         "DATABASE_URL", 
         "postgresql://postgres:postgres@db:5432/scout_ai_match"
     )
+    # asyncpg URL of the same database for AsyncSession, and its pool size.
+    # Unless set, derived from the resolved DATABASE_URL (see below)
+    ASYNC_DATABASE_URL: Optional[str] = os.getenv("ASYNC_DATABASE_URL")
+    ASYNC_DB_POOL_SIZE: int = int(os.getenv("ASYNC_DB_POOL_SIZE", 20))
+    ASYNC_DB_MAX_OVERFLOW: int = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 10))
     
     # Redis
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
@@ -36,6 +43,85 @@ class Settings(BaseSettings):
     # ML Model paths
     KNN_MODEL_PATH: str = os.getenv("KNN_MODEL_PATH", "app/ml/models/knn_model.pkl")
     SIMILARITY_MODEL_PATH: str = os.getenv("SIMILARITY_MODEL_PATH", "app/ml/models/similarity_model.pkl")
+    # Memory-mapped model artifacts (see app/ml/artifacts.py), preferred over the pickles
+    MODEL_ARTIFACT_DIR: str = os.getenv("MODEL_ARTIFACT_DIR", "app/ml/models")
+    # Previous artifact versions kept on disk besides the current one
+    MODEL_ARTIFACT_KEEP_VERSIONS: int = int(os.getenv("MODEL_ARTIFACT_KEEP_VERSIONS", 2))
+    # Seconds between checks for new model files, 0 disables hot reload
+    MODEL_RELOAD_INTERVAL: int = int(os.getenv("MODEL_RELOAD_INTERVAL", 30))
+    
+    # Player feature store: seconds before the cached matrix is rebuilt, and
+    # rows fetched per round-trip while streaming it from the database
+    FEATURE_STORE_TTL: int = int(os.getenv("FEATURE_STORE_TTL", 600))
+    FEATURE_STORE_BATCH_SIZE: int = int(os.getenv("FEATURE_STORE_BATCH_SIZE", 5000))
+    
+    # Materialized matches: results kept per user and seconds between full
+    # recomputations (0 disables the background job)
+    MATCH_TOP_K: int = int(os.getenv("MATCH_TOP_K", 50))
+    MATCH_RECOMPUTE_INTERVAL: int = int(os.getenv("MATCH_RECOMPUTE_INTERVAL", 3600))
+    
+    # Incremental index updates: seconds between compactions and the number
+    # of pending updates that makes a compaction worthwhile
+    INDEX_COMPACTION_INTERVAL: int = int(os.getenv("INDEX_COMPACTION_INTERVAL", 300))
+    INDEX_COMPACTION_MIN_CHANGES: int = int(os.getenv("INDEX_COMPACTION_MIN_CHANGES", 100))
+    
+    # Nearest neighbour backend for the KNN model: sklearn, exact or ivf
+    KNN_BACKEND: str = os.getenv("KNN_BACKEND", "sklearn")
+    ANN_INDEX_PATH: str = os.getenv("ANN_INDEX_PATH", "app/ml/models/knn_ivf_index.npz")
+    ANN_N_LISTS: int = int(os.getenv("ANN_N_LISTS", 1024))
+    ANN_N_PROBE: int = int(os.getenv("ANN_N_PROBE", 16))
+    
+    # ML batch matching
+    ML_BATCH_CHUNK_SIZE: int = int(os.getenv("ML_BATCH_CHUNK_SIZE", 1024))
+    
+    # Sharded scoring: worker processes for similarity searches (0 scores
+    # inline) and the index size below which searches stay inline
+    SCORING_WORKERS: int = int(os.getenv("SCORING_WORKERS", 0))
+    SCORING_POOL_MIN_ROWS: int = int(os.getenv("SCORING_POOL_MIN_ROWS", 200_000))
+    
+    # Inference executor for async route handlers: calls running at once,
+    # calls allowed to wait, and the Retry-After seconds of rejected requests
+    INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", 4))
+    INFERENCE_QUEUE_DEPTH: int = int(os.getenv("INFERENCE_QUEUE_DEPTH", 32))
+    INFERENCE_RETRY_AFTER: int = int(os.getenv("INFERENCE_RETRY_AFTER", 1))
+    
+    # Micro-batching of concurrent single-user match queries: longest wait
+    # for a batch to fill and the size that flushes it (1 disables batching)
+    MATCH_BATCH_MAX_WAIT_MS: float = float(os.getenv("MATCH_BATCH_MAX_WAIT_MS", 2))
+    MATCH_BATCH_MAX_ITEMS: int = int(os.getenv("MATCH_BATCH_MAX_ITEMS", 64))
+    
+    # find_matches result cache: in-process entries (0 disables), seconds an
+    # entry lives, whether to share results through Redis, and seconds
+    # between reads of other workers' invalidations from Redis
+    MATCH_CACHE_SIZE: int = int(os.getenv("MATCH_CACHE_SIZE", 10000))
+    MATCH_CACHE_TTL: int = int(os.getenv("MATCH_CACHE_TTL", 300))
+    MATCH_CACHE_REDIS: bool = os.getenv("MATCH_CACHE_REDIS", "false").lower() == "true"
+    MATCH_CACHE_SYNC_INTERVAL: float = float(os.getenv("MATCH_CACHE_SYNC_INTERVAL", 1))
+    
+    # Recommendations: candidates fetched, scored and re-ranked per request
+    RECOMMENDATION_WINDOW: int = int(os.getenv("RECOMMENDATION_WINDOW", 200))
+    
+    # MinHash/LSH set indexes: permutations, LSH bands and seconds before a
+    # persisted index is rebuilt from the database
+    MINHASH_NUM_PERM: int = int(os.getenv("MINHASH_NUM_PERM", 128))
+    MINHASH_BANDS: int = int(os.getenv("MINHASH_BANDS", 32))
+    SET_INDEX_TTL: int = int(os.getenv("SET_INDEX_TTL", 3600))
+    
+    # Bulk player import: rows per COPY batch and transaction, and per-row
+    # errors kept in the report
+    PLAYER_IMPORT_BATCH_SIZE: int = int(os.getenv("PLAYER_IMPORT_BATCH_SIZE", 5000))
+    PLAYER_IMPORT_MAX_ERRORS: int = int(os.getenv("PLAYER_IMPORT_MAX_ERRORS", 1000))
+    
+    # Similarity index storage: float32, float16 or int8 (scalar-quantized)
+    VECTOR_STORAGE: str = os.getenv("VECTOR_STORAGE", "float32")
+    
+    @model_validator(mode="after")
+    def derive_async_database_url(self) -> "Settings":
+        # After validation, so a DATABASE_URL from .env is honoured too
+        if not self.ASYNC_DATABASE_URL:
+            url = make_url(self.DATABASE_URL).set(drivername="postgresql+asyncpg")
+            self.ASYNC_DATABASE_URL = url.render_as_string(hide_password=False)
+        return self
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,65 @@
+
+from typing import Any, Dict, List
+from sqlalchemy.orm import Session
+
+from app.crud.base import SyncCRUDBase
+from app.models.match import Match
+from app.schemas.match import MatchCreate
+
+class CRUDMatch(SyncCRUDBase[Match, MatchCreate, MatchCreate]):
+    """
+    Match reads and writes on a synchronous Session, since the match jobs
+    run in background threads.
+    """
+
+    def get_top_for_user(
+        self, db: Session, *, user_id: Any, match_type: str, skip: int = 0, limit: int = 20
+    ) -> List[Match]:
+        return (
+            db.query(Match)
+            .filter(Match.user_id == user_id, Match.match_type == match_type)
+            .order_by(Match.score.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def count_for_user(self, db: Session, *, user_id: Any, match_type: str) -> int:
+        return (
+            db.query(Match)
+            .filter(Match.user_id == user_id, Match.match_type == match_type)
+            .count()
+        )
+
+    def replace_for_user(
+        self, db: Session, *, user_id: Any, match_type: str, matches: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Replace a user's stored matches of one type in a single transaction
+        """
+        self.replace_for_users(db, match_type=match_type, matches={user_id: matches})
+
+    def replace_for_users(
+        self, db: Session, *, match_type: str, matches: Dict[Any, List[Dict[str, Any]]]
+    ) -> None:
+        """
+        Replace the stored matches of one type of many users in a single
+        transaction: one delete, one bulk insert and one commit per call
+
+        Args:
+            match_type: Type of the matches
+            matches: Dictionary of user id to that user's new match rows
+        """
+        if not matches:
+            return
+        db.query(Match).filter(
+            Match.user_id.in_(list(matches)), Match.match_type == match_type
+        ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(Match, [
+            dict(match, user_id=user_id, match_type=match_type)
+            for user_id, rows in matches.items()
+            for match in rows
+        ])
+        db.commit()
+
+match = CRUDMatch(Match)
@@ -1,6 +1,8 @@
 
 from typing import Any, Dict, Optional, Union, List
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from app.core.security import get_password_hash, verify_password
 from app.crud.base import CRUDBase
@@ -8,40 +10,43 @@ from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
-    def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
-        return db.query(User).filter(User.email == email).first()
+    async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        result = await db.execute(select(User).filter(User.email == email))
+        return result.scalars().first()
 
-    def create(self, db: Session, *, obj_in: UserCreate) -> User:
+    async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
+        # bcrypt is deliberately slow; hash off the event loop
+        hashed_password = await run_in_threadpool(get_password_hash, obj_in.password)
         db_obj = User(
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=hashed_password,
             full_name=obj_in.full_name,
             role=obj_in.role,
             is_superuser=obj_in.is_superuser if hasattr(obj_in, "is_superuser") else False,
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
-    def update(
-        self, db: Session, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]
+    async def update(
+        self, db: AsyncSession, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]
     ) -> User:
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
         if update_data.get("password"):
-            hashed_password = get_password_hash(update_data["password"])
+            hashed_password = await run_in_threadpool(get_password_hash, update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        return await super().update(db, db_obj=db_obj, obj_in=update_data)
 
-    def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
-        user = self.get_by_email(db, email=email)
+    async def authenticate(self, db: AsyncSession, *, email: str, password: str) -> Optional[User]:
+        user = await self.get_by_email(db, email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        if not await run_in_threadpool(verify_password, password, user.hashed_password):
             return None
         return user
 
@@ -51,7 +56,10 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def is_superuser(self, user: User) -> bool:
         return user.is_superuser
 
-    def get_users_by_role(self, db: Session, *, role: str, skip: int = 0, limit: int = 100) -> List[User]:
-        return db.query(User).filter(User.role == role).offset(skip).limit(limit).all()
+    async def get_users_by_role(
+        self, db: AsyncSession, *, role: str, skip: int = 0, limit: int = 100
+    ) -> List[User]:
+        result = await db.execute(select(User).filter(User.role == role).offset(skip).limit(limit))
+        return list(result.scalars().all())
 
 user = CRUDUser(User)
@@ -0,0 +1,109 @@
+
+"""
+Keyset (cursor) pagination.
+
+Instead of OFFSET, which makes Postgres produce and discard every skipped
+row, a page continues strictly after the sort key of the previous page's
+last row: WHERE (created_at, id) < (:created_at, :id) ORDER BY created_at
+DESC, id DESC LIMIT n. With an index on the key columns every page costs
+the same. The key must be unique, so it always ends with the primary key.
+
+The position is handed to clients as an opaque cursor, returned in the
+X-Next-Cursor response header so list responses keep their shape.
+"""
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque cursor for a sort key"""
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else str(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    """
+    Sort key of a cursor, converted to the Python types of the key columns
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match the columns
+    """
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(raw, list) or len(raw) != len(columns):
+        raise ValueError("Invalid cursor")
+
+    values = []
+    for column, value in zip(columns, raw):
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime:
+                values.append(datetime.fromisoformat(value))
+            elif python_type is uuid.UUID:
+                values.append(uuid.UUID(value))
+            else:
+                values.append(python_type(value))
+        except (ValueError, TypeError, AttributeError) as e:
+            raise ValueError("Invalid cursor") from e
+    return values
+
+
+def keyset(statement: Any, columns: Sequence[Any], cursor: Optional[str], limit: int,
+           descending: bool = True) -> Any:
+    """
+    Restrict a Query or Select to the page after a cursor
+
+    Orders by the key columns and fetches one extra row, which page()
+    uses to tell whether another page follows.
+
+    Args:
+        statement: SQLAlchemy Query or Select
+        columns: Sort key columns, ending with a unique column
+        cursor: Cursor from the previous page, or None for the first page
+        limit: Page size
+        descending: Sort direction of every key column
+
+    Raises:
+        HTTPException: 400 if the cursor is invalid
+    """
+    if cursor:
+        try:
+            values = decode_cursor(cursor, columns)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # Row-value comparison, which Postgres answers from a composite index
+        key = tuple_(*columns)
+        statement = statement.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+    order = [column.desc() if descending else column.asc() for column in columns]
+    return statement.order_by(*order).limit(limit + 1)
+
+
+def page(rows: Sequence[Any], columns: Sequence[Any], limit: int) -> Page:
+    """Split the rows of a keyset() statement into the page and the next cursor"""
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit and items:
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column in columns])
+    return Page(items, next_cursor)
+
+
+def set_next_cursor(response: Response, result: Page) -> List[Any]:
+    """Put the next cursor in the response headers and return the page items"""
+    if result.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = result.next_cursor
+    return result.items
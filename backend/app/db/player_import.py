@@ -0,0 +1,436 @@
+
+"""
+Bulk import of player profiles and their experiences.
+
+Rows stream from CSV or JSONL and are loaded in batches of `batch_size`:
+
+    1. validate - each row against PlayerImportRow; invalid rows are
+                  reported with their line number and skipped
+    2. copy     - the valid rows go through COPY ... FROM STDIN into
+                  temporary staging tables
+    3. check    - rows whose profile_id does not exist or belongs to another
+                  player are reported and dropped from staging
+    4. merge    - one INSERT ... SELECT ... ON CONFLICT (id) DO UPDATE into
+                  player_profiles; players that came with an experiences
+                  list get exactly those experiences
+
+Each batch is one transaction and only one batch is held in memory, however
+large the file. When the database rejects a batch (say an out-of-range
+integer), it is split in halves and retried until the offending rows are
+isolated and reported; the batches before it stay committed.
+
+Rows without an id create a player, rows with an id replace that player's
+fields (profile_id is kept when the row has none). CSV columns are the
+PlayerImportRow fields, with JSON in skills, stats and experiences. Run with:
+
+    python -m app.db.player_import players.jsonl --batch-size 5000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import psycopg2
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.ml.feature_store import feature_store
+from app.schemas.player import PlayerImportRow
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+# CSV columns holding JSON values
+JSON_COLUMNS = ('skills', 'stats', 'experiences')
+
+PLAYER_COLUMNS = (
+    'id', 'profile_id', 'position', 'height', 'weight', 'preferred_foot', 'age', 'nationality',
+    'current_club', 'contract_until', 'market_value', 'skills', 'stats',
+)
+EXPERIENCE_COLUMNS = (
+    'club', 'position', 'from_date', 'to_date', 'achievements', 'appearances', 'goals', 'assists',
+)
+
+# Undecodable bytes, as left by a stream opened with errors="surrogateescape"
+UNDECODABLE = re.compile("[\udc80-\udcff]")
+
+# Escapes of the COPY text format
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+# Session-local, emptied by every commit
+STAGING_TABLES = (
+    """
+    CREATE TEMP TABLE IF NOT EXISTS player_import_staging (
+        line integer NOT NULL,
+        id uuid,
+        profile_id uuid,
+        position text NOT NULL,
+        height double precision,
+        weight double precision,
+        preferred_foot text,
+        age integer NOT NULL,
+        nationality text,
+        current_club text,
+        contract_until timestamp,
+        market_value integer,
+        skills jsonb,
+        stats jsonb
+    ) ON COMMIT DELETE ROWS
+    """,
+    """
+    CREATE TEMP TABLE IF NOT EXISTS player_experience_import_staging (
+        line integer NOT NULL,
+        club text NOT NULL,
+        position text NOT NULL,
+        from_date timestamp NOT NULL,
+        to_date timestamp,
+        achievements text,
+        appearances integer,
+        goals integer,
+        assists integer
+    ) ON COMMIT DELETE ROWS
+    """,
+)
+
+# New players get their ids here rather than in Python (gen_random_uuid needs Postgres 13+)
+ASSIGN_IDS = text("UPDATE player_import_staging SET id = gen_random_uuid() WHERE id IS NULL RETURNING line, id")
+
+REJECTED_ROWS = text("""
+    SELECT s.line,
+           CASE WHEN p.id IS NULL THEN 'profile_id: profile not found'
+                ELSE 'profile_id: profile already has another player profile' END AS error
+    FROM player_import_staging s
+    LEFT JOIN profiles p ON p.id = s.profile_id
+    LEFT JOIN player_profiles pp ON pp.profile_id = s.profile_id AND pp.id <> s.id
+    WHERE s.profile_id IS NOT NULL AND (p.id IS NULL OR pp.id IS NOT NULL)
+""")
+
+DROP_REJECTED = text("DELETE FROM player_import_staging WHERE line = ANY(:lines)")
+
+MERGE_PLAYERS = text("""
+    INSERT INTO player_profiles (
+        id, profile_id, position, height, weight, preferred_foot, age, nationality,
+        current_club, contract_until, market_value, skills, stats
+    )
+    SELECT id, profile_id, position, height, weight, preferred_foot, age, nationality,
+           current_club, contract_until, market_value,
+           CASE WHEN skills IS NULL THEN NULL ELSE ARRAY(SELECT jsonb_array_elements_text(skills)) END,
+           stats::json
+    FROM player_import_staging
+    ON CONFLICT (id) DO UPDATE SET
+        profile_id = COALESCE(EXCLUDED.profile_id, player_profiles.profile_id),
+        position = EXCLUDED.position,
+        height = EXCLUDED.height,
+        weight = EXCLUDED.weight,
+        preferred_foot = EXCLUDED.preferred_foot,
+        age = EXCLUDED.age,
+        nationality = EXCLUDED.nationality,
+        current_club = EXCLUDED.current_club,
+        contract_until = EXCLUDED.contract_until,
+        market_value = EXCLUDED.market_value,
+        skills = EXCLUDED.skills,
+        stats = EXCLUDED.stats,
+        updated_at = now()
+    RETURNING (xmax = 0) AS inserted
+""")
+
+# Only players imported by id can already have experiences
+DELETE_EXPERIENCES = text("DELETE FROM player_experiences WHERE player_id = ANY(CAST(:ids AS uuid[]))")
+
+# The join drops the experiences of rejected players
+INSERT_EXPERIENCES = text("""
+    INSERT INTO player_experiences (
+        id, player_id, club, position, from_date, to_date, achievements, appearances, goals, assists
+    )
+    SELECT gen_random_uuid(), s.id, x.club, x.position, x.from_date, x.to_date, x.achievements,
+           x.appearances, x.goals, x.assists
+    FROM player_experience_import_staging x
+    JOIN player_import_staging s ON s.line = x.line
+""")
+
+
+def import_format(filename: Optional[str]) -> Optional[str]:
+    """Import format implied by a file name, or None"""
+    extension = os.path.splitext(filename or "")[1].lower()
+    return {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}.get(extension)
+
+
+def read_rows(stream: IO[str], fmt: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Parse rows one at a time
+
+    Yields:
+        Tuple of (line number, row dict or None, parse error or None)
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, None, "more values than columns"
+                continue
+            if any(UNDECODABLE.search(value or "") for value in record.values()):
+                yield reader.line_num, None, "not valid UTF-8"
+                continue
+            row = {}
+            try:
+                for column, value in record.items():
+                    value = (value or "").strip()
+                    if value:
+                        row[column] = json.loads(value) if column in JSON_COLUMNS else value
+            except ValueError as e:
+                yield reader.line_num, None, f"{column}: invalid JSON ({e})"
+                continue
+            yield reader.line_num, row, None
+    else:
+        for line, raw in enumerate(stream, 1):
+            if not raw.strip():
+                continue
+            if UNDECODABLE.search(raw):
+                yield line, None, "not valid UTF-8"
+                continue
+            try:
+                row = json.loads(raw)
+            except ValueError as e:
+                yield line, None, f"invalid JSON ({e})"
+                continue
+            if not isinstance(row, dict):
+                yield line, None, "expected a JSON object"
+                continue
+            yield line, row, None
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+def _copy_line(values: Iterable[Any]) -> str:
+    """One row in COPY text format"""
+    fields = []
+    for value in values:
+        if value is None:
+            fields.append("\\N")
+            continue
+        if isinstance(value, str):
+            pass
+        elif isinstance(value, bool):
+            value = "t" if value else "f"
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        else:
+            value = str(value)
+        fields.append(value.translate(COPY_ESCAPES))
+    return "\t".join(fields) + "\n"
+
+
+def _copy(cursor: Any, table: str, columns: Tuple[str, ...], buffer: io.StringIO):
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+def load_batch(
+    db: Session, batch: List[Tuple[int, PlayerImportRow]]
+) -> Tuple[int, int, List[Tuple[int, str]], List[Tuple[uuid.UUID, PlayerImportRow]]]:
+    """
+    Stage and merge one batch of validated rows in one transaction
+
+    Returns:
+        Tuple of (players inserted, players updated, (line, error) per rejected
+        row, (player id, row) per merged row)
+
+    Raises:
+        DBAPIError, psycopg2.Error: If the database rejects the batch; it is rolled back
+    """
+    errors: List[Tuple[int, str]] = []
+    players, experiences = io.StringIO(), io.StringIO()
+    # ON CONFLICT cannot touch a row twice, and profile_id is unique
+    seen_ids: Dict[uuid.UUID, int] = {}
+    seen_profiles: Dict[uuid.UUID, int] = {}
+    staged: List[int] = []
+    # line -> id of rows whose experiences replace the stored ones
+    replaced: Dict[int, uuid.UUID] = {}
+
+    for line, row in batch:
+        if row.id is not None and row.id in seen_ids:
+            errors.append((line, f"id: duplicate of line {seen_ids[row.id]}"))
+            continue
+        if row.profile_id is not None and row.profile_id in seen_profiles:
+            errors.append((line, f"profile_id: duplicate of line {seen_profiles[row.profile_id]}"))
+            continue
+        if row.id is not None:
+            seen_ids[row.id] = line
+        if row.profile_id is not None:
+            seen_profiles[row.profile_id] = line
+        if row.id is not None and row.experiences is not None:
+            replaced[line] = row.id
+
+        # Experiences are tied to their player by line number
+        players.write(_copy_line([line] + [getattr(row, column) for column in PLAYER_COLUMNS]))
+        for experience in row.experiences or []:
+            experiences.write(_copy_line([line] + [getattr(experience, column) for column in EXPERIENCE_COLUMNS]))
+        staged.append(line)
+
+    if not staged:
+        return 0, 0, errors, []
+
+    try:
+        for statement in STAGING_TABLES:
+            db.execute(text(statement))
+        cursor = db.connection().connection.cursor()
+        _copy(cursor, "player_import_staging", ("line",) + PLAYER_COLUMNS, players)
+        _copy(cursor, "player_experience_import_staging", ("line",) + EXPERIENCE_COLUMNS, experiences)
+
+        # Temporary tables have no statistics until analyzed; the joins below need them
+        db.execute(text("ANALYZE player_import_staging, player_experience_import_staging"))
+        assigned = dict(db.execute(ASSIGN_IDS).all())
+        rejected = db.execute(REJECTED_ROWS).all()
+        if rejected:
+            db.execute(DROP_REJECTED, {"lines": [line for line, _ in rejected]})
+        inserted = db.execute(MERGE_PLAYERS).scalars().all()
+        for line, _ in rejected:
+            replaced.pop(line, None)
+        if replaced:
+            db.execute(DELETE_EXPERIENCES, {"ids": [str(player_id) for player_id in replaced.values()]})
+        db.execute(INSERT_EXPERIENCES)
+        db.commit()
+    except (DBAPIError, psycopg2.Error):
+        db.rollback()
+        raise
+
+    n_inserted = sum(inserted)
+    dropped = {line for line, _ in rejected}
+    rows = dict(batch)
+    merged = [(rows[line].id or assigned[line], rows[line]) for line in staged if line not in dropped]
+    return n_inserted, len(inserted) - n_inserted, errors + [(line, error) for line, error in rejected], merged
+
+
+def import_players(db: Session, stream: IO[str], fmt: str, batch_size: int = 5000,
+                   max_errors: int = 1000,
+                   on_merged: Optional[Callable[[List[Tuple[uuid.UUID, PlayerImportRow]]], Any]] = None,
+                   ) -> Dict[str, Any]:
+    """
+    Import player profiles from a CSV or JSONL text stream
+
+    Args:
+        db: Database session; each batch is committed on its own
+        stream: Text stream; CSV streams should be opened with newline="".
+            Open it with errors="surrogateescape" so that rows with invalid
+            UTF-8 are reported one by one; with strict decoding the import
+            stops at the first one, keeping the rows before it
+        fmt: One of IMPORT_FORMATS
+        batch_size: Rows per COPY batch and transaction
+        max_errors: Per-row errors kept in the report; the rest are only counted
+        on_merged: Called after each committed batch with the (player id, row)
+            of every row merged into player_profiles
+
+    Returns:
+        Dict with the PlayerImportReport fields
+
+    Raises:
+        ValueError: If fmt is not one of IMPORT_FORMATS
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    report = {"rows": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+    def reject(errors: List[Tuple[int, str]]):
+        report["failed"] += len(errors)
+        room = max_errors - len(report["errors"])
+        report["errors"].extend({"line": line, "error": error} for line, error in errors[:room])
+        report["errors_truncated"] = report["errors_truncated"] or len(errors) > room
+
+    def flush(batch: List[Tuple[int, PlayerImportRow]]):
+        try:
+            inserted, updated, errors, merged = load_batch(db, batch)
+        except (DBAPIError, psycopg2.Error) as e:
+            if len(batch) == 1:
+                reason = str(getattr(e, "orig", e)).strip().splitlines()[0]
+                reject([(batch[0][0], f"rejected by the database: {reason}")])
+                return
+            # Bisect down to the rows the database refuses
+            flush(batch[:len(batch) // 2])
+            flush(batch[len(batch) // 2:])
+            return
+        report["inserted"] += inserted
+        report["updated"] += updated
+        reject(sorted(errors))
+        if on_merged is not None and merged:
+            on_merged(merged)
+
+    batch: List[Tuple[int, PlayerImportRow]] = []
+    last_line = 0
+    rows = read_rows(stream, fmt)
+    while True:
+        try:
+            line, row, error = next(rows)
+        except StopIteration:
+            break
+        except UnicodeDecodeError:
+            # A strictly decoded stream cannot be read past this point
+            report["rows"] += 1
+            reject([(last_line + 1, "not valid UTF-8, the rest of the file was not read")])
+            break
+        last_line = line
+        report["rows"] += 1
+        if error:
+            reject([(line, error)])
+            continue
+        try:
+            batch.append((line, PlayerImportRow(**row)))
+        except ValidationError as e:
+            reject([(line, _describe(e))])
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    if report["inserted"] or report["updated"]:
+        # Filters and club requirements read the player matrix; the similarity
+        # index is updated through on_merged, or with the next training run
+        feature_store.invalidate()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import player profiles from CSV or JSONL")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default=None,
+                        help="Defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=settings.PLAYER_IMPORT_BATCH_SIZE)
+    parser.add_argument("--max-errors", type=int, default=settings.PLAYER_IMPORT_MAX_ERRORS)
+    args = parser.parse_args()
+
+    fmt = args.format or import_format(args.path)
+    if fmt is None:
+        parser.error("cannot tell the format from the file name, pass --format")
+
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        with open(args.path, encoding="utf-8-sig", errors="surrogateescape", newline="") as stream:
+            result = import_players(db, stream, fmt, batch_size=args.batch_size, max_errors=args.max_errors)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - start
+
+    for error in result["errors"]:
+        print(f"line {error['line']}: {error['error']}")
+    if result["errors_truncated"]:
+        print(f"... only the first {args.max_errors} errors are listed")
+    print(f"Imported {result['rows']} rows in {elapsed:.1f}s ({result['rows'] / max(elapsed, 1e-9):.0f} rows/s): "
+          f"{result['inserted']} inserted, {result['updated']} updated, {result['failed']} failed")
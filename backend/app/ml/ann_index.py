@@ -0,0 +1,323 @@
+
+import argparse
+import hashlib
+import time
+from typing import Optional, Tuple
+import numpy as np
+
+
+class ExactIndex:
+    """
+    Brute-force euclidean nearest neighbour index.
+
+    Exposes the same `kneighbors` interface as sklearn's NearestNeighbors so it
+    can be used as the 'model' of the KNN registry entry, and serves as the
+    ground truth when measuring the recall of approximate indexes.
+    """
+
+    def __init__(self, chunk_size: int = 1024):
+        self.chunk_size = chunk_size
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.sq_norms = np.zeros(0, dtype=np.float32)
+
+    @property
+    def n_samples_fit_(self) -> int:
+        return self.vectors.shape[0]
+
+    def fit(self, vectors: np.ndarray) -> "ExactIndex":
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.sq_norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        return self
+
+    def kneighbors(self, X: np.ndarray, n_neighbors: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the nearest neighbours of each row of X
+
+        Args:
+            X: Query matrix with one vector per row
+            n_neighbors: Number of neighbours to return per query
+
+        Returns:
+            Tuple of (distances, indices) arrays of shape (n_queries, k)
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        k = min(n_neighbors, self.n_samples_fit_)
+        distances = np.empty((X.shape[0], k), dtype=np.float32)
+        indices = np.empty((X.shape[0], k), dtype=np.int64)
+
+        for start in range(0, X.shape[0], self.chunk_size):
+            chunk = X[start:start + self.chunk_size]
+            sq_dist = _squared_distances(chunk, self.vectors, self.sq_norms)
+            top = _top_k_smallest(sq_dist, k)
+            distances[start:start + len(chunk)] = np.sqrt(np.take_along_axis(sq_dist, top, axis=1))
+            indices[start:start + len(chunk)] = top
+
+        return distances, indices
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest neighbour index.
+
+    A k-means coarse quantizer splits the vectors into `n_lists` cells. A
+    query is compared with the cell centroids first and then only with the
+    vectors of its `n_probe` closest cells, so per-query cost grows with
+    n_probe * N / n_lists instead of N. Raising n_probe trades latency for
+    recall; n_probe == n_lists is an exact search.
+    """
+
+    def __init__(self, n_lists: int = 256, n_probe: int = 8, n_iter: int = 10,
+                 train_size: int = 100_000, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.train_size = train_size
+        self.seed = seed
+
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        # Vectors are stored grouped by cell: cell c owns rows
+        # offsets[c]:offsets[c + 1] of `vectors`, and `row_ids` maps each of
+        # those rows back to its position in the fitted matrix
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.sq_norms = np.zeros(0, dtype=np.float32)
+        self.row_ids = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        # matrix_digest of the fitted vectors, to detect a stale saved index
+        self.source = ""
+
+    @property
+    def n_samples_fit_(self) -> int:
+        return self.vectors.shape[0]
+
+    def fit(self, vectors: np.ndarray, vectors_path: Optional[str] = None,
+            chunk_size: int = 65536) -> "IVFIndex":
+        """
+        Train the coarse quantizer and group the vectors by cell
+
+        Args:
+            vectors: Matrix to index, e.g. a memory-mapped artifact
+            vectors_path: Optional .npy file to write the cell-ordered copy
+                of the vectors to through a memory map, so it is never held
+                in memory as a whole
+            chunk_size: Rows copied and normed at a time
+
+        Returns:
+            self
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.source = matrix_digest(vectors)
+        n_lists = max(1, min(self.n_lists, vectors.shape[0]))
+        self.centroids = self._train_centroids(vectors, n_lists)
+
+        assignments = self._assign(vectors)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=n_lists)
+
+        if vectors_path is None:
+            self.vectors = np.empty(vectors.shape, dtype=np.float32)
+        else:
+            self.vectors = np.lib.format.open_memmap(vectors_path, mode="w+", dtype=np.float32, shape=vectors.shape)
+        self.sq_norms = np.empty(vectors.shape[0], dtype=np.float32)
+        for start in range(0, vectors.shape[0], chunk_size):
+            block = vectors[order[start:start + chunk_size]]
+            self.vectors[start:start + chunk_size] = block
+            self.sq_norms[start:start + chunk_size] = np.einsum("ij,ij->i", block, block)
+        self.row_ids = order.astype(np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return self
+
+    def _train_centroids(self, vectors: np.ndarray, n_lists: int) -> np.ndarray:
+        """Run Lloyd's k-means on a sample of the vectors"""
+        rng = np.random.default_rng(self.seed)
+        if vectors.shape[0] > self.train_size:
+            sample = vectors[rng.choice(vectors.shape[0], self.train_size, replace=False)]
+        else:
+            sample = vectors
+        centroids = sample[rng.choice(sample.shape[0], n_lists, replace=False)].copy()
+
+        for _ in range(self.n_iter):
+            labels = _nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=n_lists)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # Re-seed empty cells with random training points
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(sample.shape[0], len(empty), replace=False)]
+
+        return centroids
+
+    def _assign(self, vectors: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        labels = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], chunk_size):
+            labels[start:start + chunk_size] = _nearest(vectors[start:start + chunk_size], self.centroids)
+        return labels
+
+    def kneighbors(self, X: np.ndarray, n_neighbors: int = 5,
+                   n_probe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the approximate nearest neighbours of each row of X
+
+        Args:
+            X: Query matrix with one vector per row
+            n_neighbors: Number of neighbours to return per query
+            n_probe: Number of cells to scan, defaults to self.n_probe
+
+        Returns:
+            Tuple of (distances, indices) arrays of shape (n_queries, k).
+            When the probed cells hold fewer than k vectors the remaining
+            slots are padded with index -1 and distance inf.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        k = min(n_neighbors, self.n_samples_fit_)
+        n_probe = min(n_probe or self.n_probe, self.centroids.shape[0])
+
+        distances = np.full((X.shape[0], k), np.inf, dtype=np.float32)
+        indices = np.full((X.shape[0], k), -1, dtype=np.int64)
+        if k == 0:
+            return distances, indices
+
+        centroid_dist = _squared_distances(X, self.centroids)
+        probes = _top_k_smallest(centroid_dist, n_probe)
+
+        for q, cells in enumerate(probes):
+            rows = np.concatenate([
+                np.arange(self.offsets[c], self.offsets[c + 1]) for c in cells
+            ])
+            if len(rows) == 0:
+                continue
+            sq_dist = _squared_distances(X[q:q + 1], self.vectors[rows], self.sq_norms[rows])[0]
+            found = min(k, len(rows))
+            top = _top_k_smallest(sq_dist[None, :], found)[0]
+            distances[q, :found] = np.sqrt(sq_dist[top])
+            indices[q, :found] = self.row_ids[rows[top]]
+
+        return distances, indices
+
+    def save(self, path: str) -> None:
+        """Persist the index as a pickle-free .npz archive"""
+        np.savez(
+            path,
+            params=np.array([self.n_lists, self.n_probe, self.n_iter, self.train_size, self.seed]),
+            centroids=self.centroids,
+            vectors=self.vectors,
+            row_ids=self.row_ids,
+            offsets=self.offsets,
+            source=np.array(self.source),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        with np.load(path, allow_pickle=False) as data:
+            n_lists, n_probe, n_iter, train_size, seed = (int(v) for v in data["params"])
+            index = cls(n_lists=n_lists, n_probe=n_probe, n_iter=n_iter,
+                        train_size=train_size, seed=seed)
+            index.centroids = data["centroids"]
+            index.vectors = data["vectors"]
+            index.row_ids = data["row_ids"]
+            index.offsets = data["offsets"]
+            index.source = str(data["source"]) if "source" in data else ""
+        index.sq_norms = np.einsum("ij,ij->i", index.vectors, index.vectors)
+        return index
+
+
+def matrix_digest(vectors: np.ndarray, chunk_rows: int = 65536) -> str:
+    """SHA-256 of a matrix's shape and float32 contents, read in chunks of rows"""
+    digest = hashlib.sha256(repr(tuple(vectors.shape)).encode())
+    for start in range(0, vectors.shape[0], chunk_rows):
+        digest.update(np.ascontiguousarray(vectors[start:start + chunk_rows], dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def _squared_distances(X: np.ndarray, Y: np.ndarray, y_sq_norms: Optional[np.ndarray] = None) -> np.ndarray:
+    """Pairwise squared euclidean distances between the rows of X and Y"""
+    if y_sq_norms is None:
+        y_sq_norms = np.einsum("ij,ij->i", Y, Y)
+    x_sq_norms = np.einsum("ij,ij->i", X, X)
+    sq_dist = x_sq_norms[:, None] - 2 * (X @ Y.T) + y_sq_norms[None, :]
+    return np.maximum(sq_dist, 0, out=sq_dist)
+
+
+def _nearest(X: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.argmin(_squared_distances(X, centroids), axis=1)
+
+
+def _top_k_smallest(values: np.ndarray, k: int) -> np.ndarray:
+    """Per-row indices of the k smallest values, smallest first"""
+    if k < values.shape[1]:
+        candidates = np.argpartition(values, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(values.shape[1]), values.shape)
+    order = np.argsort(np.take_along_axis(values, candidates, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def recall_at_k(approx_indices: np.ndarray, exact_indices: np.ndarray) -> float:
+    """
+    Fraction of the exact top-k neighbours that the approximate search found
+
+    Args:
+        approx_indices: (n_queries, k) indices returned by the approximate
+            index; negative entries are padding and never count as hits
+        exact_indices: (n_queries, k) indices returned by the exact index
+
+    Returns:
+        Mean recall@k over all queries
+    """
+    hits = sum(
+        len(np.intersect1d(approx[approx >= 0], exact))
+        for approx, exact in zip(np.asarray(approx_indices), exact_indices)
+    )
+    return hits / exact_indices.size if exact_indices.size else 1.0
+
+
+def recall_report(vectors: np.ndarray, queries: np.ndarray, k: int = 10, n_lists: int = 256,
+                  probes: Tuple[int, ...] = (1, 2, 4, 8, 16, 32)) -> list:
+    """
+    Measure recall@k and per-query latency of an IVF index against exact search
+
+    Args:
+        vectors: Matrix of indexed vectors
+        queries: Matrix of query vectors
+        k: Number of neighbours per query
+        n_lists: Number of IVF cells
+        probes: n_probe values to evaluate
+
+    Returns:
+        One dict per n_probe value with recall and mean query latency
+    """
+    exact = ExactIndex().fit(vectors)
+    _, exact_indices = exact.kneighbors(queries, n_neighbors=k)
+
+    ivf = IVFIndex(n_lists=n_lists).fit(vectors)
+    report = []
+    for n_probe in probes:
+        start = time.perf_counter()
+        _, approx_indices = ivf.kneighbors(queries, n_neighbors=k, n_probe=n_probe)
+        elapsed = time.perf_counter() - start
+        report.append({
+            "n_probe": n_probe,
+            "recall": recall_at_k(approx_indices, exact_indices),
+            "latency_ms": 1000 * elapsed / len(queries),
+        })
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k report for the IVF index")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dims", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((args.rows, args.dims)).astype(np.float32)
+    queries = rng.standard_normal((args.queries, args.dims)).astype(np.float32)
+
+    print(f"IVF recall@{args.k}: {args.rows} rows, {args.dims} dims, {args.lists} lists")
+    for row in recall_report(data, queries, k=args.k, n_lists=args.lists):
+        print(f"n_probe={row['n_probe']:>4}  recall={row['recall']:.3f}  latency={row['latency_ms']:.3f} ms")
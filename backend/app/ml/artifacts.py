@@ -0,0 +1,331 @@
+
+"""
+On-disk model artifact format.
+
+Each model lives in its own directory under settings.MODEL_ARTIFACT_DIR:
+
+    <artifact_dir>/<model_name>/
+        manifest.json           # metadata, written last
+        <version>/
+            vectors.npy         # float32 feature matrix, one row per user
+            ids.npy             # fixed-width unicode user ids, one per row
+
+The manifest records the model version, the metric, the feature names, the
+scaler parameters and the file names of the arrays for that version. Arrays
+are plain .npy files opened with np.load(mmap_mode="r"), so they are paged
+in lazily and shared through the page cache by every worker process, and
+nothing is ever unpickled. Because the manifest is replaced atomically after
+the arrays are written, readers always see a complete version.
+
+Versions are a UTC timestamp plus a random suffix, and a version directory
+is never reused. After publishing, write_manifest can prune all but the
+current and the `keep_versions` most recent previous versions.
+"""
+import argparse
+import json
+import os
+import pickle
+import re
+import shutil
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+# Array files of the flat layout used before versions got their own directory
+LEGACY_FILE = re.compile(r"^(?:vectors|ids)-(?P<version>.+)\.npy$")
+
+
+def artifact_path(artifact_dir: str, model_name: str) -> str:
+    return os.path.join(artifact_dir, model_name)
+
+
+def manifest_path(artifact_dir: str, model_name: str) -> str:
+    return os.path.join(artifact_path(artifact_dir, model_name), MANIFEST_NAME)
+
+
+def has_artifact(artifact_dir: str, model_name: str) -> bool:
+    return os.path.exists(manifest_path(artifact_dir, model_name))
+
+
+def save_artifact(
+    artifact_dir: str,
+    model_name: str,
+    *,
+    vectors: np.ndarray,
+    ids: List[str],
+    feature_names: List[str],
+    metric: str,
+    scaler: Optional[StandardScaler] = None,
+    normalized: bool = False,
+    version: Optional[str] = None,
+    keep_versions: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Write a model artifact
+
+    Args:
+        artifact_dir: Root directory for model artifacts
+        model_name: Name of the model, e.g. 'knn' or 'similarity'
+        vectors: Feature matrix with one row per user
+        ids: User id of each row
+        feature_names: Names of the feature columns
+        metric: Distance metric the vectors are meant for
+        scaler: Fitted StandardScaler applied to queries, if any
+        normalized: Whether the rows are already L2-normalized
+        version: Model version, defaults to new_version()
+        keep_versions: Previous versions to keep after publishing, None keeps all
+
+    Returns:
+        The written manifest
+
+    Raises:
+        FileExistsError: If the version was already written
+    """
+    version = version or new_version()
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    ids = np.asarray([str(i) for i in ids], dtype=str)
+    if vectors.shape[0] != len(ids):
+        raise ValueError("ids and vectors rows must line up")
+
+    files = create_version(artifact_dir, model_name, version)
+    directory = artifact_path(artifact_dir, model_name)
+    np.save(os.path.join(directory, files["vectors"]), vectors)
+    np.save(os.path.join(directory, files["ids"]), ids)
+
+    return write_manifest(
+        artifact_dir, model_name,
+        version=version, files=files, feature_names=feature_names, metric=metric,
+        n_rows=vectors.shape[0], n_features=vectors.shape[1] if vectors.ndim == 2 else 0,
+        scaler=scaler, normalized=normalized, keep_versions=keep_versions,
+    )
+
+
+def new_version() -> str:
+    """Sortable, collision-free version: UTC timestamp plus a random suffix"""
+    return f"{time.strftime('%Y%m%d%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+
+
+def artifact_files(version: str) -> Dict[str, str]:
+    """File names of the arrays of one model version, relative to the model directory"""
+    return {"vectors": os.path.join(version, "vectors.npy"), "ids": os.path.join(version, "ids.npy")}
+
+
+def create_version(artifact_dir: str, model_name: str, version: str) -> Dict[str, str]:
+    """
+    Create the directory of a new model version
+
+    Returns:
+        The artifact_files of the version
+
+    Raises:
+        FileExistsError: If the version already exists, so two writers never
+            share, or overwrite, the files of a version
+    """
+    os.makedirs(artifact_path(artifact_dir, model_name), exist_ok=True)
+    os.mkdir(os.path.join(artifact_path(artifact_dir, model_name), version))
+    return artifact_files(version)
+
+
+def write_manifest(
+    artifact_dir: str,
+    model_name: str,
+    *,
+    version: str,
+    files: Dict[str, str],
+    feature_names: List[str],
+    metric: str,
+    n_rows: int,
+    n_features: int,
+    scaler: Optional[StandardScaler] = None,
+    normalized: bool = False,
+    keep_versions: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Publish a model version whose arrays are already written
+
+    Writers that fill the .npy files themselves (e.g. through
+    np.lib.format.open_memmap) call this last, like save_artifact does.
+    With keep_versions, older versions are pruned once the manifest points
+    at the new one.
+
+    Returns:
+        The written manifest
+    """
+    directory = artifact_path(artifact_dir, model_name)
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "model": model_name,
+        "version": version,
+        "metric": metric,
+        "normalized": normalized,
+        "feature_names": list(feature_names),
+        "n_rows": int(n_rows),
+        "n_features": int(n_features),
+        "scaler": None if scaler is None else {
+            "mean": scaler.mean_.tolist(),
+            "scale": scaler.scale_.tolist(),
+        },
+        "files": files,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    tmp_path = os.path.join(directory, f".{MANIFEST_NAME}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_NAME))
+    if keep_versions is not None:
+        prune_versions(artifact_dir, model_name, keep_versions)
+    return manifest
+
+
+def prune_versions(artifact_dir: str, model_name: str, keep: int) -> List[str]:
+    """
+    Delete the arrays of all but the current and the `keep` newest previous versions
+
+    Processes that still map a deleted version keep their mapping; only new
+    loads need the files, and they follow the manifest.
+
+    Returns:
+        The deleted versions
+    """
+    directory = artifact_path(artifact_dir, model_name)
+    current = read_manifest(artifact_dir, model_name)["version"]
+    # version -> paths, with the newest modification time of each version
+    versions: Dict[str, List[str]] = {}
+    for entry in os.scandir(directory):
+        legacy = LEGACY_FILE.match(entry.name) if entry.is_file() else None
+        if entry.is_dir() and not entry.name.startswith("."):
+            versions.setdefault(entry.name, []).append(entry.path)
+        elif legacy:
+            versions.setdefault(legacy.group("version"), []).append(entry.path)
+
+    def modified(version: str) -> int:
+        return max(os.stat(path).st_mtime_ns for path in versions[version])
+
+    previous = sorted((v for v in versions if v != current), key=lambda v: (modified(v), v), reverse=True)
+    deleted = previous[max(keep, 0):]
+    for version in deleted:
+        for path in versions[version]:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+    return deleted
+
+
+def read_manifest(artifact_dir: str, model_name: str) -> Dict[str, Any]:
+    with open(manifest_path(artifact_dir, model_name)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version {manifest.get('format_version')}")
+    return manifest
+
+
+def load_artifact(artifact_dir: str, model_name: str) -> Dict[str, Any]:
+    """
+    Load a model artifact with its arrays memory-mapped read-only
+
+    Args:
+        artifact_dir: Root directory for model artifacts
+        model_name: Name of the model to load
+
+    Returns:
+        Dictionary with the manifest fields plus 'vectors', 'ids' and
+        'scaler' (a StandardScaler or None)
+    """
+    manifest = read_manifest(artifact_dir, model_name)
+    directory = artifact_path(artifact_dir, model_name)
+    files = manifest["files"]
+
+    artifact = dict(manifest)
+    artifact["vectors"] = np.load(os.path.join(directory, files["vectors"]), mmap_mode="r", allow_pickle=False)
+    artifact["ids"] = np.load(os.path.join(directory, files["ids"]), mmap_mode="r", allow_pickle=False)
+    artifact["scaler"] = scaler_from_params(manifest["scaler"]) if manifest.get("scaler") else None
+    return artifact
+
+
+def scaler_from_params(params: Dict[str, List[float]]) -> StandardScaler:
+    """Rebuild a fitted StandardScaler from its mean and scale"""
+    scaler = StandardScaler()
+    scaler.mean_ = np.asarray(params["mean"], dtype=np.float64)
+    scaler.scale_ = np.asarray(params["scale"], dtype=np.float64)
+    scaler.var_ = scaler.scale_ ** 2
+    scaler.n_features_in_ = len(scaler.mean_)
+    scaler.n_samples_seen_ = 0
+    return scaler
+
+
+def convert_pickle(pickle_path: str, model_name: str, artifact_dir: str,
+                   version: Optional[str] = None, keep_versions: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Convert a legacy pickled model into the artifact format
+
+    Args:
+        pickle_path: Path to the pickled model dict
+        model_name: 'knn' or 'similarity'
+        artifact_dir: Root directory for model artifacts
+        version: Version to record, defaults to new_version()
+        keep_versions: Previous versions to keep after publishing, None keeps all
+
+    Returns:
+        The written manifest
+    """
+    # Only run this on pickles from a trusted source
+    with open(pickle_path, "rb") as f:
+        model = pickle.load(f)
+
+    feature_names = model.get("feature_names", [])
+    if model_name == "knn":
+        if model.get("vectors") is None:
+            # sklearn has no public accessor for the matrix a NearestNeighbors was fitted on
+            raise ValueError("KNN pickle has no 'vectors' entry; retrain it with python -m app.ml.train")
+        vectors = np.asarray(model["vectors"])
+        ids = model.get("ids")
+        if ids is None:
+            ids = [str(i) for i in range(vectors.shape[0])]
+        return save_artifact(
+            artifact_dir, model_name,
+            vectors=vectors, ids=ids, feature_names=feature_names,
+            metric="euclidean", scaler=model.get("scaler"), version=version,
+            keep_versions=keep_versions,
+        )
+
+    if model_name == "similarity":
+        user_vectors = model.get("user_vectors", {})
+        ids = list(user_vectors.keys())
+        vectors = (
+            np.vstack([np.asarray(v, dtype=np.float32) for v in user_vectors.values()])
+            if ids else np.zeros((0, len(feature_names)), dtype=np.float32)
+        )
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1)
+        return save_artifact(
+            artifact_dir, model_name,
+            vectors=vectors, ids=ids, feature_names=feature_names,
+            metric="cosine", normalized=True, version=version, keep_versions=keep_versions,
+        )
+
+    raise ValueError(f"Unknown model '{model_name}'")
+
+
+if __name__ == "__main__":
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="Convert pickled models to the mmap artifact format")
+    parser.add_argument("--knn", default=settings.KNN_MODEL_PATH, help="Pickled KNN model")
+    parser.add_argument("--similarity", default=settings.SIMILARITY_MODEL_PATH, help="Pickled similarity model")
+    parser.add_argument("--output-dir", default=settings.MODEL_ARTIFACT_DIR)
+    parser.add_argument("--version", default=None)
+    args = parser.parse_args()
+
+    for name, path in (("knn", args.knn), ("similarity", args.similarity)):
+        if not os.path.exists(path):
+            print(f"Skipping {name}: {path} not found")
+            continue
+        manifest = convert_pickle(path, name, args.output_dir, version=args.version,
+                                  keep_versions=settings.MODEL_ARTIFACT_KEEP_VERSIONS)
+        print(f"Converted {path} -> {artifact_path(args.output_dir, name)} "
+              f"(version {manifest['version']}, {manifest['n_rows']} rows)")
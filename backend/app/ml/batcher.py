@@ -0,0 +1,111 @@
+
+"""
+Request-coalescing micro-batcher for single-user match queries.
+
+Concurrent requests each asking for one user's matches would otherwise run
+one-row kneighbors / matrix-vector calls, which leave most of the BLAS
+throughput unused. The MicroBatcher collects the queries of each model for
+up to `max_wait_ms` or until `max_items` are waiting, runs them as one
+find_matches_batch call on the inference executor and resolves every
+waiting coroutine with its own row of the result.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+BatchRunner = Callable[[List[Dict[str, Any]], int, str], Awaitable[List[list]]]
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent queries into batched model calls
+
+    Must be used from a single event loop.
+
+    Args:
+        run_batch: Coroutine function (feature dicts, top_n, model name) -> one result list per query
+        max_wait_ms: Longest time the first query of a batch waits for others
+        max_items: Batch size that triggers an immediate flush
+    """
+
+    def __init__(self, run_batch: BatchRunner, max_wait_ms: float = 2.0, max_items: int = 64):
+        self.run_batch = run_batch
+        self.max_wait_ms = max_wait_ms
+        self.max_items = max(1, max_items)
+        # model name -> waiting (features, top_n, future) and the pending flush timer
+        self._waiting: Dict[str, List[Tuple[Dict[str, Any], int, asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # The event loop only keeps weak references to tasks; hold running batches here
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"batches": 0, "queries": 0, "max_batch": 0, "run_ms_total": 0.0}
+        self.histogram = {f"<={bucket}": 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.histogram[f">{BATCH_SIZE_BUCKETS[-1]}"] = 0
+
+    async def submit(self, features: Dict[str, Any], model_name: str, top_n: int) -> list:
+        """Queue one query and wait for its matches"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiting = self._waiting.setdefault(model_name, [])
+        waiting.append((features, top_n, future))
+
+        if len(waiting) >= self.max_items:
+            self._flush(model_name)
+        elif model_name not in self._timers:
+            self._timers[model_name] = loop.call_later(self.max_wait_ms / 1000, self._flush, model_name)
+        return await future
+
+    def _flush(self, model_name: str):
+        timer = self._timers.pop(model_name, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._waiting.pop(model_name, [])
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(model_name, batch, time.perf_counter()))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, model_name: str, batch: List[Tuple[Dict[str, Any], int, asyncio.Future]],
+                   flushed_at: float):
+        self._record(len(batch))
+        # One call at the largest top_n; each query keeps its own prefix
+        top_n = max(top_n for _, top_n, _ in batch)
+        try:
+            results = await self.run_batch([features for features, _, _ in batch], top_n, model_name)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.stats["run_ms_total"] += (time.perf_counter() - flushed_at) * 1000
+        for (_, query_top_n, future), matches in zip(batch, results):
+            if not future.done():
+                future.set_result(matches[:query_top_n])
+
+    def _record(self, size: int):
+        self.stats["batches"] += 1
+        self.stats["queries"] += size
+        self.stats["max_batch"] = max(self.stats["max_batch"], size)
+        for bucket in BATCH_SIZE_BUCKETS:
+            if size <= bucket:
+                self.histogram[f"<={bucket}"] += 1
+                break
+        else:
+            self.histogram[f">{BATCH_SIZE_BUCKETS[-1]}"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Achieved batch sizes, for the models endpoint"""
+        batches = self.stats["batches"]
+        return {
+            "batches": batches,
+            "queries": self.stats["queries"],
+            "mean_batch": self.stats["queries"] / batches if batches else 0.0,
+            "max_batch": self.stats["max_batch"],
+            "mean_run_ms": self.stats["run_ms_total"] / batches if batches else 0.0,
+            "batch_size_histogram": dict(self.histogram),
+            "max_wait_ms": self.max_wait_ms,
+            "max_items": self.max_items,
+        }
@@ -0,0 +1,287 @@
+
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.player import PlayerProfile
+from app.models.profile import Profile
+
+# Numeric PlayerProfile columns, always the first columns of the matrix
+BASE_COLUMNS = ['height', 'weight', 'age', 'market_value']
+SKILL_PREFIX = 'skill.'
+# String PlayerProfile columns kept for filtering, lower-cased, '' when unknown
+CATEGORICAL_COLUMNS = ['position', 'preferred_foot', 'nationality']
+
+
+def flatten_stats(stats: Optional[Dict[str, Any]], prefix: str = '') -> Dict[str, float]:
+    """
+    Flatten a stats JSON document into numeric features
+
+    Nested objects are joined with dots, e.g. {"season": {"goals": 3}}
+    becomes {"season.goals": 3.0}. Non-numeric values are dropped.
+    """
+    flat = {}
+    for key, value in (stats or {}).items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_stats(value, prefix=f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def player_features(player: PlayerProfile) -> Dict[str, Any]:
+    """
+    Extract the numeric matching features of a player profile
+
+    Args:
+        player: Player profile row
+
+    Returns:
+        Dictionary of feature name to value, with `stats` keys flattened in
+        and every skill one-hot encoded as 'skill.<name>'
+    """
+    features = {
+        column: getattr(player, column)
+        for column in BASE_COLUMNS
+        if getattr(player, column) is not None
+    }
+    for key, value in flatten_stats(player.stats).items():
+        features.setdefault(key, value)
+    for skill in player.skills or []:
+        features[f"{SKILL_PREFIX}{skill}"] = 1.0
+    return features
+
+
+def details_features(details: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    player_features for a details row fetched as JSON, e.g. from Supabase
+
+    Non-numeric base values are left out; rows of other profile types
+    simply yield whatever numeric stats they carry.
+    """
+    details = details or {}
+    features = {
+        column: details[column]
+        for column in BASE_COLUMNS
+        if isinstance(details.get(column), (int, float)) and not isinstance(details.get(column), bool)
+    }
+    stats = details.get('stats')
+    for key, value in flatten_stats(stats if isinstance(stats, dict) else None).items():
+        features.setdefault(key, value)
+    skills = details.get('skills')
+    for skill in skills if isinstance(skills, list) else []:
+        features[f"{SKILL_PREFIX}{skill}"] = 1.0
+    return features
+
+
+class PlayerFeatureMatrix:
+    """
+    Columnar float32 feature matrix of all player profiles.
+
+    Rows line up with `ids` (player profile ids) and `user_ids`, columns with
+    `columns`. Missing numeric values are NaN; skill columns are 0/1.
+    `categories` holds the categorical attributes as one array per column.
+    """
+
+    def __init__(self, ids: np.ndarray, user_ids: np.ndarray, columns: List[str], matrix: np.ndarray,
+                 categories: Optional[Dict[str, np.ndarray]] = None):
+        self.ids = ids
+        self.user_ids = user_ids
+        self.columns = columns
+        self.matrix = matrix
+        self.categories = categories or {
+            name: np.full(len(ids), '', dtype=object) for name in CATEGORICAL_COLUMNS
+        }
+        self.column_index = {name: i for i, name in enumerate(columns)}
+        self.row_of = {player_id: row for row, player_id in enumerate(ids)}
+        self.row_of_user = {user_id: row for row, user_id in enumerate(user_ids) if user_id}
+        self.loaded_at = time.monotonic()
+        # Derived arrays computed on first use; the matrix itself never changes
+        self._derived: Dict[tuple, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Values of one feature for every player, NaN when unknown
+
+        The first call copies the strided matrix column into a contiguous
+        array that is kept, so repeated scans run at memory bandwidth.
+        """
+        i = self.column_index.get(name)
+        if i is None:
+            return np.full(len(self), np.nan, dtype=np.float32)
+        key = ('column', name)
+        if key not in self._derived:
+            self._derived[key] = np.ascontiguousarray(self.matrix[:, i])
+        return self._derived[key]
+
+    def category_codes(self, name: str) -> tuple:
+        """
+        Dictionary encoding of a categorical column
+
+        Returns:
+            Tuple of (vocab, codes): a dict of value to code and an int32
+            code per row, so equality tests run on integers
+        """
+        key = ('codes', name)
+        if key not in self._derived:
+            vocab, codes = np.unique(self.categories[name].astype(str), return_inverse=True)
+            self._derived[key] = ({value: code for code, value in enumerate(vocab)}, codes.astype(np.int32))
+        return self._derived[key]
+
+    def column_range(self, name: str) -> tuple:
+        """(min, max) of a feature over all players, ignoring unknown values"""
+        key = ('range', name)
+        if key not in self._derived:
+            values = self.column(name)
+            known = values[~np.isnan(values)]
+            self._derived[key] = (float(known.min()), float(known.max())) if len(known) else (0.0, 0.0)
+        return self._derived[key]
+
+    def select(self, names: Iterable[str], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Dense matrix of the given features, in the given order, for model input
+
+        Unknown features and missing values are 0, matching the defaults of
+        ModelRegistry._preprocess_features.
+        """
+        names = list(names)
+        rows = slice(None) if rows is None else rows
+        out = np.zeros((len(self.ids[rows]), len(names)), dtype=np.float32)
+        for j, name in enumerate(names):
+            i = self.column_index.get(name)
+            if i is not None:
+                out[:, j] = self.matrix[rows, i]
+        return np.nan_to_num(out, nan=0.0)
+
+    def features_at(self, row: int) -> Dict[str, float]:
+        """Feature dict of one row, leaving out unknown values and absent skills"""
+        values = self.matrix[row]
+        return {
+            name: float(value)
+            for name, value in zip(self.columns, values)
+            if not np.isnan(value) and not (name.startswith(SKILL_PREFIX) and value == 0)
+        }
+
+    def features_for(self, player_id: Any) -> Optional[Dict[str, float]]:
+        row = self.row_of.get(str(player_id))
+        return None if row is None else self.features_at(row)
+
+    def features_for_user(self, user_id: Any) -> Optional[Dict[str, float]]:
+        row = self.row_of_user.get(str(user_id))
+        return None if row is None else self.features_at(row)
+
+
+def load_player_features(db: Session, batch_size: int = 5000) -> PlayerFeatureMatrix:
+    """
+    Build the player feature matrix with one streaming query
+
+    Rows are fetched `batch_size` at a time with yield_per and written into
+    growing columnar buffers, so no ORM objects are created and memory
+    stays proportional to the final matrix.
+
+    Args:
+        db: Database session
+        batch_size: Number of rows fetched per round-trip
+
+    Returns:
+        PlayerFeatureMatrix over all player profiles
+    """
+    query = db.query(
+        PlayerProfile.id,
+        Profile.user_id,
+        PlayerProfile.height,
+        PlayerProfile.weight,
+        PlayerProfile.age,
+        PlayerProfile.market_value,
+        PlayerProfile.stats,
+        PlayerProfile.skills,
+        PlayerProfile.position,
+        PlayerProfile.preferred_foot,
+        PlayerProfile.nationality,
+    ).outerjoin(Profile, PlayerProfile.profile_id == Profile.id).yield_per(batch_size)
+
+    ids, user_ids = [], []
+    base = [[] for _ in BASE_COLUMNS]
+    categories = {name: [] for name in CATEGORICAL_COLUMNS}
+    # Sparse columns discovered while streaming: name -> (rows, values)
+    sparse: Dict[str, tuple] = {}
+
+    for row_number, row in enumerate(query):
+        ids.append(str(row.id))
+        user_ids.append(str(row.user_id) if row.user_id else '')
+        for values, column in zip(base, BASE_COLUMNS):
+            value = getattr(row, column)
+            values.append(np.nan if value is None else value)
+        for name, values in categories.items():
+            values.append((getattr(row, name) or '').lower())
+
+        features = flatten_stats(row.stats)
+        features.update({f"{SKILL_PREFIX}{skill}": 1.0 for skill in row.skills or []})
+        for name, value in features.items():
+            if name in BASE_COLUMNS:
+                continue
+            rows, values = sparse.setdefault(name, ([], []))
+            rows.append(row_number)
+            values.append(value)
+
+    columns = BASE_COLUMNS + sorted(sparse)
+    matrix = np.full((len(ids), len(columns)), np.nan, dtype=np.float32)
+    for j, values in enumerate(base):
+        matrix[:, j] = np.asarray(values, dtype=np.float32)
+    for j, name in enumerate(columns[len(BASE_COLUMNS):], start=len(BASE_COLUMNS)):
+        rows, values = sparse[name]
+        if name.startswith(SKILL_PREFIX):
+            matrix[:, j] = 0.0
+        matrix[rows, j] = values
+
+    return PlayerFeatureMatrix(
+        np.asarray(ids), np.asarray(user_ids), columns, matrix,
+        categories={name: np.asarray(values, dtype=object) for name, values in categories.items()},
+    )
+
+
+class PlayerFeatureStore:
+    """
+    In-memory cache of the player feature matrix.
+
+    The matrix is rebuilt at most every `ttl` seconds; readers always get a
+    complete matrix because a refresh replaces it with one assignment.
+    """
+
+    def __init__(self, ttl: int = 600, batch_size: int = 5000):
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self._matrix: Optional[PlayerFeatureMatrix] = None
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> PlayerFeatureMatrix:
+        """Return the cached matrix, loading it if missing or expired"""
+        matrix = self._matrix
+        if matrix is not None and time.monotonic() - matrix.loaded_at < self.ttl:
+            return matrix
+
+        with self._lock:
+            # Another request may have refreshed it while we waited
+            matrix = self._matrix
+            if matrix is None or time.monotonic() - matrix.loaded_at >= self.ttl:
+                matrix = load_player_features(db, batch_size=self.batch_size)
+                self._matrix = matrix
+                print(f"Player feature store loaded: {len(matrix)} players, {len(matrix.columns)} features")
+            return matrix
+
+    def invalidate(self):
+        """Force a reload on the next get()"""
+        self._matrix = None
+
+
+feature_store = PlayerFeatureStore(
+    ttl=settings.FEATURE_STORE_TTL,
+    batch_size=settings.FEATURE_STORE_BATCH_SIZE,
+)
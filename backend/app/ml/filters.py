@@ -0,0 +1,104 @@
+
+from typing import Any, Dict, Optional
+import numpy as np
+
+from app.ml.feature_store import CATEGORICAL_COLUMNS, PlayerFeatureMatrix
+
+# Filter keys understood by AttributeFilterIndex
+RANGE_FILTERS = {'age_min': np.greater_equal, 'age_max': np.less_equal}
+
+
+class AttributeFilterIndex:
+    """
+    Boolean masks over the rows of a vector index for attribute filters.
+
+    Categorical attributes (position, preferred foot, nationality) are
+    dictionary-encoded once per index; the mask of each requested value is
+    built on first use and cached, so repeated filters cost a few vectorized
+    ANDs. Age is kept as a contiguous float32 column for range filters.
+    Rows without a known player match no filter.
+    """
+
+    def __init__(self, ids: np.ndarray, player_matrix: PlayerFeatureMatrix):
+        self.player_matrix = player_matrix
+        rows = np.fromiter(
+            (player_matrix.row_of.get(str(user_id), -1) for user_id in ids),
+            dtype=np.int64, count=len(ids),
+        )
+        known = rows >= 0
+        safe_rows = np.where(known, rows, 0)
+
+        self.vocab: Dict[str, Dict[str, int]] = {}
+        self.codes: Dict[str, np.ndarray] = {}
+        for name in CATEGORICAL_COLUMNS:
+            values = player_matrix.categories[name][safe_rows] if len(player_matrix) else np.full(len(ids), '')
+            values = np.where(known, values, '').astype(str)
+            vocab, codes = np.unique(values, return_inverse=True)
+            self.vocab[name] = {value: code for code, value in enumerate(vocab)}
+            self.codes[name] = codes.astype(np.int32)
+
+        ages = player_matrix.column('age')[safe_rows] if len(player_matrix) else np.zeros(len(ids))
+        self.age = np.where(known, ages, np.nan).astype(np.float32)
+        self._masks: Dict[tuple, np.ndarray] = {}
+
+    def _value_mask(self, name: str, value: str) -> np.ndarray:
+        key = (name, value)
+        mask = self._masks.get(key)
+        if mask is None:
+            code = self.vocab[name].get(value)
+            mask = self.codes[name] == code if code is not None else np.zeros(len(self.age), dtype=bool)
+            self._masks[key] = mask
+        return mask
+
+    def mask(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        Combine the masks of the given filters
+
+        Args:
+            filters: Categorical filters keyed by column name, with a value or
+                a list of accepted values, plus optional age_min / age_max
+
+        Returns:
+            Boolean mask over the index rows, or None when no filter is set
+        """
+        mask = None
+        for name in CATEGORICAL_COLUMNS:
+            accepted = filters.get(name)
+            if accepted is None:
+                continue
+            if isinstance(accepted, str):
+                accepted = [accepted]
+            value_mask = np.zeros(len(self.age), dtype=bool)
+            for value in accepted:
+                value_mask |= self._value_mask(name, str(value).lower())
+            mask = value_mask if mask is None else mask & value_mask
+
+        for key, compare in RANGE_FILTERS.items():
+            bound = filters.get(key)
+            if bound is None:
+                continue
+            range_mask = compare(self.age, bound)
+            mask = range_mask if mask is None else mask & range_mask
+
+        return mask
+
+    def mask_for_ids(self, ids: np.ndarray, filters: Dict[str, Any]) -> np.ndarray:
+        """Evaluate filters for ids outside the index rows, e.g. delta rows"""
+        result = np.zeros(len(ids), dtype=bool)
+        for i, user_id in enumerate(ids):
+            row = self.player_matrix.row_of.get(str(user_id))
+            if row is None:
+                continue
+            ok = True
+            for name in CATEGORICAL_COLUMNS:
+                accepted = filters.get(name)
+                if accepted is None:
+                    continue
+                accepted = [accepted] if isinstance(accepted, str) else accepted
+                ok &= self.player_matrix.categories[name][row] in {str(v).lower() for v in accepted}
+            age = self.player_matrix.column('age')[row]
+            for key, compare in RANGE_FILTERS.items():
+                if filters.get(key) is not None:
+                    ok &= bool(compare(age, filters[key]))
+            result[i] = ok
+        return result
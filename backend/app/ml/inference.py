@@ -0,0 +1,93 @@
+
+"""
+Bounded executor for CPU-bound inference called from async route handlers.
+
+Matching, scoring and index lookups are synchronous NumPy code; awaited on
+the event loop they would stall every other request of the worker. The
+InferenceExecutor runs them on a dedicated thread pool (NumPy releases the
+GIL inside matrix operations, and the models stay shared in-process) and
+admits at most `max_workers` running plus `max_queue` waiting calls.
+Anything beyond that is rejected immediately with InferenceOverloaded,
+which main.py turns into 503 with a Retry-After header, so a burst of
+matching requests sheds load instead of queueing without bound.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class InferenceOverloaded(Exception):
+    """Raised when the inference queue is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Thread pool with admission control and an awaitable run()
+
+    Args:
+        max_workers: Calls running at the same time
+        max_queue: Calls allowed to wait for a free worker
+        retry_after: Seconds clients are told to wait when rejected
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 32, retry_after: int = 1):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.stats = {"completed": 0, "rejected": 0, "failed": 0}
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run fn(*args, **kwargs) on the pool and await its result
+
+        Raises:
+            InferenceOverloaded: If max_workers + max_queue calls are already admitted
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.stats["rejected"] += 1
+                raise InferenceOverloaded(self.retry_after)
+            self._pending += 1
+
+        try:
+            future = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._release(None)
+            raise
+        # The slot is held until the job itself finishes: a cancelled caller
+        # (client disconnect, timeout) does not stop the thread running it
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future: Optional[Future]):
+        """Free the slot of a finished, failed or cancelled job and count it"""
+        with self._lock:
+            self._pending -= 1
+            if future is None or future.cancelled():
+                return
+            if future.exception() is not None:
+                self.stats["failed"] += 1
+            else:
+                self.stats["completed"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and queue state, for the models endpoint"""
+        with self._lock:
+            return {
+                **self.stats,
+                "in_flight": self._pending,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,162 @@
+
+import argparse
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.crud.match import match as match_crud
+from app.db.session import SessionLocal
+from app.ml.feature_store import PlayerFeatureMatrix, feature_store
+from app.ml.model_loader import model_registry
+from app.ml.requirements import club_match_rows, club_rows, compiled_for, recompute_club_matches
+
+# Match types that have a feature model to score against
+SUPPORTED_MATCH_TYPES = {"players"}
+
+
+def compute_player_matches(
+    player_matrix: PlayerFeatureMatrix, user_ids: List[str], top_k: int
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Compute the top-K player matches of many users in one batched model call
+
+    Args:
+        player_matrix: Player feature matrix from the feature store
+        user_ids: Ids of the users to compute matches for
+        top_k: Number of matches to keep per user
+
+    Returns:
+        Dictionary of user id to match rows ready for the matches table.
+        Users without player features are left out.
+    """
+    queries = []
+    for user_id in user_ids:
+        features = player_matrix.features_for_user(user_id)
+        if features is not None:
+            queries.append((user_id, features))
+    if not queries:
+        return {}
+
+    model_version = model_registry.get_model_version('similarity')
+    # One extra result so dropping the user's own profile still leaves top_k
+    results = model_registry.find_matches_batch(
+        [features for _, features in queries], top_n=top_k + 1, model_name='similarity'
+    )
+
+    matches = {}
+    for (user_id, _), candidates in zip(queries, results):
+        rows = []
+        for candidate in candidates:
+            row = player_matrix.row_of.get(candidate["id"])
+            target_user_id = player_matrix.user_ids[row] if row is not None else None
+            if not target_user_id or target_user_id == user_id:
+                continue
+            rows.append({
+                "target_id": uuid.UUID(target_user_id),
+                "score": candidate["score"],
+                "match_data": {"player_id": candidate["id"], "model_version": model_version},
+            })
+        matches[user_id] = rows[:top_k]
+    return matches
+
+
+def refresh_user_matches(user_id: Any, match_type: str = "players") -> int:
+    """
+    Recompute and store one user's top-K matches
+
+    Meant to run as a background task, so it opens its own session. Club
+    users are matched by their compiled requirements, everyone else by the
+    similarity model.
+
+    Args:
+        user_id: Id of the user
+        match_type: Type of matches to refresh
+
+    Returns:
+        Number of stored matches
+    """
+    if match_type not in SUPPORTED_MATCH_TYPES:
+        return 0
+
+    db = SessionLocal()
+    try:
+        player_matrix = feature_store.get(db)
+        club = club_rows(db, user_id=user_id).first()
+        if club is not None:
+            compiled = compiled_for(club.requirements, club.budget)
+            rows = club_match_rows(player_matrix, compiled, settings.MATCH_TOP_K)
+        else:
+            matches = compute_player_matches(player_matrix, [str(user_id)], settings.MATCH_TOP_K)
+            rows = matches.get(str(user_id), [])
+        match_crud.replace_for_user(db, user_id=user_id, match_type=match_type, matches=rows)
+        return len(rows)
+    except Exception as e:
+        print(f"Error refreshing matches for {user_id}: {str(e)}")
+        return 0
+    finally:
+        db.close()
+
+
+def recompute_all_matches(match_type: str = "players", batch_size: Optional[int] = None) -> int:
+    """
+    Recompute the stored top-K matches of every user with player features
+
+    Users are scored in batches of `batch_size` through find_matches_batch,
+    and each batch is stored in one transaction.
+
+    Returns:
+        Number of users whose matches were stored
+    """
+    if match_type not in SUPPORTED_MATCH_TYPES:
+        return 0
+
+    batch_size = batch_size or settings.ML_BATCH_CHUNK_SIZE
+    db = SessionLocal()
+    try:
+        player_matrix = feature_store.get(db)
+        user_ids = [user_id for user_id in player_matrix.user_ids if user_id]
+        refreshed = 0
+        for start in range(0, len(user_ids), batch_size):
+            matches = compute_player_matches(
+                player_matrix, user_ids[start:start + batch_size], settings.MATCH_TOP_K
+            )
+            # One transaction per batch rather than per user
+            match_crud.replace_for_users(db, match_type=match_type, matches={
+                uuid.UUID(user_id): rows for user_id, rows in matches.items()
+            })
+            refreshed += len(matches)
+        return refreshed
+    finally:
+        db.close()
+
+
+def start_match_recompute(interval: float) -> threading.Thread:
+    """Recompute all stored matches every `interval` seconds in the background"""
+    def recompute():
+        while True:
+            time.sleep(interval)
+            try:
+                start = time.perf_counter()
+                refreshed = recompute_all_matches()
+                clubs = recompute_club_matches()
+                print(f"Recomputed matches for {refreshed} users and {clubs} clubs "
+                      f"in {time.perf_counter() - start:.1f}s")
+            except Exception as e:
+                print(f"Error recomputing matches: {str(e)}")
+
+    thread = threading.Thread(target=recompute, name="match-recompute", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute the materialized top-K matches")
+    parser.add_argument("--match-type", default="players")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    refreshed = recompute_all_matches(args.match_type, args.batch_size)
+    print(f"Recomputed matches for {refreshed} users in {time.perf_counter() - start:.1f}s")
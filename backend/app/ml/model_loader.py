@@ -1,13 +1,22 @@
 
 import pickle
 import os
-from typing import Dict, Any, Optional, List
+import threading
+from typing import Callable, Dict, Any, Optional, List
 import pandas as pd
 import numpy as np
 from sklearn.neighbors import NearestNeighbors
 from sklearn.preprocessing import StandardScaler
 
 from app.core.config import settings
+from app.ml.ann_index import ExactIndex, IVFIndex, matrix_digest
+from app.ml.artifacts import has_artifact, load_artifact, manifest_path
+from app.ml.batcher import MicroBatcher
+from app.ml.filters import AttributeFilterIndex
+from app.ml.inference import InferenceExecutor
+from app.ml.result_cache import result_cache
+from app.ml.scoring_pool import ShardedScoringPool
+from app.ml.vector_index import SimilarityIndex
 
 class ModelRegistry:
     """
@@ -15,6 +24,17 @@ class ModelRegistry:
     """
     _instance = None
     _models = {}
+    _fingerprint = None
+    _reload_lock = threading.Lock()
+    _watcher = None
+    _compactor = None
+    _watcher_stop = threading.Event()
+    # (index, player matrix, AttributeFilterIndex) of the last filtered search
+    _filter_index = None
+    _scoring_pool = None
+    _inference_executor = None
+    _executor_lock = threading.Lock()
+    _match_batcher = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -23,33 +43,344 @@ class ModelRegistry:
         return cls._instance
     
     def _load_models(self):
-        """Load all ML models from disk or create default models if not found"""
+        """Load all ML models and make them the active model set"""
+        self._fingerprint = self._artifact_fingerprint()
+        self._models = self._read_models()
+    
+    def _read_models(self, strict: bool = False) -> Dict[str, Any]:
+        """
+        Load all ML models from disk or create default models if not found
+        
+        Args:
+            strict: Raise on load errors instead of falling back to default models
+            
+        Returns:
+            Dictionary of model name to model
+        """
+        models = {}
         try:
             # Load KNN model for player matching
-            if os.path.exists(settings.KNN_MODEL_PATH):
+            if has_artifact(settings.MODEL_ARTIFACT_DIR, 'knn'):
+                models['knn'] = self._load_knn_artifact()
+                print(f"KNN model artifact loaded from {settings.MODEL_ARTIFACT_DIR}")
+            elif os.path.exists(settings.KNN_MODEL_PATH):
                 with open(settings.KNN_MODEL_PATH, 'rb') as f:
-                    self._models['knn'] = pickle.load(f)
+                    models['knn'] = pickle.load(f)
+                models['knn'].setdefault('version', self._pickle_version(settings.KNN_MODEL_PATH))
                 print(f"KNN model loaded from {settings.KNN_MODEL_PATH}")
             else:
                 print(f"Warning: KNN model not found at {settings.KNN_MODEL_PATH}")
-                self._create_default_knn_model()
+                self._create_default_knn_model(models)
             
             # Load similarity model
-            if os.path.exists(settings.SIMILARITY_MODEL_PATH):
+            if has_artifact(settings.MODEL_ARTIFACT_DIR, 'similarity'):
+                models['similarity'] = self._load_similarity_artifact()
+                print(f"Similarity model artifact loaded from {settings.MODEL_ARTIFACT_DIR}")
+            elif os.path.exists(settings.SIMILARITY_MODEL_PATH):
                 with open(settings.SIMILARITY_MODEL_PATH, 'rb') as f:
-                    self._models['similarity'] = pickle.load(f)
+                    models['similarity'] = self._build_similarity_index(pickle.load(f))
+                models['similarity'].setdefault('version', self._pickle_version(settings.SIMILARITY_MODEL_PATH))
                 print(f"Similarity model loaded from {settings.SIMILARITY_MODEL_PATH}")
             else:
                 print(f"Warning: Similarity model not found at {settings.SIMILARITY_MODEL_PATH}")
-                self._create_default_similarity_model()
+                self._create_default_similarity_model(models)
                 
         except Exception as e:
+            if strict:
+                raise
             print(f"Error loading models: {str(e)}")
             # Create fallback models
-            self._create_default_knn_model()
-            self._create_default_similarity_model()
+            self._create_default_knn_model(models)
+            self._create_default_similarity_model(models)
+        
+        self._attach_knn_backend(models)
+        return models
+    
+    def _pickle_version(self, path: str) -> str:
+        return f"pkl-{int(os.path.getmtime(path))}"
+    
+    def _artifact_fingerprint(self) -> tuple:
+        """Modification times of every file a model can be loaded from"""
+        paths = [
+            manifest_path(settings.MODEL_ARTIFACT_DIR, 'knn'),
+            manifest_path(settings.MODEL_ARTIFACT_DIR, 'similarity'),
+            settings.KNN_MODEL_PATH,
+            settings.SIMILARITY_MODEL_PATH,
+        ]
+        return tuple(
+            (path, os.stat(path).st_mtime_ns if os.path.exists(path) else None)
+            for path in paths
+        )
+    
+    def reload(self, force: bool = False) -> bool:
+        """
+        Load a new model set if the files on disk changed and swap it in
+        
+        The new models are fully built before a single reference assignment
+        makes them active, so in-flight calls finish on the models they
+        started with. If loading fails the current models stay active.
+        
+        Args:
+            force: Reload even if no model file changed
+            
+        Returns:
+            True if a new model set was swapped in
+        """
+        with self._reload_lock:
+            fingerprint = self._artifact_fingerprint()
+            if not force and fingerprint == self._fingerprint:
+                return False
+            
+            try:
+                models = self._read_models(strict=True)
+            except Exception as e:
+                # Remember the broken files so the watcher only retries once they change again
+                self._fingerprint = fingerprint
+                print(f"Error reloading models, keeping current version: {str(e)}")
+                return False
+            
+            self._models = models
+            self._fingerprint = fingerprint
+            # New versions change every cache key; drop the old entries too
+            result_cache.invalidate()
+            print(f"Models reloaded: {self.model_versions()}")
+            return True
+    
+    def reload_in_background(self, force: bool = False) -> threading.Thread:
+        """Run reload() on a background thread"""
+        thread = threading.Thread(target=self.reload, kwargs={'force': force}, daemon=True)
+        thread.start()
+        return thread
+    
+    def start_watcher(self, interval: float):
+        """Poll the model files every `interval` seconds and reload on change"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._watcher_stop.clear()
+        
+        def watch():
+            while not self._watcher_stop.wait(interval):
+                self.reload()
+        
+        self._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+    
+    def stop_watcher(self):
+        self._watcher_stop.set()
+    
+    def _update_index(self, model_name: str, update: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        Apply an update to a model's active index under the index lock
+        
+        compact_index and reload swap the index out. Once the lock is held
+        the index is checked to still be the active one, otherwise the
+        update is retried on its replacement, so no write is lost to an
+        index that was already copied.
+        
+        Returns:
+            The result of update(model), None if the model has no index
+        """
+        while True:
+            model = self.get_model(model_name)
+            if not model or 'index' not in model:
+                return None
+            index = model['index']
+            with index.lock:
+                active = self.get_model(model_name)
+                if active is not None and active.get('index') is index:
+                    return update(model)
+    
+    def upsert_vector(self, user_id: str, features: Dict[str, Any], model_name: str = 'similarity') -> bool:
+        """
+        Add or replace a single user's vector without rebuilding the index
+        
+        Args:
+            user_id: Id of the user, e.g. a player profile id
+            features: Dictionary of user features
+            model_name: Name of the model whose index is updated
+            
+        Returns:
+            True if the index was updated
+        """
+        def upsert(model: Dict[str, Any]) -> np.ndarray:
+            vector = self._preprocess_features(features, model_name, model)
+            model['index'].upsert(str(user_id), vector)
+            return vector
+        
+        try:
+            vector = self._update_index(model_name, upsert)
+        except Exception as e:
+            print(f"Error updating vector for {user_id}: {str(e)}")
+            return False
+        if vector is None:
+            return False
+        # Evict the cached results that contain this user or that it would now enter
+        result_cache.row_changed(model_name, str(user_id), vector)
+        return True
+
+    def upsert_vectors(self, features_by_id: Dict[str, Dict[str, Any]], model_name: str = 'similarity') -> int:
+        """
+        Add or replace many users' vectors in one index update, e.g. after a bulk import
+
+        Args:
+            features_by_id: Dictionary of user id to user features
+            model_name: Name of the model whose index is updated
+
+        Returns:
+            Number of vectors written, 0 if the index was not updated
+        """
+        if not features_by_id:
+            return 0
+
+        def upsert(model: Dict[str, Any]) -> int:
+            matrix = self._preprocess_features_batch(list(features_by_id.values()), model_name, model)
+            model['index'].upsert_many(list(features_by_id), matrix)
+            return len(features_by_id)
+
+        try:
+            written = self._update_index(model_name, upsert) or 0
+        except Exception as e:
+            print(f"Error updating {len(features_by_id)} vectors: {str(e)}")
+            return 0
+        if written:
+            # Checking every cached result against every row would cost more than recomputing
+            result_cache.invalidate(model_name)
+        return written
+
+    def remove_vector(self, user_id: str, model_name: str = 'similarity') -> bool:
+        """
+        Tombstone a user's vector so it no longer shows up in matches
+        
+        Args:
+            user_id: Id of the user
+            model_name: Name of the model whose index is updated
+            
+        Returns:
+            True if the user was in the index
+        """
+        removed = bool(self._update_index(model_name, lambda model: model['index'].remove(str(user_id))))
+        if removed:
+            result_cache.row_changed(model_name, str(user_id))
+        return removed
+    
+    def compact_index(self, model_name: str = 'similarity', min_changes: int = 1) -> bool:
+        """
+        Fold an index's tombstones and delta rows into a new contiguous index
+        
+        Args:
+            model_name: Name of the model whose index is compacted
+            min_changes: Only compact after at least this many updates
+            
+        Returns:
+            True if a compacted index was swapped in
+        """
+        with self._reload_lock:
+            model = self.get_model(model_name)
+            if not model or 'index' not in model:
+                return False
+            
+            index = model['index']
+            # Hold the index lock across the swap so no update is applied to
+            # the old index after it was copied
+            with index.lock:
+                if index.pending_changes < min_changes:
+                    return False
+                compacted = index.compacted()
+                self._models = dict(self._models, **{model_name: dict(model, index=compacted)})
+            
+            print(f"Compacted {model_name} index: {len(compacted)} vectors")
+            return True
+    
+    def start_compactor(self, interval: float, min_changes: int = 1):
+        """Compact the similarity index every `interval` seconds in the background"""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        
+        def compact():
+            while not self._watcher_stop.wait(interval):
+                try:
+                    self.compact_index(min_changes=min_changes)
+                except Exception as e:
+                    print(f"Error compacting index: {str(e)}")
+        
+        self._compactor = threading.Thread(target=compact, name="index-compactor", daemon=True)
+        self._compactor.start()
+    
+    def _load_knn_artifact(self) -> Dict[str, Any]:
+        """Load the memory-mapped KNN artifact behind a NumPy exact index"""
+        artifact = load_artifact(settings.MODEL_ARTIFACT_DIR, 'knn')
+        return {
+            'model': ExactIndex().fit(artifact['vectors']),
+            'scaler': artifact['scaler'],
+            'feature_names': artifact['feature_names'],
+            'ids': artifact['ids'],
+            'vectors': artifact['vectors'],
+            'version': artifact['version'],
+        }
     
-    def _create_default_knn_model(self):
+    def _load_similarity_artifact(self) -> Dict[str, Any]:
+        """Load the memory-mapped similarity artifact as a SimilarityIndex"""
+        artifact = load_artifact(settings.MODEL_ARTIFACT_DIR, 'similarity')
+        return {
+            'feature_names': artifact['feature_names'],
+            'scaler': artifact['scaler'],
+            'index': SimilarityIndex(
+                artifact['ids'], artifact['vectors'], normalized=artifact['normalized'],
+                storage=settings.VECTOR_STORAGE,
+            ),
+            'version': artifact['version'],
+        }
+    
+    def _attach_knn_backend(self, models: Dict[str, Any]):
+        """Swap the KNN model's neighbour search for the configured backend"""
+        backend = settings.KNN_BACKEND
+        model = models.get('knn')
+        if backend == 'sklearn' or not model:
+            return
+        
+        vectors = model.get('vectors')
+        if vectors is None:
+            # Legacy pickles only carry the fitted NearestNeighbors
+            print(f"Warning: KNN model has no 'vectors' to build the '{backend}' backend from, keeping sklearn")
+            return
+        
+        try:
+            if backend == 'exact':
+                index = ExactIndex().fit(vectors)
+            elif backend == 'ivf':
+                index = self._load_ivf_index(vectors)
+            else:
+                print(f"Warning: Unknown KNN backend '{backend}', keeping sklearn")
+                return
+            
+            models['knn'] = dict(model, model=index)
+            print(f"KNN backend '{backend}' attached over {index.n_samples_fit_} vectors")
+        except Exception as e:
+            print(f"Error attaching KNN backend '{backend}': {str(e)}")
+    
+    def _load_ivf_index(self, vectors: np.ndarray) -> IVFIndex:
+        """Load the persisted IVF index, rebuilding it if missing or stale"""
+        path = settings.ANN_INDEX_PATH
+        if os.path.exists(path):
+            index = IVFIndex.load(path)
+            # Same row count is not enough: a retrained model of the same size
+            # would be searched with the old vectors
+            if index.source == matrix_digest(vectors):
+                index.n_probe = settings.ANN_N_PROBE
+                print(f"IVF index loaded from {path}")
+                return index
+            print(f"Warning: IVF index at {path} is stale, rebuilding")
+        
+        index = IVFIndex(n_lists=settings.ANN_N_LISTS, n_probe=settings.ANN_N_PROBE).fit(vectors)
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            index.save(path)
+            print(f"IVF index saved to {path}")
+        except OSError as e:
+            print(f"Warning: Could not save IVF index to {path}: {str(e)}")
+        return index
+    
+    def _create_default_knn_model(self, models: Dict[str, Any]):
         """Create a default KNN model with sample data"""
         try:
             print("Creating default KNN model")
@@ -70,24 +401,27 @@ class ModelRegistry:
             knn_model.fit(scaled_data)
             
             # Store scaler with model
-            self._models['knn'] = {
+            models['knn'] = {
                 'model': knn_model,
                 'scaler': scaler,
-                'feature_names': ['age', 'height', 'speed', 'strength', 'skill']
+                'feature_names': ['age', 'height', 'speed', 'strength', 'skill'],
+                'vectors': scaled_data.astype(np.float32),
+                'version': 'default'
             }
             
             print("Default KNN model created successfully")
         except Exception as e:
             print(f"Error creating default KNN model: {str(e)}")
     
-    def _create_default_similarity_model(self):
+    def _create_default_similarity_model(self, models: Dict[str, Any]):
         """Create a default similarity model based on cosine similarity"""
         try:
             print("Creating default similarity model")
             # For similarity model, we'll just create a placeholder since
             # actual calculation can be done on-the-fly
-            self._models['similarity'] = {
+            models['similarity'] = self._build_similarity_index({
                 'feature_names': ['age', 'height', 'speed', 'strength', 'skill'],
+                'version': 'default',
                 'user_vectors': {
                     # Sample user data with feature vectors
                     '1': np.array([20, 180, 85, 75, 80]),
@@ -96,11 +430,32 @@ class ModelRegistry:
                     '4': np.array([19, 178, 88, 65, 78]),
                     '5': np.array([27, 182, 75, 80, 82]),
                 }
-            }
+            })
             print("Default similarity model created successfully")
         except Exception as e:
             print(f"Error creating default similarity model: {str(e)}")
     
+    def _build_similarity_index(self, model: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Replace the per-user vector dict of a similarity model with a
+        contiguous, pre-normalized SimilarityIndex stored as
+        settings.VECTOR_STORAGE
+        
+        Args:
+            model: Similarity model with 'feature_names' and 'user_vectors'
+            
+        Returns:
+            The model with an 'index' entry instead of 'user_vectors'
+        """
+        if 'index' in model:
+            return model
+        
+        model = dict(model)
+        model['index'] = SimilarityIndex.from_vectors(
+            model.pop('user_vectors', {}), storage=settings.VECTOR_STORAGE
+        )
+        return model
+    
     def get_model(self, model_name: str) -> Optional[Any]:
         """
         Get a model by name
@@ -113,7 +468,17 @@ class ModelRegistry:
         """
         return self._models.get(model_name)
     
-    def find_matches(self, user_features: Dict[str, Any], model_name: str = 'knn', top_n: int = 5) -> list:
+    def get_model_version(self, model_name: str) -> Optional[str]:
+        """Version of the active model with the given name"""
+        model = self.get_model(model_name)
+        return model.get('version') if model else None
+    
+    def model_versions(self) -> Dict[str, Optional[str]]:
+        """Versions of all active models"""
+        return {name: model.get('version') for name, model in self._models.items()}
+    
+    def find_matches(self, user_features: Dict[str, Any], model_name: str = 'knn', top_n: int = 5,
+                     filters: Optional[Dict[str, Any]] = None, attributes: Any = None) -> list:
         """
         Find matches for a user based on their features
         
@@ -121,49 +486,305 @@ class ModelRegistry:
             user_features: Dictionary of user features
             model_name: Name of the model to use for matching
             top_n: Number of matches to return
+            filters: Optional attribute filters (see AttributeFilterIndex.mask),
+                applied before top-k selection; similarity model only
+            attributes: PlayerFeatureMatrix the filters are evaluated against
             
         Returns:
-            List of user IDs and match scores
+            List of user IDs and match scores. Results are memoized in
+            result_cache; callers must not modify them.
         """
         model = self.get_model(model_name)
         if not model:
             return self._fallback_matches(top_n)
         
         try:
-            # Implementation depends on the specific model
-            if model_name == 'knn':
-                # Convert user features to the format expected by the model
-                feature_vector = self._preprocess_features(user_features, model_name)
-                
-                # Use the model to find nearest neighbors
-                knn = model.get('model')
-                distances, indices = knn.kneighbors(feature_vector.reshape(1, -1), n_neighbors=min(top_n, 5))
-                
-                # Return the indices and distances
-                return [
-                    {"id": str(idx), "score": float(1 / (1 + dist))}
-                    for idx, dist in zip(indices[0], distances[0])
-                ]
+            # Convert user features to the format expected by the model
+            feature_vector = self._preprocess_features(user_features, model_name, model)
             
-            elif model_name == 'similarity':
-                # Calculate similarity between user and all vectors in the database
-                user_vector = self._preprocess_features(user_features, model_name)
-                user_vectors = model.get('user_vectors', {})
-                
-                similarities = []
-                for user_id, vector in user_vectors.items():
-                    similarity = self._cosine_similarity(user_vector, vector)
-                    similarities.append({"id": user_id, "score": similarity})
-                
-                # Sort by similarity (descending) and return top N
-                similarities.sort(key=lambda x: x["score"], reverse=True)
-                return similarities[:top_n]
+            cache_query = None
+            if result_cache.enabled and model_name in ('knn', 'similarity'):
+                # Filtered results also depend on the attribute data they were evaluated on
+                extra = getattr(attributes, 'loaded_at', None) if filters else None
+                cache_query = result_cache.query(
+                    feature_vector, model_name, model.get('version'), top_n, filters, extra
+                )
+                cached = result_cache.get(cache_query)
+                if cached is not None:
+                    return cached
             
-            return self._fallback_matches(top_n)
+            matches = self._search(model, model_name, feature_vector, top_n, filters, attributes)
+            if matches is None:
+                return self._fallback_matches(top_n)
+            if cache_query is not None:
+                result_cache.set(cache_query, matches)
+            return matches
         except Exception as e:
             print(f"Error finding matches: {str(e)}")
             return self._fallback_matches(top_n)
     
+    def _search(self, model: Dict[str, Any], model_name: str, feature_vector: np.ndarray, top_n: int,
+                filters: Optional[Dict[str, Any]], attributes: Any) -> Optional[list]:
+        """Run one preprocessed query against a pinned model, None for unknown models"""
+        # Implementation depends on the specific model
+        if model_name == 'knn':
+            # Use the model to find nearest neighbors
+            knn = model.get('model')
+            distances, indices = knn.kneighbors(
+                feature_vector.reshape(1, -1), n_neighbors=min(top_n, knn.n_samples_fit_)
+            )
+            
+            # Return the indices and distances
+            return self._knn_matches(indices[0], distances[0], model.get('ids'))
+        
+        elif model_name == 'similarity':
+            # Score the user against every vector in one matrix-vector product
+            index = model['index']
+            base_mask, delta_filter = self._filter_masks(index, filters, attributes)
+            ids, scores = index.search(
+                feature_vector, top_n, base_mask=base_mask, delta_filter=delta_filter,
+                pool=self.scoring_pool(),
+            )
+            
+            return [
+                {"id": str(user_id), "score": float(score)}
+                for user_id, score in zip(ids, scores)
+            ]
+        
+        return None
+    
+    def scoring_pool(self) -> Optional[ShardedScoringPool]:
+        """Process pool for large similarity searches, None when SCORING_WORKERS is 0"""
+        if self._scoring_pool is None and settings.SCORING_WORKERS > 0:
+            with self._executor_lock:
+                if self._scoring_pool is None:
+                    self._scoring_pool = ShardedScoringPool(
+                        settings.SCORING_WORKERS, min_rows=settings.SCORING_POOL_MIN_ROWS
+                    )
+        return self._scoring_pool
+    
+    def stop_scoring_pool(self):
+        """Shut down the scoring workers and free their shared memory"""
+        with self._executor_lock:
+            pool, self._scoring_pool = self._scoring_pool, None
+        if pool is not None:
+            pool.shutdown()
+    
+    def inference_executor(self) -> InferenceExecutor:
+        """Thread pool that runs inference for async callers"""
+        if self._inference_executor is None:
+            with self._executor_lock:
+                if self._inference_executor is None:
+                    self._inference_executor = InferenceExecutor(
+                        max_workers=settings.INFERENCE_WORKERS,
+                        max_queue=settings.INFERENCE_QUEUE_DEPTH,
+                        retry_after=settings.INFERENCE_RETRY_AFTER,
+                    )
+        return self._inference_executor
+    
+    def stop_inference_executor(self):
+        if self._inference_executor is not None:
+            self._inference_executor.shutdown()
+            self._inference_executor = None
+    
+    async def run_inference(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Await any CPU-bound call on the inference executor, off the event loop
+        
+        Raises:
+            InferenceOverloaded: If the executor's queue is full
+        """
+        return await self.inference_executor().run(fn, *args, **kwargs)
+    
+    async def afind_matches(self, user_features: Dict[str, Any], model_name: str = 'knn', top_n: int = 5,
+                            filters: Optional[Dict[str, Any]] = None, attributes: Any = None) -> list:
+        """
+        find_matches on the inference executor
+        
+        Unfiltered queries are coalesced with concurrent ones by the
+        micro-batcher into one find_matches_batch call.
+        """
+        if filters and any(value is not None for value in filters.values()):
+            return await self.run_inference(
+                self.find_matches, user_features, model_name, top_n, filters, attributes
+            )
+        if settings.MATCH_BATCH_MAX_ITEMS <= 1:
+            return await self.run_inference(self.find_matches, user_features, model_name, top_n)
+        return await self.match_batcher().submit(user_features, model_name, top_n)
+    
+    def match_batcher(self) -> MicroBatcher:
+        """Micro-batcher behind afind_matches"""
+        if self._match_batcher is None:
+            self._match_batcher = MicroBatcher(
+                lambda features, top_n, model_name: self.afind_matches_batch(
+                    features, top_n=top_n, model_name=model_name, use_cache=True
+                ),
+                max_wait_ms=settings.MATCH_BATCH_MAX_WAIT_MS,
+                max_items=settings.MATCH_BATCH_MAX_ITEMS,
+            )
+        return self._match_batcher
+    
+    async def afind_matches_batch(self, *args: Any, **kwargs: Any) -> List[list]:
+        """find_matches_batch on the inference executor"""
+        return await self.run_inference(self.find_matches_batch, *args, **kwargs)
+    
+    async def ascore_candidates(self, *args: Any, **kwargs: Any) -> np.ndarray:
+        """score_candidates on the inference executor"""
+        return await self.run_inference(self.score_candidates, *args, **kwargs)
+    
+    def _filter_masks(self, index: SimilarityIndex, filters: Optional[Dict[str, Any]],
+                      attributes: Any) -> tuple:
+        """
+        Build the (base_mask, delta_filter) pair restricting a search to filtered rows
+        
+        The AttributeFilterIndex of the last (index, player matrix) pair is
+        kept, so its cached value masks are reused until either is replaced.
+        """
+        if not filters or attributes is None:
+            return None, None
+        
+        cached = self._filter_index
+        if cached is not None and cached[0] is index and cached[1] is attributes:
+            filter_index = cached[2]
+        else:
+            filter_index = AttributeFilterIndex(index.ids, attributes)
+            self._filter_index = (index, attributes, filter_index)
+        
+        base_mask = filter_index.mask(filters)
+        if base_mask is None:
+            return None, None
+        return base_mask, lambda delta_ids: filter_index.mask_for_ids(delta_ids, filters)
+    
+    def find_matches_batch(
+        self, list_of_feature_dicts: List[Dict[str, Any]], top_n: int = 5, model_name: str = 'knn',
+        use_cache: bool = False,
+    ) -> List[list]:
+        """
+        Find matches for many users in one call
+        
+        All queries are preprocessed into a single matrix and scored in
+        chunks of settings.ML_BATCH_CHUNK_SIZE rows, which bounds memory
+        while keeping the work in large matrix operations.
+        
+        Args:
+            list_of_feature_dicts: List of user feature dictionaries
+            top_n: Number of matches to return per user
+            model_name: Name of the model to use for matching
+            use_cache: Serve and fill result_cache like find_matches does; off
+                for bulk recomputes, which would only evict online entries
+            
+        Returns:
+            One list of user IDs and match scores per input, in input order
+        """
+        if not list_of_feature_dicts:
+            return []
+        
+        model = self.get_model(model_name)
+        if not model:
+            return [self._fallback_matches(top_n) for _ in list_of_feature_dicts]
+        
+        try:
+            feature_matrix = self._preprocess_features_batch(list_of_feature_dicts, model_name, model)
+            if not (use_cache and result_cache.enabled and model_name in ('knn', 'similarity')):
+                results = self._search_batch(model, model_name, feature_matrix, top_n)
+                return results if results is not None else [
+                    self._fallback_matches(top_n) for _ in list_of_feature_dicts
+                ]
+            
+            queries = [
+                result_cache.query(vector, model_name, model.get('version'), top_n)
+                for vector in feature_matrix
+            ]
+            results = [result_cache.get(query) for query in queries]
+            misses = [i for i, cached in enumerate(results) if cached is None]
+            if misses:
+                found = self._search_batch(model, model_name, feature_matrix[misses], top_n)
+                for i, matches in zip(misses, found):
+                    results[i] = matches
+                    result_cache.set(queries[i], matches)
+            return results
+        except Exception as e:
+            print(f"Error finding batch matches: {str(e)}")
+            return [self._fallback_matches(top_n) for _ in list_of_feature_dicts]
+    
+    def _search_batch(self, model: Dict[str, Any], model_name: str, feature_matrix: np.ndarray,
+                      top_n: int) -> Optional[List[list]]:
+        """Run preprocessed queries against a pinned model, None for unknown models"""
+        chunk_size = max(1, settings.ML_BATCH_CHUNK_SIZE)
+        if model_name == 'knn':
+            knn = model.get('model')
+            n_neighbors = min(top_n, knn.n_samples_fit_)
+            results = []
+            for start in range(0, feature_matrix.shape[0], chunk_size):
+                distances, indices = knn.kneighbors(
+                    feature_matrix[start:start + chunk_size], n_neighbors=n_neighbors
+                )
+                results.extend(
+                    self._knn_matches(row_indices, row_distances, model.get('ids'))
+                    for row_indices, row_distances in zip(indices, distances)
+                )
+            return results
+        
+        elif model_name == 'similarity':
+            ids, scores = model['index'].search_batch(
+                feature_matrix, top_n, chunk_size=chunk_size, pool=self.scoring_pool()
+            )
+            return [
+                [
+                    {"id": str(user_id), "score": float(score)}
+                    for user_id, score in zip(row_ids, row_scores)
+                ]
+                for row_ids, row_scores in zip(ids, scores)
+            ]
+        
+        return None
+    
+    def score_candidates(self, user_features: Dict[str, Any], candidate_features: List[Dict[str, Any]],
+                         model_name: str = 'similarity') -> np.ndarray:
+        """
+        Score a given candidate set against one user in a single batched call
+        
+        The user and every candidate are preprocessed into one matrix and
+        scored with one matrix-vector product, on the same scale as
+        find_matches: cosine similarity mapped from -1:1 to 0:1 for
+        'similarity' (0 for all-zero vectors), 1 / (1 + distance) for 'knn'.
+        
+        Args:
+            user_features: Feature dictionary of the user
+            candidate_features: Feature dictionary of each candidate
+            model_name: Model whose features and scaling to use
+            
+        Returns:
+            One score per candidate, in input order; zeros when the model is missing
+        """
+        scores = np.zeros(len(candidate_features), dtype=np.float32)
+        model = self.get_model(model_name)
+        if not model or not candidate_features:
+            return scores
+        
+        try:
+            matrix = self._preprocess_features_batch([user_features] + candidate_features, model_name, model)
+            query, rows = matrix[0], matrix[1:]
+            if model_name == 'knn':
+                return (1 / (1 + np.linalg.norm(rows - query, axis=1))).astype(np.float32)
+            
+            norms = np.linalg.norm(rows, axis=1) * np.linalg.norm(query)
+            cosine = np.divide(rows @ query, np.where(norms > 0, norms, 1))
+            return np.where(norms > 0, (cosine + 1) / 2, 0.0).astype(np.float32)
+        except Exception as e:
+            print(f"Error scoring candidates: {str(e)}")
+            return scores
+    
+    def _knn_matches(self, indices: np.ndarray, distances: np.ndarray,
+                     ids: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Convert one row of kneighbors output to match results"""
+        # Approximate indexes pad short result lists with index -1
+        return [
+            {"id": str(ids[idx]) if ids is not None else str(idx), "score": float(1 / (1 + dist))}
+            for idx, dist in zip(indices, distances)
+            if idx >= 0
+        ]
+    
     def _fallback_matches(self, top_n: int = 5) -> List[Dict[str, Any]]:
         """Return fallback match results when real models fail"""
         return [
@@ -171,45 +792,72 @@ class ModelRegistry:
             for i in range(1, top_n + 1)
         ]
     
-    def _preprocess_features(self, features: Dict[str, Any], model_name: str) -> np.ndarray:
+    def _preprocess_features(self, features: Dict[str, Any], model_name: str,
+                             model: Optional[Dict[str, Any]] = None) -> np.ndarray:
         """
         Preprocess user features for model input
         
         Args:
             features: Dictionary of user features
             model_name: Name of the model to use
+            model: Model to preprocess for, defaults to the active one
             
         Returns:
             Preprocessed feature vector
         """
-        model = self.get_model(model_name)
+        model = model or self.get_model(model_name)
         if not model:
             # Default preprocessing for test
             return np.array([0, 0, 0, 0, 0])
         
+        return self._preprocess_features_batch([features], model_name, model)[0]
+    
+    def _preprocess_features_batch(self, features_list: List[Dict[str, Any]], model_name: str,
+                                   model: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """
+        Preprocess many users' features into one model input matrix
+        
+        Args:
+            features_list: List of user feature dictionaries
+            model_name: Name of the model to use
+            model: Model to preprocess for, defaults to the active one
+            
+        Returns:
+            Preprocessed feature matrix with one row per user
+        """
+        model = model or self.get_model(model_name)
+        if not model:
+            return np.zeros((len(features_list), 5))
+        
         # Get feature names for the model
         feature_names = model.get('feature_names', [])
         
-        # Extract values for each feature
-        feature_list = []
-        for feature in feature_names:
-            value = features.get(feature, 0)
-            # Convert string values to numeric if necessary
-            if isinstance(value, str):
-                try:
-                    value = float(value)
-                except (ValueError, TypeError):
-                    value = 0
-            feature_list.append(value)
+        # Extract values for every user and feature in a single pass
+        feature_matrix = np.array(
+            [
+                [self._to_numeric(features.get(feature, 0)) for feature in feature_names]
+                for features in features_list
+            ],
+            dtype=np.float64,
+        ).reshape(len(features_list), len(feature_names))
         
-        feature_vector = np.array(feature_list)
-        
-        # Apply scaling if the model has a scaler
+        # Apply scaling if the model has a scaler; trained similarity models
+        # carry the KNN model's scaler, the default one has none
         scaler = model.get('scaler')
-        if scaler and model_name == 'knn':
-            feature_vector = scaler.transform(feature_vector.reshape(1, -1)).flatten()
+        if scaler:
+            feature_matrix = scaler.transform(feature_matrix)
             
-        return feature_vector
+        return feature_matrix
+    
+    @staticmethod
+    def _to_numeric(value: Any) -> float:
+        """Convert string values to numeric if necessary"""
+        if isinstance(value, str):
+            try:
+                return float(value)
+            except (ValueError, TypeError):
+                return 0
+        return value
     
     def _cosine_similarity(self, a: np.ndarray, b: np.ndarray) -> float:
         """Calculate cosine similarity between two vectors"""
@@ -0,0 +1,202 @@
+
+"""
+Scalar-quantized vector storage.
+
+A QuantizedMatrix keeps a float32 matrix as float16 values or as int8 codes
+with a per-dimension scale and offset (x ~= code * scale + offset), which
+cuts memory 2x or 4x. Scoring is asymmetric: queries stay float32 and
+are folded into the scale and offset, so only the stored side is
+approximated and nothing is ever dequantized as a whole.
+"""
+import argparse
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+
+from app.ml.ann_index import recall_at_k
+
+STORAGE_MODES = ('float32', 'float16', 'int8')
+# Rows widened to float32 at a time while scoring
+SCORE_CHUNK_ROWS = 65536
+
+
+class QuantizedMatrix:
+    """
+    Read-only row matrix in float16 or per-dimension int8 storage.
+
+    Supports the subset of the ndarray interface SimilarityIndex needs:
+    shape, len(), row selection with [] (returning a QuantizedMatrix) and
+    dot() for scoring.
+    """
+
+    def __init__(self, codes: np.ndarray, scale: np.ndarray, offset: np.ndarray, mode: str):
+        self.codes = codes
+        self.scale = scale
+        self.offset = offset
+        self.mode = mode
+
+    @classmethod
+    def quantize(cls, matrix: np.ndarray, mode: str) -> "QuantizedMatrix":
+        """
+        Quantize a float matrix
+
+        Args:
+            matrix: Matrix with one vector per row
+            mode: 'float16' or 'int8'
+
+        Returns:
+            QuantizedMatrix approximating `matrix`
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        n_features = matrix.shape[1]
+        if mode == 'float16':
+            return cls(
+                matrix.astype(np.float16), np.ones(n_features, dtype=np.float32),
+                np.zeros(n_features, dtype=np.float32), mode,
+            )
+        if mode != 'int8':
+            raise ValueError(f"Unknown quantization mode '{mode}'")
+
+        low = matrix.min(axis=0) if len(matrix) else np.zeros(n_features, dtype=np.float32)
+        high = matrix.max(axis=0) if len(matrix) else np.zeros(n_features, dtype=np.float32)
+        # 255 steps between each dimension's min and max; constant dimensions
+        # get scale 1 so every row encodes exactly to the offset
+        scale = np.where(high > low, (high - low) / 255, 1).astype(np.float32)
+        offset = (low + 128 * scale).astype(np.float32)
+        quantized = cls(np.zeros((0, n_features), dtype=np.int8), scale, offset, mode)
+        quantized.codes = quantized.encode(matrix)
+        return quantized
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        """Codes of float rows under this matrix's quantization parameters"""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if self.mode == 'float16':
+            return matrix.astype(np.float16)
+        return np.clip(np.rint((matrix - self.offset) / self.scale), -128, 127).astype(np.int8)
+
+    def append(self, matrix: np.ndarray) -> "QuantizedMatrix":
+        """
+        This matrix's rows followed by new float rows
+
+        Stored codes are carried over as they are, so rows never pick up
+        additional error from being appended to. New rows are encoded with
+        the existing parameters; in int8 mode, components outside the range
+        the parameters were fitted on saturate at the nearest code.
+        """
+        codes = np.concatenate([self.codes, self.encode(matrix).reshape(-1, self.codes.shape[1])])
+        return QuantizedMatrix(codes, self.scale, self.offset, self.mode)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scale.nbytes + self.offset.nbytes
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, rows) -> "QuantizedMatrix":
+        return QuantizedMatrix(self.codes[rows], self.scale, self.offset, self.mode)
+
+    def dequantize(self) -> np.ndarray:
+        """Float32 approximation of the stored rows"""
+        return self.codes.astype(np.float32) * self.scale + self.offset
+
+    def dot(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Inner products of float32 queries with every stored row
+
+        q . x ~= (q * scale) . code + q . offset, so the query absorbs the
+        quantization parameters and rows are only widened chunk by chunk.
+
+        Args:
+            queries: Matrix with one query vector per row
+
+        Returns:
+            (n_queries, n_rows) float32 matrix, like queries @ matrix.T
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        scaled = queries * self.scale
+        bias = queries @ self.offset
+        out = np.empty((queries.shape[0], len(self.codes)), dtype=np.float32)
+        for start in range(0, len(self.codes), SCORE_CHUNK_ROWS):
+            block = self.codes[start:start + SCORE_CHUNK_ROWS].astype(np.float32)
+            out[:, start:start + SCORE_CHUNK_ROWS] = scaled @ block.T
+        out += bias[:, None]
+        return out
+
+
+def quantization_report(vectors: np.ndarray, queries: np.ndarray, k: int = 10,
+                        modes: Tuple[str, ...] = ('float16', 'int8')) -> List[Dict[str, float]]:
+    """
+    Measure the accuracy loss and memory savings of each storage mode
+
+    Vectors and queries are L2-normalized first, as in SimilarityIndex, and
+    every mode is compared with exact float32 cosine scoring.
+
+    Args:
+        vectors: Matrix of indexed vectors
+        queries: Matrix of query vectors
+        k: Number of results per query for recall@k
+        modes: Storage modes to evaluate
+
+    Returns:
+        One dict per mode with recall, the mean and max absolute cosine
+        error, the compression ratio and the mean query latency
+    """
+    def normalize(matrix: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1)
+
+    vectors, queries = normalize(vectors), normalize(queries)
+    start = time.perf_counter()
+    exact_scores = queries @ vectors.T
+    exact_latency = (time.perf_counter() - start) / len(queries)
+    exact_top = np.argsort(-exact_scores, axis=1)[:, :k]
+
+    report = [{
+        "mode": "float32", "recall": 1.0, "mean_abs_error": 0.0, "max_abs_error": 0.0,
+        "compression": 1.0, "latency_ms": 1000 * exact_latency,
+    }]
+    for mode in modes:
+        quantized = QuantizedMatrix.quantize(vectors, mode)
+        start = time.perf_counter()
+        scores = quantized.dot(queries)
+        latency = (time.perf_counter() - start) / len(queries)
+        error = np.abs(scores - exact_scores)
+        report.append({
+            "mode": mode,
+            "recall": recall_at_k(np.argsort(-scores, axis=1)[:, :k], exact_top),
+            "mean_abs_error": float(error.mean()),
+            "max_abs_error": float(error.max()),
+            "compression": vectors.nbytes / quantized.nbytes,
+            "latency_ms": 1000 * latency,
+        })
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy loss of quantized vector storage")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dims", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--vectors", default=None, help="Optional .npy matrix to evaluate instead of random data")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.vectors:
+        data = np.load(args.vectors, mmap_mode="r")
+        queries = np.asarray(data[rng.choice(len(data), size=min(args.queries, len(data)), replace=False)])
+    else:
+        data = rng.standard_normal((args.rows, args.dims)).astype(np.float32)
+        queries = rng.standard_normal((args.queries, args.dims)).astype(np.float32)
+
+    print(f"Quantization report: {data.shape[0]} rows, {data.shape[1]} dims, recall@{args.k}")
+    for row in quantization_report(data, queries, k=args.k):
+        print(f"{row['mode']:>8}  recall={row['recall']:.4f}  mean_err={row['mean_abs_error']:.5f}  "
+              f"max_err={row['max_abs_error']:.5f}  compression={row['compression']:.1f}x  "
+              f"latency={row['latency_ms']:.3f} ms")
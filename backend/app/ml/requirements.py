@@ -0,0 +1,255 @@
+
+"""
+Club requirements compiler.
+
+ClubProfile.requirements and ClubProfile.budget are free-form JSON. This
+module compiles them once into vectorized predicates and weighted scoring
+terms over the columnar PlayerFeatureMatrix, so evaluating a club against
+every player is a handful of array operations. The understood keys are:
+
+    {
+        "position": "cb" | ["cb", "lb"],          # also preferred_foot, nationality
+        "age": {"max": 23},                        # any feature column: {"min", "max"}
+        "height": {"min": 185},
+        "skills": ["heading", "passing"],          # all required
+        "weights": {"skill.passing": 2, "age": -1} # scoring terms, default market_value: -1
+    }
+
+and in the budget, "max_market_value" or "transfer_budget" caps the market
+value. Unknown keys are kept in CompiledRequirements.ignored.
+"""
+import argparse
+import json
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.match import match as match_crud
+from app.db.session import SessionLocal
+from app.ml.feature_store import CATEGORICAL_COLUMNS, SKILL_PREFIX, PlayerFeatureMatrix, feature_store
+from app.models.club import ClubProfile
+from app.models.profile import Profile
+
+# Requirement keys naming categorical columns, singular or plural
+CATEGORICAL_KEYS = {
+    **{name: name for name in CATEGORICAL_COLUMNS},
+    'positions': 'position',
+    'nationalities': 'nationality',
+}
+BUDGET_KEYS = ('max_market_value', 'transfer_budget')
+DEFAULT_WEIGHTS = {'market_value': -1.0}
+
+Predicate = Callable[[PlayerFeatureMatrix], np.ndarray]
+
+
+class CompiledRequirements:
+    """
+    A club's requirements as vectorized predicates and scoring terms.
+
+    Players missing a value a predicate needs do not satisfy it. Scores
+    are the weighted mean of each term's column scaled to 0:1 over all
+    players (inverted for negative weights), so they lie in 0:1.
+    """
+
+    def __init__(self, predicates: List[Predicate], weights: Dict[str, float], ignored: List[str]):
+        self.predicates = predicates
+        self.weights = weights
+        self.ignored = ignored
+
+    def mask(self, matrix: PlayerFeatureMatrix) -> np.ndarray:
+        """Boolean mask of the players satisfying every requirement"""
+        mask = np.ones(len(matrix), dtype=bool)
+        for predicate in self.predicates:
+            mask &= predicate(matrix)
+        return mask
+
+    def scores(self, matrix: PlayerFeatureMatrix, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Fit score of the given rows (all rows by default)"""
+        rows = np.arange(len(matrix)) if rows is None else rows
+        total_weight = sum(abs(w) for w in self.weights.values())
+        if not total_weight:
+            return np.ones(len(rows), dtype=np.float32)
+
+        scores = np.zeros(len(rows), dtype=np.float32)
+        for name, weight in self.weights.items():
+            low, high = matrix.column_range(name)
+            values = matrix.column(name)[rows]
+            scaled = (values - low) / (high - low) if high > low else np.full(len(rows), 0.5, dtype=np.float32)
+            if weight < 0:
+                scaled = 1 - scaled
+            # Unknown values count as the worst possible fit for that term
+            scores += abs(weight) * np.nan_to_num(scaled, nan=0.0)
+        return scores / total_weight
+
+    def top_k(self, matrix: PlayerFeatureMatrix, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Best-fitting players satisfying every requirement
+
+        Returns:
+            Tuple of (rows, scores), highest score first
+        """
+        rows = np.flatnonzero(self.mask(matrix))
+        scores = self.scores(matrix, rows)
+        if k < len(rows):
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return rows[order], scores[order]
+
+
+def _categorical_predicate(column: str, accepted: Any) -> Predicate:
+    accepted = [accepted] if isinstance(accepted, str) else list(accepted)
+    values = {str(value).strip().lower() for value in accepted}
+
+    def predicate(matrix: PlayerFeatureMatrix) -> np.ndarray:
+        vocab, codes = matrix.category_codes(column)
+        # Lookup table indexed by code: one gather instead of a set test per row
+        wanted = np.zeros(len(vocab), dtype=bool)
+        wanted[[vocab[value] for value in values if value in vocab]] = True
+        return wanted[codes]
+    return predicate
+
+
+def _range_predicate(column: str, low: Optional[float], high: Optional[float]) -> Predicate:
+    def predicate(matrix: PlayerFeatureMatrix) -> np.ndarray:
+        values = matrix.column(column)
+        mask = ~np.isnan(values)
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+        return mask
+    return predicate
+
+
+def compile_requirements(requirements: Optional[Dict[str, Any]],
+                         budget: Optional[Dict[str, Any]] = None) -> CompiledRequirements:
+    """
+    Compile a club's requirements and budget JSON
+
+    Args:
+        requirements: ClubProfile.requirements, see the module docstring
+        budget: ClubProfile.budget
+
+    Returns:
+        CompiledRequirements ready to evaluate against a PlayerFeatureMatrix
+
+    Raises:
+        ValueError: If a known key has a value of the wrong shape
+    """
+    requirements = requirements or {}
+    predicates: List[Predicate] = []
+    ignored: List[str] = []
+    weights = dict(DEFAULT_WEIGHTS)
+
+    for key, value in requirements.items():
+        if value is None:
+            continue
+        if key in CATEGORICAL_KEYS:
+            if not isinstance(value, (str, list)):
+                raise ValueError(f"Requirement '{key}' must be a string or a list")
+            predicates.append(_categorical_predicate(CATEGORICAL_KEYS[key], value))
+        elif key == 'skills':
+            if not isinstance(value, list):
+                raise ValueError("Requirement 'skills' must be a list")
+            for skill in value:
+                predicates.append(_range_predicate(f"{SKILL_PREFIX}{skill}", 1, None))
+        elif key == 'weights':
+            if not isinstance(value, dict):
+                raise ValueError("Requirement 'weights' must be an object")
+            weights = {name: float(weight) for name, weight in value.items()}
+        elif isinstance(value, dict) and set(value) <= {'min', 'max'}:
+            predicates.append(_range_predicate(key, value.get('min'), value.get('max')))
+        else:
+            ignored.append(key)
+
+    for key in BUDGET_KEYS:
+        cap = (budget or {}).get(key)
+        if isinstance(cap, (int, float)) and not isinstance(cap, bool):
+            predicates.append(_range_predicate('market_value', None, cap))
+            break
+
+    return CompiledRequirements(predicates, weights, ignored)
+
+
+_compiled_cache: Dict[str, CompiledRequirements] = {}
+
+
+def compiled_for(requirements: Optional[Dict[str, Any]], budget: Optional[Dict[str, Any]] = None
+                 ) -> CompiledRequirements:
+    """compile_requirements, memoized on the JSON documents"""
+    key = json.dumps([requirements, budget], sort_keys=True, default=str)
+    compiled = _compiled_cache.get(key)
+    if compiled is None:
+        if len(_compiled_cache) >= 10_000:
+            _compiled_cache.clear()
+        compiled = _compiled_cache[key] = compile_requirements(requirements, budget)
+    return compiled
+
+
+def club_match_rows(matrix: PlayerFeatureMatrix, compiled: CompiledRequirements, top_k: int
+                    ) -> List[Dict[str, Any]]:
+    """Top-k players of one club as rows for the matches table"""
+    rows, scores = compiled.top_k(matrix, top_k)
+    return [
+        {
+            "target_id": uuid.UUID(matrix.user_ids[row]),
+            "score": float(score),
+            "match_data": {"player_id": matrix.ids[row], "source": "requirements"},
+        }
+        for row, score in zip(rows, scores)
+        if matrix.user_ids[row]
+    ]
+
+
+def club_rows(db: Session, user_id: Optional[Any] = None):
+    """(club id, user id, requirements, budget) of every club, or of one user's club"""
+    query = db.query(
+        ClubProfile.id, Profile.user_id, ClubProfile.requirements, ClubProfile.budget,
+    ).join(Profile, ClubProfile.profile_id == Profile.id)
+    if user_id is not None:
+        query = query.filter(Profile.user_id == user_id)
+    return query
+
+
+def recompute_club_matches(top_k: Optional[int] = None) -> int:
+    """
+    Evaluate every club's requirements and store each club user's top-k
+    players as their "players" matches
+
+    Returns:
+        Number of clubs whose matches were stored
+    """
+    top_k = top_k or settings.MATCH_TOP_K
+    db = SessionLocal()
+    try:
+        matrix = feature_store.get(db)
+        results = []
+        for club in club_rows(db).yield_per(settings.FEATURE_STORE_BATCH_SIZE):
+            try:
+                compiled = compiled_for(club.requirements, club.budget)
+            except ValueError as e:
+                print(f"Skipping club {club.id}: {str(e)}")
+                continue
+            results.append((club.user_id, club_match_rows(matrix, compiled, top_k)))
+
+        for start in range(0, len(results), settings.ML_BATCH_CHUNK_SIZE):
+            match_crud.replace_for_users(
+                db, match_type="players", matches=dict(results[start:start + settings.ML_BATCH_CHUNK_SIZE])
+            )
+        return len(results)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate every club's requirements against all players")
+    parser.add_argument("--top-k", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    evaluated = recompute_club_matches(args.top_k)
+    print(f"Stored requirement matches for {evaluated} clubs in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,366 @@
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+
+from app.core.config import settings
+
+REDIS_PREFIX = "match-cache"
+# Row changes remembered per model, locally and in the Redis change stream
+CHANGE_LOG_SIZE = 1000
+# Slack on the score comparison, so rows scored approximately by a
+# quantized index are still treated as able to enter a cached top-n
+SCORE_MARGIN = 0.01
+
+
+class CachedQuery(NamedTuple):
+    """One lookup: its key, unit query vector, top_n and the change log position"""
+    key: str
+    model_name: str
+    vector: np.ndarray
+    top_n: int
+    changes: int
+
+
+class Change(NamedTuple):
+    """A changed row and its unit vector; `vector` is None for a removal, `row_id` None for every row"""
+    number: int
+    stream_id: Optional[Tuple[int, int]]
+    row_id: Optional[str]
+    vector: Optional[np.ndarray]
+
+
+def _stream_id(raw: Any) -> Tuple[int, int]:
+    """Redis stream id "ms-seq" as a comparable tuple"""
+    if isinstance(raw, bytes):
+        raw = raw.decode()
+    ms, seq = str(raw).split("-")
+    return int(ms), int(seq)
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float64))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+class MatchResultCache:
+    """
+    Memoized find_matches results.
+
+    Keys combine a hash of the preprocessed feature vector with the model
+    name, model version, top_n and filters; a model swap changes the version
+    and drops the local entries.
+
+    A profile write changes one row of the similarity index. Only the
+    entries it can affect are evicted: those whose results include the row,
+    and those the new vector would enter (its cosine score against the
+    cached query reaches the weakest cached score, or the results are
+    shorter than top_n). Row changes are kept in a short log, so a result
+    computed while a change was applied is not stored.
+
+    Entries live in a bounded in-process LRU with a TTL. With a Redis client
+    a second, shared tier is consulted on local misses. Row changes are then
+    appended to a Redis stream and full invalidations bump a generation;
+    each worker reads both in one round trip at most every
+    `sync_interval` seconds, applies them to its own entries and rejects
+    shared entries written before a change that affects them.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: int = 300, redis_client: Any = None,
+                 sync_interval: float = 1.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis = redis_client
+        self.sync_interval = sync_interval
+        # key -> (expires, results, model name, query vector, top_n)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._changes: Dict[str, Deque[Change]] = {}
+        self._change_count = 0
+        # Per model: Redis generation, last stream id read, stream id below
+        # which the local log is incomplete, and when to read again
+        self._generations: Dict[str, int] = {}
+        self._stream_pos: Dict[str, Tuple[int, int]] = {}
+        self._stream_floor: Dict[str, Tuple[int, int]] = {}
+        self._next_sync: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "redis_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def query(self, vector: np.ndarray, model_name: str, version: Optional[str], top_n: int,
+              filters: Optional[Dict[str, Any]] = None, extra: Any = None) -> CachedQuery:
+        """
+        Cache lookup of one query
+
+        Args:
+            vector: Preprocessed feature vector
+            model_name: Name of the model
+            version: Version of the model
+            top_n: Number of results requested
+            filters: Attribute filters, if any
+            extra: Anything else the results depend on, e.g. the filter data version
+        """
+        self._sync(model_name)
+        digest = hashlib.sha1(np.ascontiguousarray(vector, dtype=np.float64).tobytes())
+        digest.update(json.dumps(
+            [model_name, version, top_n, filters or {}, extra], sort_keys=True, default=str,
+        ).encode())
+        return CachedQuery(
+            f"{model_name}:{digest.hexdigest()}", model_name, _unit(vector)[0], top_n, self._change_count
+        )
+
+    def get(self, query: CachedQuery) -> Optional[List[Dict[str, Any]]]:
+        """Cached results of a query, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(query.key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(query.key)
+                self.stats["hits"] += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[query.key]
+
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(f"{REDIS_PREFIX}:{query.key}")
+            except Exception as e:
+                print(f"Match cache Redis error: {str(e)}")
+                raw = None
+            value = self._shared_results(query, json.loads(raw)) if raw is not None else None
+            if value is not None:
+                self._store_local(query, value)
+                with self._lock:
+                    self.stats["redis_hits"] += 1
+                return value
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def set(self, query: CachedQuery, value: List[Dict[str, Any]]):
+        """Store the results of a query in every tier, unless a row change since the lookup affects them"""
+        with self._lock:
+            for change in self._changes.get(query.model_name, ()):
+                if change.number > query.changes and self._affected(query.vector, query.top_n, value, change):
+                    return
+            self._store_local_locked(query, value)
+        if self.redis is not None:
+            shared = {
+                "generation": self._generations.get(query.model_name, 0),
+                "stream_id": "-".join(map(str, self._stream_pos.get(query.model_name, (0, 0)))),
+                "results": value,
+            }
+            try:
+                self.redis.set(f"{REDIS_PREFIX}:{query.key}", json.dumps(shared), ex=self.ttl)
+            except Exception as e:
+                print(f"Match cache Redis error: {str(e)}")
+
+    def _store_local(self, query: CachedQuery, value: List[Dict[str, Any]]):
+        with self._lock:
+            self._store_local_locked(query, value)
+
+    def _store_local_locked(self, query: CachedQuery, value: List[Dict[str, Any]]):
+        self._entries[query.key] = (
+            time.monotonic() + self.ttl, value, query.model_name, query.vector, query.top_n
+        )
+        self._entries.move_to_end(query.key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _shared_results(self, query: CachedQuery, shared: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Results of a Redis entry, or None if it predates a change that affects it"""
+        written_at = _stream_id(shared["stream_id"])
+        with self._lock:
+            if shared["generation"] != self._generations.get(query.model_name, 0):
+                return None
+            if written_at < self._stream_floor.get(query.model_name, (0, 0)):
+                return None
+            for change in self._changes.get(query.model_name, ()):
+                if (change.stream_id is not None and change.stream_id > written_at
+                        and self._affected(query.vector, query.top_n, shared["results"], change)):
+                    return None
+        return shared["results"]
+
+    @staticmethod
+    def _affected(vector: np.ndarray, top_n: int, results: List[Dict[str, Any]], change: Change) -> bool:
+        """Whether a row change can alter the results of a query"""
+        if change.row_id is None:
+            # Logged by _drop_local: every result of the model
+            return True
+        if any(match["id"] == change.row_id for match in results):
+            return True
+        if change.vector is None:
+            # Removing a row that is not in the results changes nothing
+            return False
+        if len(results) < top_n or vector.shape != change.vector.shape:
+            # Room for the row, or a query of another model version's features
+            return True
+        cosine = float(vector @ change.vector)
+        return (cosine + 1) / 2 >= min(match["score"] for match in results) - SCORE_MARGIN
+
+    def row_changed(self, model_name: str, row_id: str, vector: Optional[np.ndarray] = None):
+        """
+        Evict the cached results a changed row can affect
+
+        Args:
+            model_name: Name of the model whose index changed
+            row_id: Id of the upserted or removed row
+            vector: Preprocessed feature vector of an upserted row, None for a removal
+        """
+        row_id = str(row_id)
+        vector = None if vector is None else np.asarray(vector, dtype=np.float64)
+        self._apply_changes(model_name, [(None, row_id, vector)])
+
+        if self.redis is not None:
+            fields = {"row": row_id, "vector": "" if vector is None else json.dumps(vector.tolist())}
+            try:
+                self.redis.xadd(
+                    f"{REDIS_PREFIX}:changes:{model_name}", fields, maxlen=CHANGE_LOG_SIZE, approximate=False
+                )
+            except Exception as e:
+                print(f"Match cache Redis error: {str(e)}")
+
+    def _apply_changes(self, model_name: str, changes: List[tuple]):
+        """Log (stream id, row id, vector) changes and evict the local entries they affect"""
+        with self._lock:
+            log = self._changes.setdefault(model_name, deque(maxlen=CHANGE_LOG_SIZE))
+            for stream_id, row_id, vector in changes:
+                if len(log) == log.maxlen and log[0].stream_id is not None:
+                    self._stream_floor[model_name] = log[0].stream_id
+                self._change_count += 1
+                change = Change(self._change_count, stream_id, row_id, None if vector is None else _unit(vector)[0])
+                log.append(change)
+                evicted = [
+                    key for key, (_, value, name, query_vector, top_n) in self._entries.items()
+                    if name == model_name and self._affected(query_vector, top_n, value, change)
+                ]
+                for key in evicted:
+                    del self._entries[key]
+                self.stats["evictions"] += len(evicted)
+
+    def _sync(self, model_name: str):
+        """Read the generation and new row changes of a model from Redis, if due"""
+        if self.redis is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._next_sync.get(model_name, 0.0) > now:
+                return
+            self._next_sync[model_name] = now + self.sync_interval
+            position = self._stream_pos.get(model_name)
+
+        stream = f"{REDIS_PREFIX}:changes:{model_name}"
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            pipeline.get(f"{REDIS_PREFIX}:gen:{model_name}")
+            pipeline.xlen(stream)
+            pipeline.xrange(stream, count=1)
+            if position is None:
+                pipeline.xrevrange(stream, count=1)
+            else:
+                pipeline.xrange(stream, min=f"({position[0]}-{position[1]}")
+            generation, length, oldest, entries = pipeline.execute()
+        except Exception as e:
+            print(f"Match cache Redis error: {str(e)}")
+            return
+
+        generation = int(generation or 0)
+        if position is None:
+            # First read: start after the newest change, the local cache is empty of them anyway
+            with self._lock:
+                self._generations[model_name] = generation
+                self._stream_pos[model_name] = _stream_id(entries[0][0]) if entries else (0, 0)
+                self._stream_floor[model_name] = self._stream_pos[model_name]
+            return
+
+        # The stream is trimmed to exactly CHANGE_LOG_SIZE: once full, changes
+        # past this worker's position may have been dropped unread
+        trimmed = length >= CHANGE_LOG_SIZE and bool(oldest) and _stream_id(oldest[0][0]) > position
+        if generation != self._generations.get(model_name, 0) or trimmed:
+            # Invalidated elsewhere, or changes were lost: nothing local can be trusted
+            self._drop_local(model_name)
+        changes = []
+        for raw_id, fields in entries:
+            fields = {
+                (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+                for k, v in fields.items()
+            }
+            vector = np.array(json.loads(fields["vector"])) if fields["vector"] else None
+            changes.append((_stream_id(raw_id), fields["row"], vector))
+        self._apply_changes(model_name, changes)
+        with self._lock:
+            self._generations[model_name] = generation
+            if changes:
+                self._stream_pos[model_name] = changes[-1][0]
+
+    def _drop_local(self, model_name: str):
+        """Drop every local entry of a model, and log it so results computed meanwhile are not stored"""
+        self._apply_changes(model_name, [(None, None, None)])
+        with self._lock:
+            self._stream_floor[model_name] = self._stream_pos.get(model_name, (0, 0))
+
+    def invalidate(self, model_name: Optional[str] = None):
+        """
+        Make every cached result of a model (or of all models) unreachable
+
+        Drops the local entries of that model and, with Redis, bumps its
+        generation so other workers drop theirs and ignore the shared ones.
+        """
+        names = [model_name] if model_name else sorted(set(self._generations) | {'knn', 'similarity'})
+        for name in names:
+            self._drop_local(name)
+        with self._lock:
+            self.stats["invalidations"] += 1
+
+        if self.redis is not None:
+            try:
+                for name in names:
+                    generation = int(self.redis.incr(f"{REDIS_PREFIX}:gen:{name}"))
+                    with self._lock:
+                        self._generations[name] = generation
+            except Exception as e:
+                print(f"Match cache Redis error: {str(e)}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and size, for the models endpoint"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["redis_hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": (self.stats["hits"] + self.stats["redis_hits"]) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "redis": self.redis is not None,
+            }
+
+
+def _redis_client() -> Any:
+    """Redis client for the shared tier, or None when disabled or unreachable"""
+    if not settings.MATCH_CACHE_REDIS:
+        return None
+    try:
+        import redis
+        client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, socket_timeout=0.05)
+        client.ping()
+        print(f"Match cache Redis tier at {settings.REDIS_HOST}:{settings.REDIS_PORT}")
+        return client
+    except Exception as e:
+        print(f"Warning: Match cache Redis tier disabled: {str(e)}")
+        return None
+
+
+result_cache = MatchResultCache(
+    max_entries=settings.MATCH_CACHE_SIZE,
+    ttl=settings.MATCH_CACHE_TTL,
+    redis_client=_redis_client(),
+    sync_interval=settings.MATCH_CACHE_SYNC_INTERVAL,
+)
@@ -0,0 +1,225 @@
+
+"""
+Process-pool scoring of large similarity indexes.
+
+The base matrix of a SimilarityIndex is copied once into a shared memory
+segment. Worker processes map that segment read-only, so a search only
+ships the query block and the shard bounds to each worker, never the
+matrix. Every worker scores its shard and returns a local top-k; the
+parent merges the n_workers * k candidates into the final top-k.
+"""
+import argparse
+import multiprocessing
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+# Segments a worker keeps mapped; older ones belong to replaced indexes
+_WORKER_SEGMENT_CACHE = 4
+_worker_segments: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+def _segment_arrays(segment: shared_memory.SharedMemory, shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """View a segment as the float32 matrix followed by its row nonzero mask"""
+    matrix = np.ndarray(shape, dtype=np.float32, buffer=segment.buf)
+    nonzero = np.ndarray(shape[0], dtype=bool, buffer=segment.buf, offset=matrix.nbytes)
+    return matrix, nonzero
+
+
+def _worker_arrays(name: str, shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Map a published matrix in a worker, reusing the mapping across tasks"""
+    cached = _worker_segments.get(name)
+    if cached is not None:
+        _worker_segments.move_to_end(name)
+        return cached[1]
+
+    segment = shared_memory.SharedMemory(name=name)
+    arrays = _segment_arrays(segment, shape)
+    _worker_segments[name] = (segment, arrays)
+    while len(_worker_segments) > _WORKER_SEGMENT_CACHE:
+        _, (old_segment, _) = _worker_segments.popitem(last=False)
+        old_segment.close()
+    return arrays
+
+
+def _score_shard(name: str, shape: Tuple[int, int], start: int, stop: int,
+                 queries: np.ndarray, k: int, skip: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score one shard of a published matrix and keep its local top-k
+
+    Args:
+        name: Shared memory segment holding the L2-normalized matrix and
+            its nonzero row mask
+        shape: Shape of the full matrix
+        start: First row of the shard
+        stop: Row after the last row of the shard
+        queries: L2-normalized query block, zero rows for zero queries
+        k: Number of results kept per query
+        skip: Shard-relative rows that must not be returned (tombstones)
+
+    Returns:
+        Tuple of (rows, scores) of shape (n_queries, min(k, shard rows)),
+        rows being global matrix rows, unordered
+    """
+    matrix, nonzero = _worker_arrays(name, shape)
+    scores = (queries @ matrix[start:stop].T + 1) / 2
+    # Zero rows and zero queries have no direction and score 0, like the
+    # inline SimilarityIndex path
+    scores[:, ~nonzero[start:stop]] = 0.0
+    scores[~queries.any(axis=1)] = 0.0
+    scores[:, skip] = -np.inf
+
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    return top + start, top_scores
+
+
+class ShardedScoringPool:
+    """
+    ProcessPoolExecutor that scores SimilarityIndex base matrices in shards.
+
+    Each index is published to shared memory on its first search and the
+    segment is released when the index object is garbage collected, so
+    reloads and compactions do not leak segments. Indexes smaller than
+    `min_rows` are not worth the inter-process round trip and should be
+    scored inline by the caller.
+    """
+
+    def __init__(self, n_workers: int, min_rows: int = 0):
+        self.n_workers = max(1, n_workers)
+        self.min_rows = min_rows
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._published: Dict[int, Tuple[shared_memory.SharedMemory, Tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: the API process runs background threads, which fork
+            # would copy in an undefined state
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.n_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _publish(self, index: Any) -> Tuple[str, Tuple[int, int]]:
+        """Copy an index's base matrix into shared memory once"""
+        key = id(index)
+        with self._lock:
+            published = self._published.get(key)
+            if published is None:
+                matrix = np.asarray(index.matrix, dtype=np.float32)
+                segment = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes + len(matrix), 1))
+                shared_matrix, shared_nonzero = _segment_arrays(segment, matrix.shape)
+                shared_matrix[:] = matrix
+                shared_nonzero[:] = index.nonzero
+                published = (segment, matrix.shape)
+                self._published[key] = published
+                weakref.finalize(index, self._release, key)
+            segment, shape = published
+            return segment.name, shape
+
+    def _release(self, key: int):
+        with self._lock:
+            published = self._published.pop(key, None)
+        if published is not None:
+            published[0].close()
+            published[0].unlink()
+
+    def top_k(self, index: Any, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k base rows of an index for a block of normalized queries
+
+        Args:
+            index: SimilarityIndex whose base matrix is scored
+            queries: L2-normalized queries, zero rows for zero queries
+            k: Number of results per query
+
+        Returns:
+            Tuple of (rows, scores) with up to n_workers * k candidates per
+            query, unordered; tombstoned rows score -inf
+        """
+        name, shape = self._publish(index)
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        alive = index.alive.copy()
+        bounds = np.linspace(0, shape[0], self.n_workers + 1, dtype=np.int64)
+
+        executor = self._get_executor()
+        futures = [
+            executor.submit(
+                _score_shard, name, shape, int(start), int(stop), queries, k,
+                np.flatnonzero(~alive[start:stop]),
+            )
+            for start, stop in zip(bounds[:-1], bounds[1:])
+            if stop > start
+        ]
+        results = [future.result() for future in futures]
+        rows = np.hstack([r for r, _ in results])
+        scores = np.hstack([s for _, s in results])
+        return rows, scores
+
+    def shutdown(self):
+        """Stop the workers and release every published segment"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for key in list(self._published):
+            self._release(key)
+
+
+def benchmark(rows: int, dims: int, queries: int, k: int, workers: List[int]) -> List[Dict[str, float]]:
+    """
+    Time unfiltered searches inline and through pools of various sizes
+
+    Returns:
+        One dict per configuration with workers (0 for inline), latency_ms
+        and speedup over the inline search
+    """
+    from app.ml.vector_index import SimilarityIndex
+
+    rng = np.random.default_rng(0)
+    index = SimilarityIndex(np.arange(rows).astype(str), rng.standard_normal((rows, dims)))
+    query_block = rng.standard_normal((queries, dims)).astype(np.float32)
+
+    def timed(pool: Optional[ShardedScoringPool]) -> float:
+        index.search_batch(query_block, k, pool=pool)  # warm up, publishes the matrix
+        start = time.perf_counter()
+        for _ in range(3):
+            index.search_batch(query_block, k, pool=pool)
+        return (time.perf_counter() - start) / 3 * 1000
+
+    baseline = timed(None)
+    report = [{"workers": 0, "latency_ms": baseline, "speedup": 1.0}]
+    for n_workers in workers:
+        pool = ShardedScoringPool(n_workers)
+        try:
+            latency = timed(pool)
+        finally:
+            pool.shutdown()
+        report.append({"workers": n_workers, "latency_ms": latency, "speedup": baseline / latency})
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded scoring speedup vs. worker count")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dims", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print(f"Sharded scoring: {args.rows} rows, {args.dims} dims, {args.queries} queries, "
+          f"{multiprocessing.cpu_count()} cores")
+    print("Set OPENBLAS_NUM_THREADS=1 for a single-core inline baseline")
+    for row in benchmark(args.rows, args.dims, args.queries, args.k, args.workers):
+        label = "inline" if row["workers"] == 0 else f"{row['workers']} workers"
+        print(f"{label:>10}  latency={row['latency_ms']:.1f} ms  speedup={row['speedup']:.2f}x")
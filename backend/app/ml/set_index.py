@@ -0,0 +1,311 @@
+
+"""
+MinHash / LSH index for set-valued profile attributes.
+
+Array columns such as PlayerProfile.skills or AgentProfile.languages are
+turned into token sets ('<column>:<value>', lower-cased) and summarized by
+MinHash signatures, whose agreement rate estimates Jaccard similarity.
+Signatures are split into bands; rows sharing any band are candidates, so a
+lookup only scores the rows in the query's buckets instead of the whole
+table. Indexes are persisted as pickle-free .npz files under
+settings.MODEL_ARTIFACT_DIR/minhash/.
+"""
+import argparse
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.agent import AgentProfile
+from app.models.coach import CoachProfile
+from app.models.player import PlayerProfile
+
+# Index name -> (model, array columns whose values form each row's set)
+SET_ATTRIBUTES = {
+    'player_skills': (PlayerProfile, ('skills',)),
+    'agent_coverage': (AgentProfile, ('languages', 'regions_of_operation')),
+    'coach_credentials': (CoachProfile, ('certifications', 'preferred_formations')),
+}
+
+# Mersenne prime 2^31 - 1 for the (a * x + b) mod p hash family
+_PRIME = np.int64(2 ** 31 - 1)
+# Signature value of an empty set, never produced by a real hash
+_EMPTY = np.uint32(2 ** 32 - 1)
+
+
+def set_tokens(values_by_column: Dict[str, Optional[Iterable[str]]]) -> set:
+    """
+    Token set of one row
+
+    Args:
+        values_by_column: Column name to the values of that column
+
+    Returns:
+        Set of '<column>:<value>' tokens, lower-cased
+    """
+    return {
+        f"{column}:{str(value).strip().lower()}"
+        for column, values in values_by_column.items()
+        for value in (values if values is not None else [])
+        if str(value).strip()
+    }
+
+
+class MinHashLSH:
+    """
+    MinHash signatures with banded LSH buckets.
+
+    With `bands` bands of num_perm / bands rows, two sets become candidates
+    with probability 1 - (1 - J^r)^b for Jaccard similarity J; the defaults
+    (128 permutations, 32 bands of 4) start to match around J = 0.4.
+    Buckets are kept as one sorted key array per band, so a lookup is a
+    binary search per band.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, size=num_perm, dtype=np.int64)
+        self.b = rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+        # Odd multipliers folding the rows of a band into one 64-bit key
+        self.band_mix = rng.integers(1, 2 ** 63, size=num_perm // bands, dtype=np.uint64) | np.uint64(1)
+
+        self.ids = np.zeros(0, dtype=str)
+        self.signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self.band_keys = np.zeros((bands, 0), dtype=np.uint64)
+        self.band_rows = np.zeros((bands, 0), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _token_hashes(tokens: Iterable[str]) -> np.ndarray:
+        # crc32 rather than hash(): signatures must be stable across processes
+        return np.fromiter(
+            (zlib.crc32(token.encode()) for token in set(tokens)), dtype=np.int64
+        ) % _PRIME
+
+    def signature_matrix(self, token_sets: List[Iterable[str]], chunk_rows: int = 2048) -> np.ndarray:
+        """
+        MinHash signatures of many token sets
+
+        Args:
+            token_sets: One token set per row
+            chunk_rows: Rows hashed per vectorized step
+
+        Returns:
+            (n_rows, num_perm) uint32 matrix; empty sets get _EMPTY everywhere
+        """
+        hashes = [self._token_hashes(tokens) for tokens in token_sets]
+        signatures = np.full((len(hashes), self.num_perm), _EMPTY, dtype=np.uint32)
+        nonempty = [row for row, h in enumerate(hashes) if len(h)]
+
+        for start in range(0, len(nonempty), chunk_rows):
+            rows = nonempty[start:start + chunk_rows]
+            tokens = np.concatenate([hashes[row] for row in rows])
+            starts = np.cumsum([0] + [len(hashes[row]) for row in rows[:-1]])
+            permuted = (tokens[:, None] * self.a + self.b) % _PRIME
+            signatures[rows] = np.minimum.reduceat(permuted, starts, axis=0)
+        return signatures
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """(bands, n_rows) bucket keys of signature rows"""
+        r = self.num_perm // self.bands
+        bands = signatures.astype(np.uint64).reshape(len(signatures), self.bands, r)
+        return (bands * self.band_mix).sum(axis=2, dtype=np.uint64).T
+
+    def fit(self, ids: List[str], token_sets: List[Iterable[str]]) -> "MinHashLSH":
+        """
+        Build the index
+
+        Args:
+            ids: Id of each row
+            token_sets: Token set of each row, see set_tokens()
+
+        Returns:
+            self
+        """
+        self.ids = np.asarray([str(i) for i in ids], dtype=str)
+        self.signatures = self.signature_matrix(token_sets)
+        keys = self._band_keys(self.signatures)
+        self.band_rows = np.argsort(keys, axis=1, kind="stable")
+        self.band_keys = np.take_along_axis(keys, self.band_rows, axis=1)
+        return self
+
+    def candidates(self, signature: np.ndarray) -> np.ndarray:
+        """Rows sharing at least one band bucket with a signature"""
+        query_keys = self._band_keys(signature.reshape(1, -1))[:, 0]
+        found = []
+        for band in range(self.bands):
+            keys = self.band_keys[band]
+            lo = np.searchsorted(keys, query_keys[band], side="left")
+            hi = np.searchsorted(keys, query_keys[band], side="right")
+            if hi > lo:
+                found.append(self.band_rows[band, lo:hi])
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def query(self, tokens: Iterable[str], top_n: int = 10,
+              min_similarity: float = 0.0, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Find the rows whose sets are most similar to a token set
+
+        Args:
+            tokens: Query token set, see set_tokens()
+            top_n: Number of results to return
+            min_similarity: Minimum estimated Jaccard similarity
+            exclude: Optional id left out of the results, e.g. the query row
+
+        Returns:
+            List of (id, estimated Jaccard similarity), most similar first
+        """
+        signature = self.signature_matrix([tokens])[0]
+        if (signature == _EMPTY).all() or len(self) == 0:
+            return []
+
+        rows = self.candidates(signature)
+        if exclude is not None:
+            rows = rows[self.ids[rows] != str(exclude)]
+        if len(rows) == 0:
+            return []
+
+        similarity = (self.signatures[rows] == signature).mean(axis=1)
+        keep = similarity >= min_similarity
+        rows, similarity = rows[keep], similarity[keep]
+        order = np.argsort(-similarity, kind="stable")[:top_n]
+        return [(str(self.ids[rows[i]]), float(similarity[i])) for i in order]
+
+    def save(self, path: str) -> None:
+        """Persist the index as a pickle-free .npz archive, replaced atomically"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            params=np.array([self.num_perm, self.bands, self.seed]),
+            ids=self.ids,
+            signatures=self.signatures,
+            band_keys=self.band_keys,
+            band_rows=self.band_rows,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "MinHashLSH":
+        with np.load(path, allow_pickle=False) as data:
+            num_perm, bands, seed = (int(v) for v in data["params"])
+            index = cls(num_perm=num_perm, bands=bands, seed=seed)
+            index.ids = data["ids"]
+            index.signatures = data["signatures"]
+            index.band_keys = data["band_keys"]
+            index.band_rows = data["band_rows"]
+        return index
+
+
+def set_index_path(name: str) -> str:
+    return os.path.join(settings.MODEL_ARTIFACT_DIR, "minhash", f"{name}.npz")
+
+
+def build_set_index(db: Session, name: str, batch_size: int = 5000) -> MinHashLSH:
+    """
+    Build a set index from the database with one streaming query
+
+    Args:
+        db: Database session
+        name: Key of SET_ATTRIBUTES
+        batch_size: Number of rows fetched per round-trip
+
+    Returns:
+        Fitted MinHashLSH keyed by profile id
+    """
+    model, columns = SET_ATTRIBUTES[name]
+    query = db.query(model.id, *(getattr(model, column) for column in columns)).yield_per(batch_size)
+
+    ids, token_sets = [], []
+    for row in query:
+        ids.append(str(row.id))
+        token_sets.append(set_tokens({column: getattr(row, column) for column in columns}))
+    return MinHashLSH(num_perm=settings.MINHASH_NUM_PERM, bands=settings.MINHASH_BANDS).fit(ids, token_sets)
+
+
+class SetIndexStore:
+    """
+    In-memory cache of the set indexes, backed by their persisted files.
+
+    An index is rebuilt from the database (and saved) when neither the
+    cached copy nor the file on disk is younger than `ttl` seconds, or
+    after invalidate().
+    """
+
+    def __init__(self, ttl: int = 3600, batch_size: int = 5000):
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self._indexes: Dict[str, Tuple[float, MinHashLSH]] = {}
+        self._stale: set = set()
+        self._lock = threading.Lock()
+
+    def _fresh(self, loaded_at: float) -> bool:
+        return time.time() - loaded_at < self.ttl
+
+    def get(self, db: Session, name: str) -> MinHashLSH:
+        """Return the named index, loading or rebuilding it if stale"""
+        cached = self._indexes.get(name)
+        if cached is not None and self._fresh(cached[0]):
+            return cached[1]
+
+        with self._lock:
+            cached = self._indexes.get(name)
+            if cached is not None and self._fresh(cached[0]):
+                return cached[1]
+
+            path = set_index_path(name)
+            if name not in self._stale and os.path.exists(path) and self._fresh(os.path.getmtime(path)):
+                index, built_at = MinHashLSH.load(path), os.path.getmtime(path)
+            else:
+                index, built_at = build_set_index(db, name, self.batch_size), time.time()
+                try:
+                    index.save(path)
+                except OSError as e:
+                    print(f"Error saving set index {name}: {str(e)}")
+                print(f"Set index {name} built: {len(index)} rows")
+                self._stale.discard(name)
+            self._indexes[name] = (built_at, index)
+            return index
+
+    def invalidate(self, name: Optional[str] = None):
+        """Force a rebuild of one or all indexes on the next get()"""
+        with self._lock:
+            names = [name] if name else list(SET_ATTRIBUTES)
+            for key in names:
+                self._indexes.pop(key, None)
+            self._stale.update(names)
+
+
+set_index_store = SetIndexStore(ttl=settings.SET_INDEX_TTL, batch_size=settings.FEATURE_STORE_BATCH_SIZE)
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Build and persist the MinHash set indexes")
+    parser.add_argument("names", nargs="*", default=list(SET_ATTRIBUTES), help="Indexes to build")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        for name in args.names:
+            start = time.perf_counter()
+            index = build_set_index(db, name, settings.FEATURE_STORE_BATCH_SIZE)
+            index.save(set_index_path(name))
+            print(f"{name}: {len(index)} rows -> {set_index_path(name)} "
+                  f"in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
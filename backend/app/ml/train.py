@@ -0,0 +1,243 @@
+
+"""
+Offline training of the KNN and similarity models from the database.
+
+Player profiles are streamed twice with yield_per inside one REPEATABLE READ
+transaction, so both passes see the same rows:
+
+    1. schema  - count the rows and collect the feature columns
+    2. stream  - write each chunk's raw features straight into the memory-mapped
+                 similarity vectors file and partial_fit the StandardScaler
+    3. scale   - chunk by chunk, write the scaled rows to the KNN vectors file
+                 and scale and L2-normalize the similarity rows in place
+    4. index   - optionally build and save the IVF index over the KNN vectors,
+                 grouping the rows by cell in a memory-mapped scratch file
+    5. publish - write both manifests, which makes the new version visible to
+                 the model watcher
+
+Only one chunk of rows is ever held in memory besides the column list; the
+matrices live in the artifact files. Missing values are 0, as in
+ModelRegistry._preprocess_features. Run with:
+
+    python -m app.ml.train --batch-size 5000 --ivf
+"""
+import argparse
+import contextlib
+import os
+import resource
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.ml.ann_index import IVFIndex
+from app.ml.artifacts import artifact_path, create_version, new_version, write_manifest
+from app.ml.feature_store import BASE_COLUMNS, SKILL_PREFIX, flatten_stats
+from app.models.player import PlayerProfile
+
+
+class StageTimer:
+    """Wall-clock time of each named stage, printed as it finishes"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        yield
+        self.timings[name] = time.perf_counter() - start
+        print(f"[train] {name}: {self.timings[name]:.2f}s")
+
+
+def _stream_rows(db: Session, batch_size: int):
+    return db.query(
+        PlayerProfile.id,
+        PlayerProfile.height,
+        PlayerProfile.weight,
+        PlayerProfile.age,
+        PlayerProfile.market_value,
+        PlayerProfile.stats,
+        PlayerProfile.skills,
+    ).order_by(PlayerProfile.id).yield_per(batch_size)
+
+
+def _extra_features(row: Any) -> Dict[str, float]:
+    """Flattened stats and one-hot skills of one row, as in load_player_features"""
+    features = flatten_stats(row.stats)
+    features.update({f"{SKILL_PREFIX}{skill}": 1.0 for skill in row.skills or []})
+    return features
+
+
+def scan_schema(db: Session, batch_size: int) -> Tuple[int, int, List[str]]:
+    """
+    First pass: size the output
+
+    Returns:
+        Tuple of (row count, longest id length, feature columns)
+    """
+    n_rows, id_width, extra = 0, 1, set()
+    for row in _stream_rows(db, batch_size):
+        n_rows += 1
+        id_width = max(id_width, len(str(row.id)))
+        extra.update(name for name in _extra_features(row) if name not in BASE_COLUMNS)
+    return n_rows, id_width, BASE_COLUMNS + sorted(extra)
+
+
+def _chunks(db: Session, batch_size: int, columns: List[str]) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """Second pass: (ids, dense float32 feature matrix) per chunk of rows"""
+    column_index = {name: i for i, name in enumerate(columns)}
+    ids: List[str] = []
+    chunk = np.zeros((batch_size, len(columns)), dtype=np.float32)
+
+    for row in _stream_rows(db, batch_size):
+        i = len(ids)
+        ids.append(str(row.id))
+        for j, column in enumerate(BASE_COLUMNS):
+            value = getattr(row, column)
+            if value is not None:
+                chunk[i, j] = value
+        for name, value in _extra_features(row).items():
+            j = column_index.get(name)
+            if j is not None and name not in BASE_COLUMNS:
+                chunk[i, j] = value
+        if len(ids) == batch_size:
+            yield ids, chunk
+            ids, chunk = [], np.zeros((batch_size, len(columns)), dtype=np.float32)
+    if ids:
+        yield ids, chunk[:len(ids)]
+
+
+def _open_arrays(artifact_dir: str, model_name: str, version: str, n_rows: int,
+                 n_features: int, id_width: int) -> Tuple[Dict[str, str], np.memmap, np.memmap]:
+    """Create the .npy files of a new model version, memory-mapped for writing"""
+    directory = artifact_path(artifact_dir, model_name)
+    files = create_version(artifact_dir, model_name, version)
+    vectors = np.lib.format.open_memmap(
+        os.path.join(directory, files["vectors"]), mode="w+", dtype=np.float32, shape=(n_rows, n_features)
+    )
+    ids = np.lib.format.open_memmap(
+        os.path.join(directory, files["ids"]), mode="w+", dtype=f"<U{id_width}", shape=(n_rows,)
+    )
+    return files, vectors, ids
+
+
+def train_models(db: Session, artifact_dir: str, batch_size: int = 5000, build_ivf: bool = False,
+                 version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Train and publish the KNN and similarity models from every player profile
+
+    Args:
+        db: Database session, used for one read-only transaction
+        artifact_dir: Root directory for model artifacts
+        batch_size: Rows fetched and processed per chunk
+        build_ivf: Also build the IVF index and save it to settings.ANN_INDEX_PATH
+        version: Model version, defaults to new_version()
+
+    Returns:
+        Dict with the version, row and feature counts and the per-stage timings
+
+    Raises:
+        RuntimeError: If the table changed between the two passes
+        FileExistsError: If the version was already written
+    """
+    version = version or new_version()
+    timer = StageTimer()
+    if db.get_bind().dialect.name == "postgresql":
+        # Both passes must see the same snapshot of the table
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    with timer.stage("schema"):
+        n_rows, id_width, columns = scan_schema(db, batch_size)
+    print(f"[train] {n_rows} players, {len(columns)} features")
+    if n_rows == 0:
+        raise RuntimeError("No player profiles to train on")
+
+    knn_files, knn_vectors, knn_ids = _open_arrays(artifact_dir, 'knn', version, n_rows, len(columns), id_width)
+    sim_files, sim_vectors, sim_ids = _open_arrays(
+        artifact_dir, 'similarity', version, n_rows, len(columns), id_width
+    )
+
+    scaler = StandardScaler()
+    with timer.stage("stream"):
+        written = 0
+        for ids, chunk in _chunks(db, batch_size, columns):
+            if written + len(ids) > n_rows:
+                raise RuntimeError("Player profiles changed while training")
+            rows = slice(written, written + len(ids))
+            sim_vectors[rows] = chunk
+            knn_ids[rows] = sim_ids[rows] = ids
+            scaler.partial_fit(chunk)
+            written += len(ids)
+        if written != n_rows:
+            raise RuntimeError("Player profiles changed while training")
+
+    with timer.stage("scale"):
+        for start in range(0, n_rows, batch_size):
+            rows = slice(start, start + batch_size)
+            scaled = scaler.transform(np.asarray(sim_vectors[rows]))
+            knn_vectors[rows] = scaled
+            # Cosine over standardized features, so no single large-valued
+            # column (height, market value) dominates the angle
+            norms = np.linalg.norm(scaled, axis=1, keepdims=True)
+            sim_vectors[rows] = scaled / np.where(norms > 0, norms, 1)
+        for array in (knn_vectors, knn_ids, sim_vectors, sim_ids):
+            array.flush()
+
+    if build_ivf:
+        with timer.stage("index"):
+            scratch = os.path.join(artifact_path(artifact_dir, 'knn'), f"ivf-{version}.npy")
+            try:
+                index = IVFIndex(n_lists=settings.ANN_N_LISTS, n_probe=settings.ANN_N_PROBE).fit(
+                    knn_vectors, vectors_path=scratch, chunk_size=batch_size
+                )
+                os.makedirs(os.path.dirname(settings.ANN_INDEX_PATH) or ".", exist_ok=True)
+                index.save(settings.ANN_INDEX_PATH)
+                del index
+            finally:
+                if os.path.exists(scratch):
+                    os.remove(scratch)
+
+    with timer.stage("publish"):
+        del knn_vectors, knn_ids, sim_vectors, sim_ids
+        write_manifest(
+            artifact_dir, 'knn', version=version, files=knn_files, feature_names=columns,
+            metric="euclidean", n_rows=n_rows, n_features=len(columns), scaler=scaler,
+            keep_versions=settings.MODEL_ARTIFACT_KEEP_VERSIONS,
+        )
+        write_manifest(
+            artifact_dir, 'similarity', version=version, files=sim_files, feature_names=columns,
+            metric="cosine", n_rows=n_rows, n_features=len(columns), scaler=scaler, normalized=True,
+            keep_versions=settings.MODEL_ARTIFACT_KEEP_VERSIONS,
+        )
+
+    return {
+        "version": version,
+        "rows": n_rows,
+        "features": len(columns),
+        "timings": timer.timings,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the KNN and similarity models from the database")
+    parser.add_argument("--batch-size", type=int, default=settings.FEATURE_STORE_BATCH_SIZE)
+    parser.add_argument("--output-dir", default=settings.MODEL_ARTIFACT_DIR)
+    parser.add_argument("--version", default=None)
+    parser.add_argument("--ivf", action="store_true", default=settings.KNN_BACKEND == 'ivf',
+                        help="Also build the IVF index (default when KNN_BACKEND=ivf)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        result = train_models(db, args.output_dir, batch_size=args.batch_size,
+                              build_ivf=args.ivf, version=args.version)
+    finally:
+        db.close()
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Trained version {result['version']}: {result['rows']} players x {result['features']} features "
+          f"in {time.perf_counter() - start:.1f}s, peak RSS {peak_mb:.0f} MB")
@@ -0,0 +1,380 @@
+
+import threading
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import numpy as np
+
+from app.ml.quantization import QuantizedMatrix
+
+# Maps the ids of the delta rows to a boolean mask of the rows to keep
+DeltaFilter = Callable[[np.ndarray], np.ndarray]
+
+
+class SimilarityIndex:
+    """
+    Cosine similarity index over a set of user feature vectors.
+
+    Vectors are held as one contiguous float32 matrix whose rows are
+    L2-normalized at build time, next to an array with the id of each row,
+    so scoring a query is a single matrix-vector product.
+
+    The base matrix is never written to (it may be a read-only memory map).
+    Incremental changes go to a small in-memory delta segment instead: an
+    upsert tombstones the user's base row and appends the new vector to the
+    delta, a removal only tombstones. compacted() folds both back into a
+    single contiguous matrix.
+
+    With storage 'float16' or 'int8' the base matrix is kept as a
+    QuantizedMatrix and scored asymmetrically; the delta stays float32.
+    An already quantized matrix of unit rows can be passed in directly
+    together with its `nonzero` row mask.
+    """
+
+    def __init__(self, ids: np.ndarray, matrix: Any, normalized: bool = False,
+                 storage: str = 'float32', nonzero: Optional[np.ndarray] = None):
+        if isinstance(matrix, QuantizedMatrix):
+            self._init_quantized(ids, matrix, nonzero)
+            return
+        if normalized:
+            # Already unit rows, e.g. a memory-mapped artifact: use as-is so
+            # the pages stay shared instead of being copied into this process
+            matrix = np.asarray(matrix, dtype=np.float32)
+        else:
+            matrix = np.array(matrix, dtype=np.float32, order="C")
+        if matrix.ndim != 2 or len(ids) != matrix.shape[0]:
+            raise ValueError("ids and matrix rows must line up")
+
+        norms = np.linalg.norm(matrix, axis=1)
+        # Zero vectors have no direction; keep them as zero rows so they
+        # always score 0.0 like the original per-pair implementation
+        self.nonzero = norms > 0
+        if not normalized:
+            matrix[self.nonzero] /= norms[self.nonzero, None]
+
+        self.ids = np.asarray(ids)
+        self.storage = storage
+        self.matrix = matrix if storage == 'float32' else QuantizedMatrix.quantize(matrix, storage)
+        self._init_updates()
+
+    def _init_quantized(self, ids: np.ndarray, matrix: QuantizedMatrix, nonzero: np.ndarray):
+        if len(ids) != matrix.shape[0] or nonzero is None or len(nonzero) != matrix.shape[0]:
+            raise ValueError("ids, nonzero and matrix rows must line up")
+        self.ids = np.asarray(ids)
+        self.nonzero = np.asarray(nonzero, dtype=bool)
+        self.storage = matrix.mode
+        self.matrix = matrix
+        self._init_updates()
+
+    def _init_updates(self):
+        """Empty tombstone mask and delta segment"""
+        self.lock = threading.RLock()
+        self.alive = np.ones(len(self.ids), dtype=bool)
+        self._row_of: Optional[Dict[str, int]] = None
+        # Delta segment, replaced as a whole on every change so readers
+        # always see a consistent (ids, matrix, nonzero) triple
+        self._delta = (
+            np.zeros(0, dtype=object),
+            np.zeros((0, self.matrix.shape[1]), dtype=np.float32),
+            np.zeros(0, dtype=bool),
+        )
+        self.pending_changes = 0
+
+    @classmethod
+    def from_vectors(cls, user_vectors: Dict[str, Any], storage: str = 'float32') -> "SimilarityIndex":
+        """
+        Build an index from a mapping of user id to feature vector
+
+        Args:
+            user_vectors: Dictionary of user id to feature vector
+            storage: Base matrix storage, 'float32', 'float16' or 'int8'
+
+        Returns:
+            SimilarityIndex over the given vectors
+        """
+        ids = np.array([str(user_id) for user_id in user_vectors.keys()], dtype=str)
+        if len(ids) == 0:
+            return cls(ids, np.zeros((0, 0), dtype=np.float32))
+        matrix = np.vstack([np.asarray(v, dtype=np.float32) for v in user_vectors.values()])
+        return cls(ids, matrix, storage=storage)
+
+    def __len__(self) -> int:
+        """Number of live vectors"""
+        return int(self.alive.sum()) + len(self._delta[0])
+
+    def _base_row(self, user_id: str) -> Optional[int]:
+        if self._row_of is None:
+            # Built on the first update only; read-only indexes never pay for it
+            self._row_of = {str(user_id): row for row, user_id in enumerate(self.ids)}
+        return self._row_of.get(user_id)
+
+    def upsert(self, user_id: str, vector: np.ndarray) -> None:
+        """
+        Add a user's vector, replacing any previous one
+
+        Args:
+            user_id: Id of the user
+            vector: Raw (not normalized) feature vector
+        """
+        self.upsert_many([user_id], np.asarray(vector).reshape(1, -1))
+
+    def upsert_many(self, user_ids: List[str], vectors: np.ndarray) -> None:
+        """
+        Add many users' vectors in one delta update, replacing any previous ones
+
+        Args:
+            user_ids: Ids of the users; the last row of a repeated id wins
+            vectors: Raw (not normalized) feature vectors, one row per id
+        """
+        user_ids = np.asarray([str(user_id) for user_id in user_ids], dtype=object)
+        vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+        if len(user_ids) != vectors.shape[0]:
+            raise ValueError("user_ids and vectors rows must line up")
+        if len(user_ids) == 0:
+            return
+        # Keep the last occurrence of each id
+        _, last = np.unique(user_ids[::-1], return_index=True)
+        keep_rows = np.sort(len(user_ids) - 1 - last)
+        user_ids, vectors = user_ids[keep_rows], vectors[keep_rows]
+        norms = np.linalg.norm(vectors, axis=1)
+        nonzero = norms > 0
+        vectors[nonzero] /= norms[nonzero, None]
+
+        with self.lock:
+            delta_ids, delta_matrix, delta_nonzero = self._delta
+            if delta_matrix.shape[1] != vectors.shape[1]:
+                if len(delta_ids) or len(self.ids):
+                    raise ValueError(f"Expected {delta_matrix.shape[1]} features, got {vectors.shape[1]}")
+                # First vector of an empty index decides the dimension
+                delta_matrix = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+                self.matrix = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+
+            for user_id in user_ids:
+                row = self._base_row(user_id)
+                if row is not None:
+                    self.alive[row] = False
+
+            keep = ~np.isin(delta_ids, user_ids)
+            self._delta = (
+                np.concatenate([delta_ids[keep], user_ids]),
+                np.vstack([delta_matrix[keep], vectors]),
+                np.concatenate([delta_nonzero[keep], nonzero]),
+            )
+            self.pending_changes += len(user_ids)
+
+    def remove(self, user_id: str) -> bool:
+        """
+        Tombstone a user's vector
+
+        Args:
+            user_id: Id of the user
+
+        Returns:
+            True if the user was in the index
+        """
+        with self.lock:
+            found = False
+            row = self._base_row(user_id)
+            if row is not None and self.alive[row]:
+                self.alive[row] = False
+                found = True
+
+            delta_ids, delta_matrix, delta_nonzero = self._delta
+            keep = delta_ids != user_id
+            if not keep.all():
+                self._delta = (delta_ids[keep], delta_matrix[keep], delta_nonzero[keep])
+                found = True
+
+            if found:
+                self.pending_changes += 1
+            return found
+
+    def compacted(self) -> "SimilarityIndex":
+        """
+        Build a new index with tombstones dropped and the delta merged in
+
+        Callers should hold `lock` until the new index replaces this one, so
+        no update lands on the old index after it was copied.
+        """
+        delta_ids, delta_matrix, delta_nonzero = self._delta
+        ids = np.concatenate([self.ids[self.alive].astype(str), delta_ids.astype(str)])
+        base = self.matrix[self.alive]
+        if isinstance(base, QuantizedMatrix):
+            # Keep the stored codes: requantizing dequantized rows would add
+            # error again on every compaction
+            nonzero = np.concatenate([self.nonzero[self.alive], delta_nonzero])
+            return SimilarityIndex(ids, base.append(delta_matrix), nonzero=nonzero)
+        matrix = np.vstack([base, delta_matrix])
+        return SimilarityIndex(ids, matrix, normalized=True, storage=self.storage)
+
+    def _candidates(self, base_mask: Optional[np.ndarray], delta_filter: Optional[DeltaFilter]) -> tuple:
+        """
+        Select the rows a search scores
+
+        Returns:
+            Tuple of (base_rows, delta) where base_rows is None when every base
+            row is scored (tombstones are then masked out after scoring) and
+            delta is the (ids, matrix, nonzero) triple restricted by delta_filter
+        """
+        delta = self._delta
+        if delta_filter is not None:
+            delta_mask = delta_filter(delta[0])
+            delta = tuple(part[delta_mask] for part in delta)
+        if base_mask is None:
+            return None, delta
+        return np.flatnonzero(base_mask & self.alive), delta
+
+    def _scores(self, queries: np.ndarray, zero_queries: np.ndarray,
+                base_rows: Optional[np.ndarray], delta: tuple) -> np.ndarray:
+        """
+        Score normalized queries against the candidate rows
+
+        Returns:
+            Score matrix whose columns are the base candidates followed by the
+            delta rows; tombstoned rows score -inf
+        """
+        delta_ids, delta_matrix, delta_nonzero = delta
+        if base_rows is None:
+            base_matrix, base_nonzero = self.matrix, self.nonzero
+        else:
+            # Filtered search: gather only the candidate rows, so the product
+            # shrinks with the filter's selectivity
+            base_matrix, base_nonzero = self.matrix[base_rows], self.nonzero[base_rows]
+
+        if isinstance(base_matrix, QuantizedMatrix):
+            scores = base_matrix.dot(queries)
+        else:
+            scores = queries @ base_matrix.T
+        if len(delta_ids):
+            scores = np.hstack([scores, queries @ delta_matrix.T])
+        scores = (scores + 1) / 2
+
+        nonzero = np.concatenate([base_nonzero, delta_nonzero])
+        scores[:, ~nonzero] = 0.0
+        scores[zero_queries] = 0.0
+        if base_rows is None:
+            scores[:, :len(self.ids)][:, ~self.alive] = -np.inf
+        return scores
+
+    def _ids_at(self, positions: np.ndarray, base_rows: Optional[np.ndarray], delta_ids: np.ndarray) -> np.ndarray:
+        """Map score columns back to user ids"""
+        n_base = len(self.ids) if base_rows is None else len(base_rows)
+        in_base = positions < n_base
+        rows = positions[in_base] if base_rows is None else base_rows[positions[in_base]]
+        ids = np.empty(positions.shape, dtype=object)
+        ids[in_base] = self.ids[rows]
+        ids[~in_base] = delta_ids[positions[~in_base] - n_base]
+        return ids
+
+    def search(self, query: np.ndarray, top_n: int, base_mask: Optional[np.ndarray] = None,
+               delta_filter: Optional[DeltaFilter] = None, pool: Any = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the rows most similar to a query vector
+
+        Args:
+            query: Feature vector of the query user
+            top_n: Number of results to return
+            base_mask: Optional boolean mask of base rows allowed in the results
+            delta_filter: Optional function mapping the delta ids to a boolean
+                mask of the delta rows allowed in the results
+            pool: Optional ShardedScoringPool for large unfiltered searches
+
+        Returns:
+            Tuple of (ids, scores) ordered by descending score, with scores
+            mapped from the -1:1 cosine range to 0:1
+        """
+        ids, scores = self.search_batch(
+            np.asarray(query).reshape(1, -1), top_n, base_mask=base_mask, delta_filter=delta_filter, pool=pool
+        )
+        return ids[0], scores[0]
+
+    def search_batch(
+        self, queries: np.ndarray, top_n: int, chunk_size: int = 1024,
+        base_mask: Optional[np.ndarray] = None, delta_filter: Optional[DeltaFilter] = None,
+        pool: Any = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the rows most similar to each of many query vectors
+
+        Queries are scored in chunks of `chunk_size` rows so the score matrix
+        never grows beyond chunk_size x len(self) floats. With masks, only the
+        allowed rows are scored, before top-k selection. Unfiltered searches
+        over at least pool.min_rows rows are sharded across the processes of
+        a ShardedScoringPool, with the small delta segment scored inline.
+
+        Args:
+            queries: Matrix with one query vector per row
+            top_n: Number of results to return per query
+            chunk_size: Number of queries scored per matrix-matrix product
+            base_mask: Optional boolean mask of base rows allowed in the results
+            delta_filter: Optional function mapping the delta ids to a boolean
+                mask of the delta rows allowed in the results
+            pool: Optional ShardedScoringPool for large unfiltered searches
+
+        Returns:
+            Tuple of (ids, scores) arrays of shape (n_queries, k), each row
+            ordered by descending score
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        n_queries = queries.shape[0]
+        base_rows, delta = self._candidates(base_mask, delta_filter)
+        n_candidates = (int(self.alive.sum()) if base_rows is None else len(base_rows)) + len(delta[0])
+
+        k = min(top_n, n_candidates)
+        all_ids = np.empty((n_queries, max(k, 0)), dtype=object)
+        all_scores = np.zeros((n_queries, max(k, 0)), dtype=np.float32)
+        if k <= 0 or n_queries == 0:
+            return all_ids, all_scores
+
+        norms = np.linalg.norm(queries, axis=1)
+        zero_queries = norms == 0
+        normalized = queries / np.where(zero_queries, 1, norms)[:, None]
+
+        # The pool shares a float32 copy of the base matrix, which would undo
+        # the savings of quantized storage
+        sharded = (
+            pool is not None and base_rows is None and self.storage == 'float32'
+            and len(self.ids) >= max(pool.min_rows, 1)
+        )
+
+        for start in range(0, n_queries, chunk_size):
+            chunk = normalized[start:start + chunk_size]
+            if sharded:
+                positions, scores = self._sharded_scores(pool, chunk, k, delta)
+            else:
+                scores = self._scores(chunk, zero_queries[start:start + chunk_size], base_rows, delta)
+
+            top = self._top_k_rows(scores, k)
+            all_scores[start:start + chunk_size] = np.take_along_axis(scores, top, axis=1)
+            if sharded:
+                top = np.take_along_axis(positions, top, axis=1)
+            all_ids[start:start + chunk_size] = self._ids_at(top, base_rows, delta[0])
+
+        return all_ids, all_scores
+
+    def _sharded_scores(self, pool: Any, queries: np.ndarray, k: int, delta: tuple) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Candidate columns and scores of a pool search merged with the delta rows
+
+        Returns:
+            Tuple of (positions, scores) where positions use the column
+            numbering of _scores (base rows, then delta rows)
+        """
+        positions, scores = pool.top_k(self, queries, k)
+        delta_ids, delta_matrix, delta_nonzero = delta
+        if len(delta_ids):
+            delta_scores = (queries @ delta_matrix.T + 1) / 2
+            delta_scores[:, ~delta_nonzero] = 0.0
+            delta_scores[~queries.any(axis=1)] = 0.0
+            delta_positions = np.broadcast_to(len(self.ids) + np.arange(len(delta_ids)), delta_scores.shape)
+            positions = np.hstack([positions, delta_positions])
+            scores = np.hstack([scores, delta_scores])
+        return positions, scores
+
+    @staticmethod
+    def _top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+        """Per-row indices of the k highest scores, highest first"""
+        if k < scores.shape[1]:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind="stable")
+        return np.take_along_axis(candidates, order, axis=1)
@@ -0,0 +1,13 @@
+
+# Import every model so that relationships declared by name (for example
+# PlayerProfile.experiences) resolve as soon as any one model is used.
+from app.models.user import User
+from app.models.profile import Profile
+from app.models.player import PlayerProfile
+from app.models.club import ClubProfile
+from app.models.agent import AgentProfile
+from app.models.coach import CoachProfile
+from app.models.message import Message, Notification
+from app.models.player_experience import PlayerExperience
+from app.models.player_highlight import PlayerHighlight
+from app.models.match import Match
@@ -1,6 +1,6 @@
 
 import uuid
-from sqlalchemy import Column, String, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -26,3 +26,8 @@ class ClubProfile(Base):
     
     # Relationships
     profile = relationship("Profile", back_populates="club")
+    
+    __table_args__ = (
+        # GET /api/clubs: keyset pages on (created_at, id)
+        Index("ix_club_profiles_created_at_id", "created_at", "id"),
+    )
@@ -1,6 +1,6 @@
 
 import uuid
-from sqlalchemy import Column, Float, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, String, Float, ForeignKey, DateTime, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 
@@ -12,7 +12,13 @@ class Match(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
     target_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
+    match_type = Column(String, nullable=True)
     score = Column(Float, nullable=False)
     match_data = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        # Serves the precomputed top-K read: one user's matches of a type by score
+        Index("ix_matches_user_type_score", "user_id", "match_type", score.desc()),
+    )
@@ -1,6 +1,6 @@
 
 import uuid
-from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, Text, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -17,6 +17,13 @@ class Message(Base):
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        # A conversation, newest first: one index range per direction
+        Index("ix_messages_conversation", "sender_id", "receiver_id", "created_at", "id"),
+        # Marking a conversation read only touches the unread rows
+        Index("ix_messages_unread", "receiver_id", "sender_id", postgresql_where=text("NOT is_read")),
+    )
 
 class Notification(Base):
     __tablename__ = "notifications"
@@ -26,5 +33,6 @@ class Notification(Base):
     content = Column(Text, nullable=False)
     type = Column(String, nullable=False)
     is_read = Column(Boolean, default=False)
-    metadata = Column(String, nullable=True)
+    # "metadata" is reserved on declarative classes
+    metadata_ = Column("metadata", String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
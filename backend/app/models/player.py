@@ -1,6 +1,6 @@
 
 import uuid
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, ARRAY, JSON
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, ARRAY, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -30,3 +30,10 @@ class PlayerProfile(Base):
     profile = relationship("Profile", back_populates="player")
     experiences = relationship("PlayerExperience", back_populates="player")
     highlights = relationship("PlayerHighlight", back_populates="player")
+    
+    __table_args__ = (
+        # GET /api/players?position=: one position's rows in page order
+        Index("ix_player_profiles_position_created_at_id", "position", "created_at", "id"),
+        # GET /api/players: keyset pages on (created_at, id)
+        Index("ix_player_profiles_created_at_id", "created_at", "id"),
+    )
@@ -11,7 +11,7 @@ class PlayerExperience(Base):
     __tablename__ = "player_experiences"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    player_id = Column(UUID(as_uuid=True), ForeignKey("player_profiles.id", ondelete="CASCADE"))
+    player_id = Column(UUID(as_uuid=True), ForeignKey("player_profiles.id", ondelete="CASCADE"), index=True)
     club = Column(String, nullable=False)
     position = Column(String, nullable=False)
     from_date = Column(DateTime, nullable=False)
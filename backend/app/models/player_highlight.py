@@ -11,7 +11,7 @@ class PlayerHighlight(Base):
     __tablename__ = "player_highlights"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    player_id = Column(UUID(as_uuid=True), ForeignKey("player_profiles.id", ondelete="CASCADE"))
+    player_id = Column(UUID(as_uuid=True), ForeignKey("player_profiles.id", ondelete="CASCADE"), index=True)
     title = Column(String, nullable=False)
     media_url = Column(String, nullable=False)
     media_type = Column(String, nullable=False)
@@ -1,6 +1,6 @@
 
 import uuid
-from sqlalchemy import Boolean, Column, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Boolean, Column, String, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -30,3 +30,8 @@ class User(Base):
     
     # Relationships
     profile = relationship("Profile", back_populates="user", uselist=False)
+    
+    __table_args__ = (
+        # GET /api/users: keyset pages on (created_at, id)
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
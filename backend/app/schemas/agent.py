@@ -27,3 +27,7 @@ class AgentProfileResponse(AgentProfileBase):
 
     class Config:
         orm_mode = True
+
+class SimilarAgentResponse(BaseModel):
+    agent: AgentProfileResponse
+    score: float
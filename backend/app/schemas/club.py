@@ -4,6 +4,8 @@ from pydantic import BaseModel
 import uuid
 from datetime import datetime
 
+from app.schemas.player import PlayerProfileResponse
+
 class ClubProfileBase(BaseModel):
     club_name: str
     league: Optional[str] = None
@@ -29,3 +31,7 @@ class ClubProfileResponse(ClubProfileBase):
 
     class Config:
         orm_mode = True
+
+class ClubCandidateResponse(BaseModel):
+    player: PlayerProfileResponse
+    score: float
@@ -27,3 +27,7 @@ class CoachProfileResponse(CoachProfileBase):
 
     class Config:
         orm_mode = True
+
+class SimilarCoachResponse(BaseModel):
+    coach: CoachProfileResponse
+    score: float
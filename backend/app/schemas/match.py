@@ -7,6 +7,7 @@ from datetime import datetime
 class MatchBase(BaseModel):
     user_id: uuid.UUID
     target_id: uuid.UUID
+    match_type: Optional[str] = None
     score: float = Field(..., ge=0.0, le=1.0)
     match_data: Optional[Dict[str, Any]] = None
 
@@ -24,3 +25,7 @@ class Match(MatchBase):
 class MatchList(BaseModel):
     matches: List[Match]
     total: int
+    model_version: Optional[str] = None
+
+    class Config:
+        protected_namespaces = ()
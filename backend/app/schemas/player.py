@@ -26,13 +26,18 @@ class PlayerProfileUpdate(PlayerProfileBase):
 
 class PlayerProfileResponse(PlayerProfileBase):
     id: uuid.UUID
-    profile_id: uuid.UUID
+    # None for imported players not linked to an account yet
+    profile_id: Optional[uuid.UUID] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
 
+class SimilarPlayerResponse(BaseModel):
+    player: PlayerProfileResponse
+    score: float
+
 class PlayerExperienceBase(BaseModel):
     club: str
     position: str
@@ -83,3 +88,27 @@ class PlayerHighlightResponse(PlayerHighlightBase):
 
     class Config:
         orm_mode = True
+
+class PlayerProfileExpandedResponse(PlayerProfileResponse):
+    # Only present when requested with ?expand=
+    experiences: Optional[List[PlayerExperienceResponse]] = None
+    highlights: Optional[List[PlayerHighlightResponse]] = None
+
+class PlayerImportRow(PlayerProfileBase):
+    # Rows with an id update that player, the others create one
+    id: Optional[uuid.UUID] = None
+    profile_id: Optional[uuid.UUID] = None
+    # When given, replaces the player's experiences
+    experiences: Optional[List[PlayerExperienceBase]] = None
+
+class PlayerImportError(BaseModel):
+    line: int
+    error: str
+
+class PlayerImportReport(BaseModel):
+    rows: int
+    inserted: int
+    updated: int
+    failed: int
+    errors: List[PlayerImportError]
+    errors_truncated: bool = False
@@ -13,3 +13,7 @@ class RecommendationItem(BaseModel):
 class RecommendationResponse(BaseModel):
     items: List[RecommendationItem]
     total: int
+    model_version: Optional[str] = None
+
+    class Config:
+        protected_namespaces = ()
@@ -0,0 +1,110 @@
+
+"""
+Load test for the async database layer.
+
+Fires a fixed number of requests at each concurrency level and reports
+throughput and p50/p99 latency, so one run shows whether throughput grows
+with concurrency or stays flat because requests are serialized.
+
+Two targets:
+
+    # A running API: every request is a GET with a bearer token
+    python -m benchmarks.db_load_test http --url http://localhost:8000 --path /api/users/me --token <jwt>
+
+    # The database layer directly, in one event loop: the same query through
+    # the blocking Session (as the routes used to) and through AsyncSession
+    python -m benchmarks.db_load_test db --query "SELECT pg_sleep(0.005)"
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List
+import numpy as np
+from sqlalchemy import text
+
+Request = Callable[[], Awaitable[None]]
+
+
+async def run_level(request: Request, concurrency: int, n_requests: int) -> Dict[str, float]:
+    """Run n_requests with at most `concurrency` in flight"""
+    latencies: List[float] = []
+    remaining = iter(range(n_requests))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            await request()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "rps": n_requests / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def report(name: str, row: Dict[str, float], baseline: float):
+    print(f"{name:>8} concurrency={row['concurrency']:<4} rps={row['rps']:8.1f} "
+          f"({row['rps'] / baseline:4.1f}x)  p50={row['p50_ms']:7.2f} ms  p99={row['p99_ms']:7.2f} ms")
+
+
+async def load_http(args):
+    import httpx
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, limits=limits) as client:
+        async def request():
+            response = await client.get(args.path)
+            response.raise_for_status()
+
+        baseline = None
+        for concurrency in args.concurrency:
+            row = await run_level(request, concurrency, args.requests)
+            baseline = baseline or row["rps"]
+            report("http", row, baseline)
+
+
+async def load_db(args):
+    from app.db.session import AsyncSessionLocal, SessionLocal, async_engine
+
+    query = text(args.query)
+
+    async def sync_request():
+        # What an async route calling a blocking Session does: the loop waits
+        db = SessionLocal()
+        try:
+            db.execute(query)
+        finally:
+            db.close()
+
+    async def async_request():
+        async with AsyncSessionLocal() as db:
+            await db.execute(query)
+
+    for name, request in (("sync", sync_request), ("async", async_request)):
+        baseline = None
+        for concurrency in args.concurrency:
+            row = await run_level(request, concurrency, args.requests)
+            baseline = baseline or row["rps"]
+            report(name, row, baseline)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput vs. concurrency of the database layer")
+    parser.add_argument("target", choices=("http", "db"))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=500, help="Requests per concurrency level")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/api/users/me")
+    parser.add_argument("--token", default=None)
+    parser.add_argument("--query", default="SELECT pg_sleep(0.005)")
+    args = parser.parse_args()
+
+    asyncio.run(load_http(args) if args.target == "http" else load_db(args))
@@ -0,0 +1,124 @@
+
+"""
+Checks that the hot query shapes of the routes are served by their indexes.
+
+Builds each query the way its route does, runs EXPLAIN (FORMAT JSON) and
+fails when the expected index is missing from the plan. Sequential scans
+are disabled for the check, so on a small development database the planner
+still has to show that an index can serve the query instead of preferring
+a scan of a few pages:
+
+    alembic upgrade head
+    python -m benchmarks.explain_indexes
+
+Exits non-zero if any query does not use its index.
+"""
+import argparse
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select, text, update
+from sqlalchemy.orm import Session
+
+from app.api.routes.players import players_page_query
+from app.db.pagination import encode_cursor, keyset
+from app.db.session import engine
+from app.models.club import ClubProfile
+from app.models.match import Match
+from app.models.message import Message
+from app.models.player import PlayerProfile
+from app.models.player_experience import PlayerExperience
+from app.models.player_highlight import PlayerHighlight
+from app.models.profile import Profile
+from app.models.user import User
+
+# The remaining mapped classes, so every relationship resolves
+from app.models.agent import AgentProfile  # noqa: F401
+from app.models.coach import CoachProfile  # noqa: F401
+
+
+def hot_queries(db: Session, user_id: Optional[uuid.UUID] = None,
+                other_id: Optional[uuid.UUID] = None) -> List[Tuple[str, Any, str]]:
+    """
+    (name, statement, expected index) for each query shape the routes run
+
+    Args:
+        db: Session the ORM queries are built on
+        user_id: Current user of the per-user queries, random by default
+        other_id: The other side of the conversation, random by default
+    """
+    user_id, other_id = user_id or uuid.uuid4(), other_id or uuid.uuid4()
+    player_ids = [uuid.uuid4() for _ in range(20)]
+    cursor = encode_cursor([datetime.now(timezone.utc), uuid.uuid4()])
+    user_key = (User.created_at, User.id)
+    club_key = (ClubProfile.created_at, ClubProfile.id)
+    message_key = (Message.created_at, Message.id)
+    conversation = db.query(Message).filter(
+        ((Message.sender_id == user_id) & (Message.receiver_id == other_id)) |
+        ((Message.sender_id == other_id) & (Message.receiver_id == user_id))
+    )
+
+    return [
+        ("users page", keyset(select(User), user_key, cursor, 100), "ix_users_created_at_id"),
+        ("players page", players_page_query(db.query(PlayerProfile), cursor, 100).statement,
+         "ix_player_profiles_created_at_id"),
+        ("players by position and age", players_page_query(
+            db.query(PlayerProfile), None, 100, position="Forward", age_min=18, age_max=23
+        ).statement, "ix_player_profiles_position_created_at_id"),
+        ("clubs page", keyset(db.query(ClubProfile), club_key, cursor, 100).statement,
+         "ix_club_profiles_created_at_id"),
+        ("conversation", keyset(conversation, message_key, None, 50).statement, "ix_messages_conversation"),
+        ("conversation page", keyset(conversation, message_key, cursor, 50).statement, "ix_messages_conversation"),
+        ("mark conversation read", update(Message).where(
+            (Message.sender_id == other_id) & (Message.receiver_id == user_id) & (Message.is_read == False)
+        ).values(is_read=True), "ix_messages_unread"),
+        ("stored matches", db.query(Match).filter(
+            Match.user_id == user_id, Match.match_type == "players"
+        ).order_by(Match.score.desc()).limit(20).statement, "ix_matches_user_type_score"),
+        ("player experiences", select(PlayerExperience).filter(PlayerExperience.player_id.in_(player_ids)),
+         "ix_player_experiences_player_id"),
+        ("player highlights", select(PlayerHighlight).filter(PlayerHighlight.player_id.in_(player_ids)),
+         "ix_player_highlights_player_id"),
+        ("profile of user", select(Profile).filter(Profile.user_id == user_id), "profiles_user_id_key"),
+    ]
+
+
+def plan_indexes(plan: Dict[str, Any]) -> Iterator[str]:
+    """Names of the indexes a JSON plan node and its children use"""
+    if "Index Name" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", []):
+        yield from plan_indexes(child)
+
+
+def explain(db: Session, statement: Any) -> Dict[str, Any]:
+    compiled = statement.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    return db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()[0]["Plan"]
+
+
+def check(verbose: bool = False) -> bool:
+    """Print one line per query and return whether all of them use their index"""
+    ok = True
+    with Session(engine) as db:
+        # SET LOCAL lasts until the rollback below
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, statement, expected in hot_queries(db):
+            plan = explain(db, statement)
+            used = sorted(set(plan_indexes(plan)))
+            passed = expected in used
+            ok = ok and passed
+            print(f"{'ok' if passed else 'FAIL':>4}  {name:<28} expected {expected}, plan uses {used or 'no index'}")
+            if verbose or not passed:
+                print(f"      {plan['Node Type']} (cost {plan['Total Cost']})")
+        db.rollback()
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assert index use of the routes' hot queries with EXPLAIN")
+    parser.add_argument("--verbose", action="store_true", help="Print the top plan node of every query")
+    args = parser.parse_args()
+
+    sys.exit(0 if check(args.verbose) else 1)
@@ -0,0 +1,256 @@
+
+"""
+Micro-benchmarks for the ModelRegistry matching hot path.
+
+Synthetic player matrices of each size and width are loaded into the
+registry for every backend (sklearn, exact and IVF KNN, and the similarity
+index in float32 and int8 storage), then queried through find_matches
+(batch size 1) or find_matches_batch. For each case the suite records p50
+and p99 latency per call, throughput in queries per second, peak traced
+memory of the build and of the queries, and recall@k against exact search.
+The result cache is disabled while a case runs, so every measured call
+does the full search.
+
+Results are written as JSON tagged with the git commit, so two runs can be
+compared with --compare:
+
+    python -m benchmarks.ml_benchmark --rows 1000 100000 --features 5 50
+    python -m benchmarks.ml_benchmark --compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+from sklearn.preprocessing import StandardScaler
+
+from app.core.config import settings
+from app.ml.ann_index import ExactIndex, IVFIndex, recall_at_k
+from app.ml.model_loader import model_registry
+from app.ml.result_cache import result_cache
+from app.ml.vector_index import SimilarityIndex
+
+BACKENDS = ('sklearn', 'exact', 'ivf', 'similarity', 'similarity-int8')
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _build_models(backend: str, data: np.ndarray, feature_names: List[str], version: str) -> Dict[str, Any]:
+    """Model dict for one backend, in the shape ModelRegistry._read_models produces"""
+    ids = np.arange(len(data)).astype(str)
+    if backend.startswith('similarity'):
+        storage = 'int8' if backend.endswith('int8') else 'float32'
+        return {'similarity': {
+            'feature_names': feature_names,
+            'index': SimilarityIndex(ids, data, storage=storage),
+            'version': version,
+        }}
+
+    scaler = StandardScaler().fit(data)
+    scaled = scaler.transform(data).astype(np.float32)
+    if backend == 'sklearn':
+        knn = NearestNeighbors(n_neighbors=10).fit(scaled)
+    elif backend == 'exact':
+        knn = ExactIndex().fit(scaled)
+    elif backend == 'ivf':
+        knn = IVFIndex(n_lists=max(1, min(settings.ANN_N_LISTS, len(data) // 100)),
+                       n_probe=settings.ANN_N_PROBE).fit(scaled)
+    else:
+        raise ValueError(f"Unknown backend '{backend}'")
+    return {'knn': {
+        'model': knn, 'scaler': scaler, 'feature_names': feature_names,
+        'ids': ids, 'vectors': scaled, 'version': version,
+    }}
+
+
+def _exact_top_k(backend: str, models: Dict[str, Any], data: np.ndarray,
+                 queries: np.ndarray, k: int) -> np.ndarray:
+    """Ground-truth top-k row numbers for the backend's metric"""
+    if backend.startswith('similarity'):
+        exact = SimilarityIndex(np.arange(len(data)).astype(str), data)
+        ids, _ = exact.search_batch(queries, k)
+        return ids.astype(np.int64)
+    model = models['knn']
+    _, indices = ExactIndex().fit(model['vectors']).kneighbors(
+        model['scaler'].transform(queries), n_neighbors=k
+    )
+    return indices
+
+
+def run_case(backend: str, rows: int, n_features: int, batch_size: int,
+             n_queries: int, k: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    Benchmark one (backend, rows, features, batch size) case
+
+    Returns:
+        Dict with the case parameters and its measurements
+    """
+    rng = np.random.default_rng(seed)
+    data = rng.standard_normal((rows, n_features)).astype(np.float32)
+    queries = rng.standard_normal((n_queries, n_features)).astype(np.float32)
+    feature_names = [f"f{i}" for i in range(n_features)]
+    query_dicts = [dict(zip(feature_names, q.tolist())) for q in queries]
+    # Separate queries for the warm-up, so it cannot prime anything the measured calls reuse
+    warmup_dicts = [
+        dict(zip(feature_names, q.tolist()))
+        for q in rng.standard_normal((batch_size, n_features)).astype(np.float32)
+    ]
+    model_name = 'similarity' if backend.startswith('similarity') else 'knn'
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    # Unique version per case, like a freshly trained model
+    models = _build_models(backend, data, feature_names, f"{backend}-{rows}x{n_features}-{time.time()}")
+    build_s = time.perf_counter() - start
+    build_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    previous = model_registry._models
+    model_registry._models = models
+    cache_entries, result_cache.max_entries = result_cache.max_entries, 0
+    try:
+        # Warm up lazy structures outside the measurement, through the same call
+        if batch_size == 1:
+            model_registry.find_matches(warmup_dicts[0], model_name=model_name, top_n=k)
+        else:
+            model_registry.find_matches_batch(warmup_dicts, top_n=k, model_name=model_name)
+
+        latencies, results = [], []
+        tracemalloc.start()
+        total_start = time.perf_counter()
+        for start in range(0, n_queries, batch_size):
+            batch = query_dicts[start:start + batch_size]
+            call_start = time.perf_counter()
+            if batch_size == 1:
+                results.append(model_registry.find_matches(batch[0], model_name=model_name, top_n=k))
+            else:
+                results.extend(model_registry.find_matches_batch(batch, top_n=k, model_name=model_name))
+            latencies.append(time.perf_counter() - call_start)
+        total_s = time.perf_counter() - total_start
+        query_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        model_registry._models = previous
+        result_cache.max_entries = cache_entries
+
+    # Short result lists are padded with -1, which recall_at_k never counts as a hit
+    found = np.array([
+        [int(match["id"]) for match in matches] + [-1] * (k - len(matches))
+        for matches in results
+    ])
+    exact = _exact_top_k(backend, models, data, queries, k)
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "backend": backend,
+        "rows": rows,
+        "features": n_features,
+        "batch_size": batch_size,
+        "queries": n_queries,
+        "k": k,
+        "build_s": build_s,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "throughput_qps": n_queries / total_s,
+        "build_peak_mb": build_peak / 2 ** 20,
+        "query_peak_mb": query_peak / 2 ** 20,
+        "recall": recall_at_k(found, exact),
+    }
+
+
+def run_helpers(n_features: int, calls: int = 10_000) -> List[Dict[str, Any]]:
+    """Per-call latency of the small helpers on the hot path"""
+    rng = np.random.default_rng(0)
+    feature_names = [f"f{i}" for i in range(n_features)]
+    model = {'feature_names': feature_names}
+    features = dict(zip(feature_names, rng.standard_normal(n_features).tolist()))
+    a, b = rng.standard_normal(n_features), rng.standard_normal(n_features)
+
+    report = []
+    for name, call in (
+        ("_preprocess_features", lambda: model_registry._preprocess_features(features, 'similarity', model)),
+        ("_cosine_similarity", lambda: model_registry._cosine_similarity(a, b)),
+    ):
+        start = time.perf_counter()
+        for _ in range(calls):
+            call()
+        report.append({
+            "helper": name, "features": n_features,
+            "mean_us": (time.perf_counter() - start) / calls * 1e6,
+        })
+    return report
+
+
+def compare(old_path: str, new_path: str):
+    """Print the change of every shared case between two result files"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def key(case):
+        return (case["backend"], case["rows"], case["features"], case["batch_size"])
+
+    old_cases = {key(case): case for case in old["cases"]}
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    for case in new["cases"]:
+        before = old_cases.get(key(case))
+        if before is None:
+            continue
+        print(f"{case['backend']:>16} rows={case['rows']:<8} features={case['features']:<4} "
+              f"batch={case['batch_size']:<4} p50 {before['p50_ms']:.3f} -> {case['p50_ms']:.3f} ms "
+              f"({case['p50_ms'] / before['p50_ms']:.2f}x)  recall {before['recall']:.3f} -> {case['recall']:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ModelRegistry matching hot path")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--features", type=int, nargs="+", default=[5, 50, 200])
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64])
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", default=None, help="Result file, defaults to benchmarks/results/")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        raise SystemExit(0)
+
+    commit = _git_commit()
+    cases = []
+    for rows in args.rows:
+        for n_features in args.features:
+            for backend in args.backends:
+                for batch_size in args.batch_sizes:
+                    case = run_case(backend, rows, n_features, batch_size, args.queries, args.k)
+                    cases.append(case)
+                    print(f"{backend:>16} rows={rows:<8} features={n_features:<4} batch={batch_size:<4} "
+                          f"p50={case['p50_ms']:.3f} ms  p99={case['p99_ms']:.3f} ms  "
+                          f"qps={case['throughput_qps']:.0f}  mem={case['build_peak_mb']:.0f}"
+                          f"+{case['query_peak_mb']:.0f} MB  recall={case['recall']:.3f}")
+
+    helpers = [row for n_features in args.features for row in run_helpers(n_features)]
+    result = {
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "cases": cases,
+        "helpers": helpers,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"ml-{commit or 'unknown'}-{int(time.time())}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}")
@@ -1,12 +1,16 @@
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
+from fastapi.responses import JSONResponse
 
-from app.api.routes import auth, users, players, clubs, agents, coaches, matches, recommendations, messaging, analytics
+from app.api.routes import auth, users, players, clubs, agents, coaches, matches, recommendations, messaging, analytics, models
 from app.core.config import settings
+from app.ml.inference import InferenceOverloaded
+from app.ml.match_refresh import start_match_recompute
+from app.ml.model_loader import model_registry
 
 app = FastAPI(
     title="Scout AI Match API",
@@ -23,6 +27,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset pagination cursors, see app/db/pagination.py
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -36,6 +42,34 @@ app.include_router(matches.router, prefix="/api/matches", tags=["Matching System
 app.include_router(recommendations.router, prefix="/api/recommendations", tags=["Recommendations"])
 app.include_router(messaging.router, prefix="/api/messages", tags=["Messaging"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
+app.include_router(models.router, prefix="/api/models", tags=["ML Models"])
+
+@app.exception_handler(InferenceOverloaded)
+async def inference_overloaded_handler(request: Request, exc: InferenceOverloaded):
+    # Shed matching load instead of queueing it behind every other request
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Inference capacity exhausted, retry later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.on_event("startup")
+async def start_model_maintenance():
+    # Pick up retrained models and compact incremental index updates in the background
+    if settings.MODEL_RELOAD_INTERVAL > 0:
+        model_registry.start_watcher(settings.MODEL_RELOAD_INTERVAL)
+    if settings.INDEX_COMPACTION_INTERVAL > 0:
+        model_registry.start_compactor(
+            settings.INDEX_COMPACTION_INTERVAL, settings.INDEX_COMPACTION_MIN_CHANGES
+        )
+    if settings.MATCH_RECOMPUTE_INTERVAL > 0:
+        start_match_recompute(settings.MATCH_RECOMPUTE_INTERVAL)
+
+@app.on_event("shutdown")
+async def stop_model_maintenance():
+    model_registry.stop_watcher()
+    model_registry.stop_scoring_pool()
+    model_registry.stop_inference_executor()
 
 # Custom OpenAPI and documentation endpoints
 @app.get("/api/docs", include_in_schema=False)
@@ -0,0 +1,57 @@
+"""Add indexes for the hot query shapes
+
+Each index serves a query the routes actually run; the models declare the
+same indexes so autogenerate stays quiet. They are built CONCURRENTLY, which
+cannot run inside a transaction, so existing tables stay writable while
+this migration runs. Check that the planner uses them with
+python -m benchmarks.explain_indexes.
+
+Revision ID: e41b7a03c5d2
+Revises: 8d2f4c1a9e37
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e41b7a03c5d2'
+down_revision = '8d2f4c1a9e37'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    # GET /api/users, /api/players, /api/clubs: keyset pages on (created_at, id)
+    ('ix_users_created_at_id', 'users', ['created_at', 'id'], None),
+    ('ix_player_profiles_created_at_id', 'player_profiles', ['created_at', 'id'], None),
+    ('ix_club_profiles_created_at_id', 'club_profiles', ['created_at', 'id'], None),
+    # GET /api/players: position equality with an age range
+    ('ix_player_profiles_position_age', 'player_profiles', ['position', 'age'], None),
+    # Experiences and highlights loaded by player
+    ('ix_player_experiences_player_id', 'player_experiences', ['player_id'], None),
+    ('ix_player_highlights_player_id', 'player_highlights', ['player_id'], None),
+    # GET /api/messages/{recipient_id}: one index range per direction, newest first
+    ('ix_messages_conversation', 'messages', ['sender_id', 'receiver_id', 'created_at', 'id'], None),
+    # Marking a conversation read and unread counts only touch unread rows
+    ('ix_messages_unread', 'messages', ['receiver_id', 'sender_id'], 'NOT is_read'),
+    # GET /api/matches: one user's stored matches of a type by score
+    ('ix_matches_user_type_score', 'matches', ['user_id', 'match_type', sa.text('score DESC')], None),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,172 @@
+"""Create profile, messaging and match tables
+
+Revision ID: 8d2f4c1a9e37
+Revises: 5b6982a4a7e9
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '8d2f4c1a9e37'
+down_revision = '5b6982a4a7e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'profiles',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='CASCADE'), unique=True),
+        sa.Column('avatar_url', sa.String(), nullable=True),
+        sa.Column('bio', sa.String(), nullable=True),
+        sa.Column('location', sa.String(), nullable=True),
+        sa.Column('social_links', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    
+    op.create_table(
+        'player_profiles',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('profile_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('profiles.id', ondelete='CASCADE'), unique=True),
+        sa.Column('position', sa.String(), nullable=False),
+        sa.Column('height', sa.Float(), nullable=True),
+        sa.Column('weight', sa.Float(), nullable=True),
+        sa.Column('preferred_foot', sa.String(), nullable=True),
+        sa.Column('age', sa.Integer(), nullable=False),
+        sa.Column('nationality', sa.String(), nullable=True),
+        sa.Column('current_club', sa.String(), nullable=True),
+        sa.Column('contract_until', sa.DateTime(), nullable=True),
+        sa.Column('market_value', sa.Integer(), nullable=True),
+        sa.Column('skills', postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column('stats', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    
+    op.create_table(
+        'club_profiles',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('profile_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('profiles.id', ondelete='CASCADE'), unique=True),
+        sa.Column('club_name', sa.String(), nullable=False),
+        sa.Column('league', sa.String(), nullable=True),
+        sa.Column('country', sa.String(), nullable=True),
+        sa.Column('stadium', sa.String(), nullable=True),
+        sa.Column('founded', sa.Integer(), nullable=True),
+        sa.Column('budget', sa.JSON(), nullable=True),
+        sa.Column('squad_size', sa.Integer(), nullable=True),
+        sa.Column('philosophy', sa.String(), nullable=True),
+        sa.Column('requirements', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    
+    op.create_table(
+        'agent_profiles',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('profile_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('profiles.id', ondelete='CASCADE'), unique=True),
+        sa.Column('agency', sa.String(), nullable=True),
+        sa.Column('license_number', sa.String(), nullable=True),
+        sa.Column('experience_years', sa.Integer(), nullable=True),
+        sa.Column('specialization', sa.String(), nullable=True),
+        sa.Column('regions_of_operation', postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column('languages', postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column('clients_count', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    
+    op.create_table(
+        'coach_profiles',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('profile_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('profiles.id', ondelete='CASCADE'), unique=True),
+        sa.Column('specialization', sa.String(), nullable=True),
+        sa.Column('experience_years', sa.Integer(), nullable=True),
+        sa.Column('coaching_style', sa.String(), nullable=True),
+        sa.Column('achievements', sa.JSON(), nullable=True),
+        sa.Column('certifications', postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column('preferred_formations', postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column('current_team', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    
+    op.create_table(
+        'player_experiences',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('player_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('player_profiles.id', ondelete='CASCADE')),
+        sa.Column('club', sa.String(), nullable=False),
+        sa.Column('position', sa.String(), nullable=False),
+        sa.Column('from_date', sa.DateTime(), nullable=False),
+        sa.Column('to_date', sa.DateTime(), nullable=True),
+        sa.Column('achievements', sa.String(), nullable=True),
+        sa.Column('appearances', sa.Integer(), nullable=True),
+        sa.Column('goals', sa.Integer(), nullable=True),
+        sa.Column('assists', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    
+    op.create_table(
+        'player_highlights',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('player_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('player_profiles.id', ondelete='CASCADE')),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('media_url', sa.String(), nullable=False),
+        sa.Column('media_type', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('date', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    
+    op.create_table(
+        'messages',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('sender_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='CASCADE')),
+        sa.Column('receiver_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='CASCADE')),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('is_read', sa.Boolean(), default=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    
+    op.create_table(
+        'notifications',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='CASCADE')),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('is_read', sa.Boolean(), default=False),
+        sa.Column('metadata', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+    )
+    
+    op.create_table(
+        'matches',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='CASCADE')),
+        sa.Column('target_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='CASCADE')),
+        sa.Column('match_type', sa.String(), nullable=True),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('match_data', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('matches')
+    op.drop_table('notifications')
+    op.drop_table('messages')
+    op.drop_table('player_highlights')
+    op.drop_table('player_experiences')
+    op.drop_table('coach_profiles')
+    op.drop_table('agent_profiles')
+    op.drop_table('club_profiles')
+    op.drop_table('player_profiles')
+    op.drop_table('profiles')
@@ -0,0 +1,45 @@
+"""Serve filtered player pages from (position, created_at, id)
+
+GET /api/players orders every page by (created_at, id). With real data the
+planner never used ix_player_profiles_position_age for a position filter:
+it walked ix_player_profiles_created_at_id and filtered instead. An index
+on (position, created_at, id) returns one position's rows already in page
+order, so a filtered page stops after `limit` matches. The age range is
+checked on the rows it walks.
+
+Revision ID: b7c39e5f1a24
+Revises: e41b7a03c5d2
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'b7c39e5f1a24'
+down_revision = 'e41b7a03c5d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_player_profiles_position_created_at_id', 'player_profiles', ['position', 'created_at', 'id'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_player_profiles_position_age', table_name='player_profiles',
+            postgresql_concurrently=True, if_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_player_profiles_position_age', 'player_profiles', ['position', 'age'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_player_profiles_position_created_at_id', table_name='player_profiles',
+            postgresql_concurrently=True, if_exists=True,
+        )
@@ -0,0 +1,91 @@
+
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Settings are read when app.core.config is first imported: point the model
+# paths at an empty directory so every run starts from the default models,
+# and keep the background jobs and Redis out of the test process
+MODEL_DIR = tempfile.mkdtemp(prefix="scout-test-models-")
+os.environ.setdefault("MODEL_ARTIFACT_DIR", MODEL_DIR)
+os.environ.setdefault("KNN_MODEL_PATH", os.path.join(MODEL_DIR, "knn_model.pkl"))
+os.environ.setdefault("SIMILARITY_MODEL_PATH", os.path.join(MODEL_DIR, "similarity_model.pkl"))
+os.environ.setdefault("ANN_INDEX_PATH", os.path.join(MODEL_DIR, "knn_ivf_index.npz"))
+os.environ.setdefault("MODEL_RELOAD_INTERVAL", "0")
+os.environ.setdefault("INDEX_COMPACTION_INTERVAL", "0")
+os.environ.setdefault("MATCH_RECOMPUTE_INTERVAL", "0")
+os.environ.setdefault("MATCH_CACHE_REDIS", "false")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models.user import User, UserRole
+
+
+@pytest.fixture
+def make_user():
+    """Factory of unsaved active users, for overriding get_current_active_user"""
+    def make(role: UserRole = UserRole.PLAYER, is_superuser: bool = False) -> User:
+        return User(
+            id=uuid.uuid4(), email=f"{uuid.uuid4().hex}@example.com", hashed_password="x",
+            full_name="Test User", role=role, is_active=True, is_superuser=is_superuser,
+        )
+
+    return make
+
+
+@pytest.fixture
+def app():
+    """The API app; dependency overrides are cleared after each test"""
+    from main import app
+
+    yield app
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def client(app):
+    # Not used as a context manager, so the startup jobs never run
+    return TestClient(app)
+
+
+@pytest.fixture
+def restore_models():
+    """Put back the registry's model set after a test swaps or updates it"""
+    from app.ml.model_loader import model_registry
+
+    models = {name: dict(model) for name, model in model_registry._models.items()}
+    models['similarity']['index'] = model_registry._models['similarity']['index'].compacted()
+    yield
+    model_registry._models = models
+
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    """Engine for TEST_DATABASE_URL; tests using it are skipped without one"""
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    import app.models  # noqa: F401
+    from app.db.session import Base
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(pg_engine):
+    """Session whose work, commits included, is rolled back after the test"""
+    connection = pg_engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
@@ -0,0 +1,110 @@
+
+import numpy as np
+import pytest
+from sklearn.neighbors import NearestNeighbors
+
+from app.core.config import settings
+from app.ml.ann_index import ExactIndex, IVFIndex, matrix_digest, recall_at_k
+from app.ml.model_loader import model_registry
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((2000, 8)).astype(np.float32), rng.standard_normal((20, 8)).astype(np.float32)
+
+
+def test_exact_index_matches_sklearn(data):
+    vectors, queries = data
+
+    distances, indices = ExactIndex(chunk_size=7).fit(vectors).kneighbors(queries, n_neighbors=5)
+    expected_distances, expected_indices = NearestNeighbors().fit(vectors).kneighbors(queries, n_neighbors=5)
+
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(distances, expected_distances, rtol=1e-4)
+
+
+def test_ivf_probing_every_list_is_exact(data):
+    vectors, queries = data
+    ivf = IVFIndex(n_lists=16, n_probe=16).fit(vectors)
+
+    _, approx = ivf.kneighbors(queries, n_neighbors=10)
+    _, exact = ExactIndex().fit(vectors).kneighbors(queries, n_neighbors=10)
+
+    assert recall_at_k(approx, exact) == 1.0
+
+
+def test_ivf_recall_grows_with_n_probe(data):
+    vectors, queries = data
+    ivf = IVFIndex(n_lists=32).fit(vectors)
+    _, exact = ExactIndex().fit(vectors).kneighbors(queries, n_neighbors=10)
+
+    recalls = [recall_at_k(ivf.kneighbors(queries, 10, n_probe=p)[1], exact) for p in (1, 4, 32)]
+
+    assert recalls == sorted(recalls)
+    assert recalls[-1] == 1.0
+
+
+def test_recall_ignores_padding():
+    exact = np.array([[1, 2, 3, 4]])
+
+    assert recall_at_k(np.array([[1, 2, -1, -1]]), exact) == 0.5
+    assert recall_at_k(np.array([[-1, -1, -1, -1]]), exact) == 0.0
+    assert recall_at_k(np.array([[4, 3, 2, 1]]), exact) == 1.0
+
+
+def test_save_and_load_round_trip(tmp_path, data):
+    vectors, queries = data
+    ivf = IVFIndex(n_lists=16, n_probe=4).fit(vectors)
+    path = str(tmp_path / "ivf.npz")
+
+    ivf.save(path)
+    loaded = IVFIndex.load(path)
+
+    assert loaded.source == ivf.source == matrix_digest(vectors)
+    for a, b in zip(ivf.kneighbors(queries, 5), loaded.kneighbors(queries, 5)):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_persisted_index_of_other_vectors_is_rebuilt(tmp_path, monkeypatch, data):
+    vectors, _ = data
+    monkeypatch.setattr(settings, "ANN_INDEX_PATH", str(tmp_path / "ivf.npz"))
+    monkeypatch.setattr(settings, "ANN_N_LISTS", 8)
+    IVFIndex(n_lists=8).fit(vectors).save(settings.ANN_INDEX_PATH)
+
+    retrained = vectors[::-1].copy()
+    index = model_registry._load_ivf_index(retrained)
+
+    # Same row count, different contents: the saved index must not be reused
+    assert index.source == matrix_digest(retrained)
+    assert IVFIndex.load(settings.ANN_INDEX_PATH).source == index.source
+    assert model_registry._load_ivf_index(retrained).source == index.source
+
+
+def test_knn_backend_is_built_from_the_stored_vectors(monkeypatch):
+    monkeypatch.setattr(settings, "KNN_BACKEND", "exact")
+    models = {}
+    model_registry._create_default_knn_model(models)
+    model_registry._attach_knn_backend(models)
+
+    assert isinstance(models['knn']['model'], ExactIndex)
+    assert models['knn']['model'].n_samples_fit_ == 5
+
+    legacy = {'knn': {k: v for k, v in models['knn'].items() if k != 'vectors'}}
+    legacy['knn']['model'] = NearestNeighbors().fit(np.eye(3))
+    model_registry._attach_knn_backend(legacy)
+    assert isinstance(legacy['knn']['model'], NearestNeighbors)
+
+
+def test_fit_can_write_the_grouped_vectors_to_a_memmap(tmp_path, data):
+    vectors, queries = data
+    path = str(tmp_path / "grouped.npy")
+
+    in_memory = IVFIndex(n_lists=16, n_probe=4).fit(vectors)
+    mapped = IVFIndex(n_lists=16, n_probe=4).fit(vectors, vectors_path=path, chunk_size=100)
+
+    assert isinstance(mapped.vectors, np.memmap)
+    np.testing.assert_array_equal(np.load(path), in_memory.vectors)
+    np.testing.assert_allclose(mapped.sq_norms, in_memory.sq_norms, rtol=1e-6)
+    for a, b in zip(in_memory.kneighbors(queries, 5), mapped.kneighbors(queries, 5)):
+        np.testing.assert_array_equal(a, b)
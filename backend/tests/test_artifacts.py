@@ -0,0 +1,104 @@
+
+import os
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.neighbors import NearestNeighbors
+from sklearn.preprocessing import StandardScaler
+
+from app.ml.artifacts import (
+    artifact_path, convert_pickle, load_artifact, new_version, prune_versions, read_manifest, save_artifact,
+)
+
+
+def save(directory, version=None, rows=4, keep_versions=None):
+    vectors = np.arange(rows * 3, dtype=np.float32).reshape(rows, 3)
+    return save_artifact(
+        str(directory), 'knn', vectors=vectors, ids=[f"id{i}" for i in range(rows)],
+        feature_names=['a', 'b', 'c'], metric='euclidean', scaler=StandardScaler().fit(vectors),
+        version=version, keep_versions=keep_versions,
+    )
+
+
+def versions_on_disk(directory):
+    return sorted(entry.name for entry in os.scandir(artifact_path(str(directory), 'knn')) if entry.is_dir())
+
+
+def test_round_trip_is_memory_mapped(tmp_path):
+    manifest = save(tmp_path)
+
+    artifact = load_artifact(str(tmp_path), 'knn')
+
+    assert artifact["version"] == manifest["version"]
+    assert isinstance(artifact["vectors"], np.memmap)
+    np.testing.assert_array_equal(artifact["vectors"][1], [3, 4, 5])
+    assert list(artifact["ids"]) == ["id0", "id1", "id2", "id3"]
+    np.testing.assert_allclose(artifact["scaler"].mean_, [4.5, 5.5, 6.5])
+
+
+def test_versions_are_unique_within_a_second():
+    versions = {new_version() for _ in range(1000)}
+
+    assert len(versions) == 1000
+    assert len({version.split("-")[0] for version in versions}) <= 2
+
+
+def test_existing_version_is_never_overwritten(tmp_path):
+    save(tmp_path, version="v1")
+
+    with pytest.raises(FileExistsError):
+        save(tmp_path, version="v1", rows=2)
+    assert read_manifest(str(tmp_path), 'knn')["n_rows"] == 4
+
+
+def test_publishing_keeps_current_and_previous_versions(tmp_path):
+    for i in range(5):
+        save(tmp_path, version=f"v{i}", keep_versions=2)
+
+    assert versions_on_disk(tmp_path) == ["v2", "v3", "v4"]
+    assert read_manifest(str(tmp_path), 'knn')["version"] == "v4"
+    assert load_artifact(str(tmp_path), 'knn')["n_rows"] == 4
+
+
+def test_prune_keeps_the_current_version_even_if_older(tmp_path):
+    for i in range(3):
+        save(tmp_path, version=f"v{i}")
+    # Roll back: point the manifest at the oldest version
+    save(tmp_path, version="v0-again")
+    manifest_file = os.path.join(artifact_path(str(tmp_path), 'knn'), "manifest.json")
+    with open(manifest_file) as f:
+        text = f.read().replace("v0-again", "v0")
+    with open(manifest_file, "w") as f:
+        f.write(text)
+
+    deleted = prune_versions(str(tmp_path), 'knn', keep=1)
+
+    assert sorted(deleted) == ["v1", "v2"]
+    assert versions_on_disk(tmp_path) == ["v0", "v0-again"]
+
+
+def test_prune_removes_files_of_the_flat_layout(tmp_path):
+    directory = artifact_path(str(tmp_path), 'knn')
+    os.makedirs(directory)
+    for name in ("vectors-old.npy", "ids-old.npy"):
+        np.save(os.path.join(directory, name), np.zeros(1))
+    save(tmp_path, version="new", keep_versions=0)
+
+    assert sorted(os.listdir(directory)) == ["manifest.json", "new"]
+
+
+def test_convert_pickle_uses_the_stored_vectors(tmp_path):
+    vectors = np.random.default_rng(0).standard_normal((6, 3)).astype(np.float32)
+    path = tmp_path / "knn.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({'model': NearestNeighbors().fit(vectors), 'vectors': vectors, 'feature_names': ['a', 'b', 'c']}, f)
+
+    convert_pickle(str(path), 'knn', str(tmp_path / "artifacts"))
+
+    np.testing.assert_array_equal(load_artifact(str(tmp_path / "artifacts"), 'knn')["vectors"], vectors)
+
+    with open(path, "wb") as f:
+        pickle.dump({'model': NearestNeighbors().fit(vectors), 'feature_names': ['a', 'b', 'c']}, f)
+    with pytest.raises(ValueError):
+        convert_pickle(str(path), 'knn', str(tmp_path / "artifacts"))
@@ -0,0 +1,101 @@
+
+import asyncio
+
+from app.ml.batcher import MicroBatcher
+
+
+def echo_batcher(calls, **kwargs):
+    async def run_batch(features, top_n, model_name):
+        calls.append((len(features), top_n, model_name))
+        await asyncio.sleep(0)
+        return [[{"id": row["id"], "rank": rank} for rank in range(top_n)] for row in features]
+
+    return MicroBatcher(run_batch, **kwargs)
+
+
+def test_concurrent_queries_share_one_batch():
+    calls = []
+    batcher = echo_batcher(calls, max_wait_ms=50, max_items=64)
+
+    async def main():
+        return await asyncio.gather(*(
+            batcher.submit({"id": i}, "similarity", top_n=1 + i % 3) for i in range(10)
+        ))
+
+    results = asyncio.run(main())
+
+    assert calls == [(10, 3, "similarity")]
+    for i, matches in enumerate(results):
+        # Each query gets its own row, cut to its own top_n
+        assert len(matches) == 1 + i % 3
+        assert all(match["id"] == i for match in matches)
+    assert batcher.snapshot()["max_batch"] == 10
+
+
+def test_full_batch_flushes_without_waiting():
+    calls = []
+    batcher = echo_batcher(calls, max_wait_ms=60_000, max_items=4)
+
+    async def main():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit({"id": i}, "knn", 1) for i in range(8))), timeout=5
+        )
+
+    asyncio.run(main())
+
+    assert calls == [(4, 1, "knn"), (4, 1, "knn")]
+
+
+def test_models_are_batched_separately():
+    calls = []
+    batcher = echo_batcher(calls, max_wait_ms=10)
+
+    async def main():
+        await asyncio.gather(
+            batcher.submit({"id": 1}, "knn", 1), batcher.submit({"id": 2}, "similarity", 1)
+        )
+
+    asyncio.run(main())
+
+    assert sorted(calls) == [(1, 1, "knn"), (1, 1, "similarity")]
+
+
+def test_running_batches_are_referenced_until_done():
+    release = None
+
+    async def run_batch(features, top_n, model_name):
+        await release.wait()
+        return [[] for _ in features]
+
+    batcher = MicroBatcher(run_batch, max_items=1)
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        pending = asyncio.ensure_future(batcher.submit({}, "knn", 1))
+        await asyncio.sleep(0.01)
+        held = len(batcher._tasks)
+        release.set()
+        await pending
+        await asyncio.sleep(0)
+        return held
+
+    assert asyncio.run(main()) == 1
+    assert not batcher._tasks
+
+
+def test_batch_errors_reach_every_waiter():
+    async def run_batch(features, top_n, model_name):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(run_batch, max_wait_ms=1)
+
+    async def main():
+        return await asyncio.gather(
+            *(batcher.submit({}, "knn", 1) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+
+    assert len(results) == 3
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,62 @@
+
+import numpy as np
+import pytest
+
+from app.ml.diversity import details_diversity_features, mmr_rerank
+
+
+def reference_mmr(relevance, k, diversity, vectors, categories):
+    """MMR written out pair by pair"""
+    relevance = (relevance - relevance.min()) / (relevance.max() - relevance.min())
+    standardized = (vectors - vectors.mean(axis=0)) / vectors.std(axis=0)
+
+    def similarity(i, j):
+        cosine = standardized[i] @ standardized[j] / (
+            np.linalg.norm(standardized[i]) * np.linalg.norm(standardized[j])
+        )
+        equal = [float(codes[i] >= 0 and codes[i] == codes[j]) for codes in categories]
+        return (cosine + sum(equal)) / (1 + len(categories))
+
+    picked = []
+    while len(picked) < k:
+        rest = [i for i in range(len(relevance)) if i not in picked]
+        # Dissimilar picks earn no bonus: the penalty never drops below 0
+        picked.append(max(rest, key=lambda i: (1 - diversity) * relevance[i] - diversity * max(
+            [0.0] + [similarity(i, j) for j in picked]
+        )))
+    return picked
+
+
+@pytest.mark.parametrize("diversity", [0.2, 0.5, 0.9])
+def test_picks_match_the_pairwise_definition(diversity):
+    rng = np.random.default_rng(0)
+    relevance = rng.random(60)
+    vectors = rng.standard_normal((60, 4))
+    categories = [rng.integers(0, 4, 60), np.where(rng.random(60) < 0.3, -1, rng.integers(0, 3, 60))]
+
+    picked = mmr_rerank(relevance, 10, diversity, vectors, categories)
+
+    assert list(picked) == reference_mmr(relevance, 10, diversity, vectors, categories)
+
+
+def test_near_duplicates_give_way_to_other_positions():
+    relevance = np.array([1.0, 0.99, 0.98, 0.5])
+    positions = [np.array([0, 0, 0, 1])]
+
+    assert list(mmr_rerank(relevance, 2, 0.0, categories=positions)) == [0, 1]
+    assert list(mmr_rerank(relevance, 2, 0.5, categories=positions)) == [0, 3]
+    # Without attributes there is nothing to diversify on
+    assert list(mmr_rerank(relevance, 5, 0.5)) == [0, 1, 2, 3]
+
+
+def test_details_features_code_unknown_values_as_negative():
+    vectors, (positions, nationalities) = details_diversity_features([
+        {"age": 21, "height": "tall", "position": "CB", "nationality": "Spain"},
+        {"position": " cb ", "nationality": ""},
+        None,
+    ])
+
+    assert vectors.shape == (3, 4)
+    assert np.isnan(vectors[0, 0]) and vectors[0, 2] == 21
+    assert positions[0] == positions[1] and positions[2] == -1
+    assert nationalities[0] >= 0 and list(nationalities[1:]) == [-1, -1]
@@ -0,0 +1,108 @@
+
+import hashlib
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.api.routes.players import players_page_query
+from app.db.pagination import encode_cursor
+from app.models.player import PlayerProfile
+from benchmarks.explain_indexes import explain, hot_queries, plan_indexes
+
+ROWS = 100_000
+
+SHAPES = [
+    # (position, age_min, age_max, index the planner should pick)
+    ("Forward", 18, 23, "ix_player_profiles_position_created_at_id"),
+    ("Forward", None, None, "ix_player_profiles_position_created_at_id"),
+    (None, 18, 23, "ix_player_profiles_created_at_id"),
+    (None, None, None, "ix_player_profiles_created_at_id"),
+]
+
+
+@pytest.fixture
+def players(db):
+    """ROWS profiles over four positions, ages 16-40 and a year of created_at, analyzed"""
+    db.execute(text(
+        """
+        INSERT INTO player_profiles (id, position, age, created_at)
+        SELECT gen_random_uuid(),
+               (ARRAY['Goalkeeper', 'Defender', 'Midfielder', 'Forward'])[1 + i % 4],
+               16 + (i * 7) % 25,
+               now() - make_interval(secs => i * 300)
+        FROM generate_series(1, :rows) AS i
+        """
+    ), {"rows": ROWS})
+    db.execute(text("ANALYZE player_profiles"))
+    return db
+
+
+@pytest.mark.parametrize("with_cursor", [False, True], ids=["first page", "next page"])
+@pytest.mark.parametrize("position,age_min,age_max,expected", SHAPES)
+def test_players_page_uses_index(players, position, age_min, age_max, expected, with_cursor):
+    # Unlike the benchmark, sequential scans stay enabled: this is the plan the route gets
+    cursor = encode_cursor([datetime.now(timezone.utc), uuid.uuid4()]) if with_cursor else None
+    query = players_page_query(players.query(PlayerProfile), cursor, 100, position, age_min, age_max)
+
+    used = set(plan_indexes(explain(players, query.statement)))
+
+    assert expected in used
+
+
+USERS = 1_000
+MESSAGES = 100_000
+MATCHES = 50_000
+
+
+def user_uuid(i):
+    return uuid.UUID(hashlib.md5(f"user-{i}".encode()).hexdigest())
+
+
+@pytest.fixture
+def traffic(db):
+    """USERS users with MESSAGES messages, 1% unread, and MATCHES stored matches, analyzed"""
+    db.execute(text(
+        """
+        INSERT INTO users (id, email, hashed_password, created_at)
+        SELECT md5('user-' || i)::uuid, 'user-' || i || '@example.com', 'x', now() - make_interval(secs => i)
+        FROM generate_series(0, :users - 1) AS i
+        """
+    ), {"users": USERS})
+    db.execute(text(
+        """
+        INSERT INTO messages (id, sender_id, receiver_id, content, is_read, created_at)
+        SELECT gen_random_uuid(), md5('user-' || i % :users)::uuid, md5('user-' || (i * 7 + 1) % :users)::uuid,
+               'hello', (i / :users) % 100 <> 0, now() - make_interval(secs => i)
+        FROM generate_series(0, :messages - 1) AS i
+        """
+    ), {"users": USERS, "messages": MESSAGES})
+    db.execute(text(
+        """
+        INSERT INTO matches (id, user_id, target_id, match_type, score)
+        SELECT gen_random_uuid(), md5('user-' || i % :users)::uuid, md5('user-' || (i * 13) % :users)::uuid,
+               (ARRAY['players', 'clubs'])[1 + (i / :users) % 2], random()
+        FROM generate_series(0, :matches - 1) AS i
+        """
+    ), {"users": USERS, "matches": MATCHES})
+    db.execute(text("ANALYZE users"))
+    db.execute(text("ANALYZE messages"))
+    db.execute(text("ANALYZE matches"))
+    return db
+
+
+@pytest.mark.parametrize("name", [
+    "conversation", "conversation page", "mark conversation read", "stored matches",
+])
+def test_message_and_match_queries_use_their_index(traffic, name):
+    # User 0 sent user 1 a hundred messages, one of them unread
+    queries = {
+        query_name: (statement, expected)
+        for query_name, statement, expected in hot_queries(traffic, user_uuid(1), user_uuid(0))
+    }
+    statement, expected = queries[name]
+
+    used = set(plan_indexes(explain(traffic, statement)))
+
+    assert expected in used
@@ -0,0 +1,78 @@
+
+import numpy as np
+import pytest
+
+from app.ml import feature_store as feature_store_module
+from app.ml.feature_store import (
+    PlayerFeatureMatrix, PlayerFeatureStore, flatten_stats, load_player_features, player_features,
+)
+from app.models.player import PlayerProfile
+from app.models.profile import Profile
+
+
+def test_flatten_stats_keeps_nested_numbers_only():
+    stats = {"goals": 3, "season": {"assists": 2.5, "team": "A"}, "fit": True, "notes": None}
+
+    assert flatten_stats(stats) == {"goals": 3.0, "season.assists": 2.5}
+    assert flatten_stats(None) == {}
+
+
+@pytest.fixture
+def players(db, make_user):
+    user = make_user()
+    rows = [
+        PlayerProfile(profile=Profile(user_id=user.id), position="Striker", age=21, height=180.0,
+                      preferred_foot="Left", stats={"goals": 12, "season": {"assists": 4}}, skills=["pace"]),
+        PlayerProfile(profile=Profile(), position="Goalkeeper", age=30, market_value=500000,
+                      stats={"saves": 80}, skills=None),
+    ]
+    db.add(user)
+    db.add_all(rows)
+    db.flush()
+    return user, rows
+
+
+def test_streamed_matrix_matches_the_orm_features(db, players):
+    user, rows = players
+
+    # A batch smaller than the table streams over several round trips
+    matrix = load_player_features(db, batch_size=1)
+
+    for row in rows:
+        assert matrix.features_for(row.id) == pytest.approx(player_features(row))
+    assert matrix.features_for_user(user.id) == matrix.features_for(rows[0].id)
+    striker, keeper = matrix.row_of[str(rows[0].id)], matrix.row_of[str(rows[1].id)]
+    # Sparse columns are unknown (NaN) where a player lacks them; skills are 0/1
+    assert np.isnan(matrix.column("saves")[striker])
+    assert matrix.column("skill.pace")[keeper] == 0.0
+    assert matrix.categories["position"][striker] == "striker"
+    assert matrix.categories["preferred_foot"][keeper] == ""
+
+
+def test_select_fills_unknown_features_with_zeros():
+    matrix = PlayerFeatureMatrix(
+        np.array(["p1", "p2"]), np.array(["u1", ""]), ["age", "goals"],
+        np.array([[20, np.nan], [25, 3]], dtype=np.float32),
+    )
+
+    np.testing.assert_array_equal(matrix.select(["goals", "missing", "age"]), [[0, 0, 20], [3, 0, 25]])
+    assert matrix.column_range("goals") == (3.0, 3.0)
+    assert matrix.features_for_user("u1") == {"age": 20.0}
+    assert matrix.features_for("p3") is None
+
+
+def test_store_reloads_only_after_the_ttl(monkeypatch):
+    loads = []
+    monkeypatch.setattr(feature_store_module, "load_player_features", lambda db, batch_size: loads.append(1) or (
+        PlayerFeatureMatrix(np.array([]), np.array([]), [], np.zeros((0, 0), dtype=np.float32))
+    ))
+    store = PlayerFeatureStore(ttl=600)
+
+    first = store.get(None)
+    assert store.get(None) is first
+    store.invalidate()
+    assert store.get(None) is not first
+    first.loaded_at -= 600
+    store._matrix = first
+    assert store.get(None) is not first
+    assert len(loads) == 3
@@ -0,0 +1,84 @@
+
+import numpy as np
+import pytest
+
+from app.ml.feature_store import PlayerFeatureMatrix
+from app.ml.filters import AttributeFilterIndex
+from app.ml.model_loader import model_registry
+from app.ml.vector_index import SimilarityIndex
+
+POSITIONS = np.array(["striker", "winger", "goalkeeper", "defender"], dtype=object)
+
+
+def players(n, seed=0):
+    """Player matrix of n players p0..p(n-1) with random positions, feet and ages"""
+    rng = np.random.default_rng(seed)
+    ids = np.array([f"p{i}" for i in range(n)])
+    ages = rng.integers(16, 36, n).astype(np.float32)
+    return PlayerFeatureMatrix(
+        ids, ids, ['age'], ages.reshape(-1, 1),
+        categories={
+            'position': POSITIONS[rng.integers(0, 4, n)],
+            'preferred_foot': np.array(["left", "right"], dtype=object)[rng.integers(0, 2, n)],
+            'nationality': np.full(n, "", dtype=object),
+        },
+    )
+
+
+def test_masks_combine_values_columns_and_age_range():
+    matrix = players(200)
+    # The last two index rows have no player row
+    ids = np.concatenate([matrix.ids, ["unknown-1", "unknown-2"]])
+    index = AttributeFilterIndex(ids, matrix)
+    position, foot = matrix.categories['position'], matrix.categories['preferred_foot']
+    age = matrix.column('age')
+
+    mask = index.mask({"position": ["Striker", "WINGER"], "preferred_foot": "left", "age_min": 20, "age_max": 25})
+
+    expected = np.isin(position, ["striker", "winger"]) & (foot == "left") & (age >= 20) & (age <= 25)
+    np.testing.assert_array_equal(mask, np.concatenate([expected, [False, False]]))
+    np.testing.assert_array_equal(
+        index.mask_for_ids(ids, {"position": ["Striker", "WINGER"], "preferred_foot": "left",
+                                 "age_min": 20, "age_max": 25}),
+        mask,
+    )
+    assert not index.mask({"position": "libero"}).any()
+    assert index.mask({"position": None, "age_min": None}) is None
+
+
+@pytest.fixture
+def filtered_model(restore_models):
+    matrix = players(300)
+    vectors = np.random.default_rng(1).standard_normal((300, 4))
+    index = SimilarityIndex(matrix.ids[:290], vectors[:290])
+    # Rows added since the last compaction are filtered through the delta segment
+    index.upsert_many(list(matrix.ids[290:]), vectors[290:])
+    model_registry._models = dict(model_registry._models, similarity={
+        'feature_names': ['f0', 'f1', 'f2', 'f3'], 'index': index, 'version': 'filtered',
+    })
+    return matrix, vectors
+
+
+def test_filtered_search_applies_filters_before_top_k(filtered_model):
+    matrix, vectors = filtered_model
+    query = np.random.default_rng(2).standard_normal(4)
+    filters = {"position": "goalkeeper", "age_max": 25}
+
+    matches = model_registry.find_matches(
+        dict(zip(['f0', 'f1', 'f2', 'f3'], query)), 'similarity', top_n=10,
+        filters=filters, attributes=matrix,
+    )
+
+    allowed = (matrix.categories['position'] == "goalkeeper") & (matrix.column('age') <= 25)
+    cosine = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    cosine[~allowed] = -np.inf
+    expected = matrix.ids[np.argsort(-cosine)[:10]]
+    assert [match["id"] for match in matches] == list(expected)
+
+    # Delta rows are filtered too: each one's own vector finds it only if it passes
+    for row in range(290, 300):
+        ids = [match["id"] for match in model_registry.find_matches(
+            dict(zip(['f0', 'f1', 'f2', 'f3'], vectors[row])), 'similarity', top_n=1,
+            filters=filters, attributes=matrix,
+        )]
+        assert (ids == [matrix.ids[row]]) == allowed[row]
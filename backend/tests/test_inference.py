@@ -0,0 +1,91 @@
+
+import asyncio
+import threading
+import uuid
+
+import pytest
+
+from app.api.dependencies import get_db
+from app.ml.inference import InferenceExecutor, InferenceOverloaded
+from app.ml.model_loader import model_registry
+
+
+def test_calls_beyond_workers_and_queue_are_rejected():
+    executor = InferenceExecutor(max_workers=2, max_queue=1, retry_after=7)
+    release = threading.Event()
+
+    async def main():
+        admitted = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(3)]
+        await asyncio.sleep(0)
+        with pytest.raises(InferenceOverloaded) as rejected:
+            await executor.run(lambda: None)
+        assert executor.snapshot()["in_flight"] == 3
+        release.set()
+        await asyncio.gather(*admitted)
+        # Capacity is given back once the calls finish
+        return rejected.value, await executor.run(lambda: "ok")
+
+    rejected, result = asyncio.run(main())
+
+    assert rejected.retry_after == 7
+    assert result == "ok"
+    assert executor.snapshot() == {
+        "completed": 4, "rejected": 1, "failed": 0, "in_flight": 0, "max_workers": 2, "max_queue": 1,
+    }
+    executor.shutdown()
+
+
+def test_failed_calls_release_their_slot():
+    executor = InferenceExecutor(max_workers=1, max_queue=0)
+
+    async def main():
+        with pytest.raises(ZeroDivisionError):
+            await executor.run(lambda: 1 / 0)
+        return await executor.run(lambda: 2)
+
+    assert asyncio.run(main()) == 2
+    assert executor.snapshot()["failed"] == 1
+    executor.shutdown()
+
+
+def test_overloaded_inference_returns_503_with_retry_after(app, client, monkeypatch):
+    executor = InferenceExecutor(max_workers=1, max_queue=0, retry_after=5)
+    # Every slot is taken by calls of other requests
+    executor._pending = 1
+    monkeypatch.setattr(model_registry, "_inference_executor", executor)
+    app.dependency_overrides[get_db] = lambda: None
+
+    response = client.get(f"/api/players/{uuid.uuid4()}/similar")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    executor.shutdown()
+
+
+def test_cancelled_callers_keep_their_slot_until_the_job_ends():
+    executor = InferenceExecutor(max_workers=1, max_queue=0)
+    started, release = threading.Event(), threading.Event()
+
+    def job():
+        started.set()
+        release.wait()
+
+    async def main():
+        caller = asyncio.ensure_future(executor.run(job))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        # The client went away, but the thread is still running the job
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        try:
+            with pytest.raises(InferenceOverloaded):
+                # Without admission control this would queue behind the job
+                await asyncio.wait_for(executor.run(lambda: None), timeout=1)
+        finally:
+            release.set()
+        while executor.snapshot()["in_flight"]:
+            await asyncio.sleep(0.01)
+        return await executor.run(lambda: "ok")
+
+    assert asyncio.run(main()) == "ok"
+    assert executor.snapshot()["rejected"] == 1
+    executor.shutdown()
@@ -0,0 +1,93 @@
+
+import inspect
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.dependencies import get_current_active_user, get_db
+from app.api.routes import matches as matches_route
+from app.crud.match import match as match_crud
+from app.ml import match_refresh
+from app.models.match import Match
+from app.schemas.match import MatchCreate
+
+
+def stored(db, user_id):
+    return sorted(
+        m.score for m in db.query(Match).filter(Match.user_id == user_id, Match.match_type == "players")
+    )
+
+
+def test_replace_for_users_replaces_only_the_given_users(db, make_user, monkeypatch):
+    a, b, untouched = make_user(), make_user(), make_user()
+    db.add_all([a, b, untouched])
+    db.flush()
+    for user in (a, b, untouched):
+        match_crud.replace_for_user(db, user_id=user.id, match_type="players", matches=[
+            {"target_id": untouched.id, "score": 0.1},
+        ])
+    commits = []
+    commit = db.commit
+    monkeypatch.setattr(db, "commit", lambda: commits.append(1) or commit())
+
+    match_crud.replace_for_users(db, match_type="players", matches={
+        a.id: [{"target_id": b.id, "score": 0.9}, {"target_id": untouched.id, "score": 0.8}],
+        b.id: [],
+    })
+
+    assert len(commits) == 1
+    assert stored(db, a.id) == [0.8, 0.9]
+    assert stored(db, b.id) == []
+    assert stored(db, untouched.id) == [0.1]
+
+
+def test_match_crud_is_synchronous(db, make_user):
+    user, target = make_user(), make_user()
+    db.add_all([user, target])
+    db.flush()
+
+    assert not any(inspect.iscoroutinefunction(getattr(match_crud, name))
+                   for name in ("get", "get_multi", "create", "update", "remove"))
+    created = match_crud.create(db, obj_in=MatchCreate(
+        user_id=user.id, target_id=target.id, match_type="players", score=0.5,
+    ))
+    assert match_crud.get(db, created.id).score == 0.5
+    assert match_crud.update(db, db_obj=created, obj_in={"score": 0.7}).score == 0.7
+    match_crud.remove(db, id=created.id)
+    assert match_crud.get(db, created.id) is None
+
+
+def test_recompute_all_matches_stores_each_batch_in_one_call(monkeypatch):
+    user_ids = [str(uuid.uuid4()) for _ in range(5)]
+    calls = []
+    monkeypatch.setattr(match_refresh, "SessionLocal", lambda: SimpleNamespace(close=lambda: None))
+    monkeypatch.setattr(match_refresh.feature_store, "get", lambda db: SimpleNamespace(user_ids=user_ids + [None]))
+    monkeypatch.setattr(match_refresh, "compute_player_matches", lambda matrix, batch, top_k: {
+        user_id: [{"score": 1.0}] for user_id in batch
+    })
+    monkeypatch.setattr(match_crud, "replace_for_users", lambda db, *, match_type, matches: calls.append(matches))
+
+    refreshed = match_refresh.recompute_all_matches(batch_size=2)
+
+    assert refreshed == 5
+    assert [len(batch) for batch in calls] == [2, 2, 1]
+    assert [str(user_id) for batch in calls for user_id in batch] == user_ids
+
+
+@pytest.mark.parametrize("match_type,enqueued", [("players", True), ("clubs", False), ("coaches", False)])
+@pytest.mark.parametrize("method,path", [("get", "/api/matches/"), ("post", "/api/matches/calculate")])
+def test_only_supported_match_types_are_refreshed(app, client, make_user, monkeypatch,
+                                                  match_type, enqueued, method, path):
+    refreshed = []
+    monkeypatch.setattr(matches_route, "refresh_user_matches", lambda *args: refreshed.append(args))
+    monkeypatch.setattr(match_crud, "get_top_for_user", lambda db, **kwargs: [])
+    monkeypatch.setattr(match_crud, "count_for_user", lambda db, **kwargs: 0)
+    user = make_user()
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    app.dependency_overrides[get_db] = lambda: None
+
+    response = getattr(client, method)(path, params={"match_type": match_type})
+
+    assert response.status_code == 200
+    assert refreshed == ([(user.id, match_type)] if enqueued else [])
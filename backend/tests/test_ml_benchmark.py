@@ -0,0 +1,17 @@
+
+import pytest
+
+from app.ml.result_cache import result_cache
+from benchmarks.ml_benchmark import run_case
+
+
+@pytest.mark.parametrize("batch_size", [1, 8])
+def test_run_case_measures_searches_not_cache_hits(batch_size):
+    before = result_cache.snapshot()
+
+    case = run_case('similarity', rows=200, n_features=5, batch_size=batch_size, n_queries=16, k=5)
+
+    after = result_cache.snapshot()
+    assert (after["hits"], after["misses"], after["entries"]) == (before["hits"], before["misses"], before["entries"])
+    assert result_cache.max_entries == before["max_entries"]
+    assert case["recall"] == pytest.approx(1.0)
@@ -0,0 +1,145 @@
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.ml.model_loader import model_registry
+
+FEATURES = ['age', 'height', 'speed', 'strength', 'skill']
+
+
+def features(*values):
+    return dict(zip(FEATURES, values))
+
+
+def test_score_candidates_maps_cosine_to_unit_range():
+    user = features(20, 180, 85, 75, 80)
+    opposite = features(-20, -180, -85, -75, -80)
+
+    scores = model_registry.score_candidates(user, [user, opposite, features(0, 0, 0, 0, 0)])
+
+    assert scores.dtype == np.float32
+    np.testing.assert_allclose(scores, [1.0, 0.0, 0.0], atol=1e-6)
+
+
+def test_score_candidates_matches_find_matches_scores():
+    user = features(21, 177, 80, 72, 81)
+    player_3 = features(25, 185, 70, 85, 75)
+
+    matches = {match["id"]: match["score"] for match in model_registry.find_matches(user, 'similarity', top_n=5)}
+    scores = model_registry.score_candidates(user, [player_3])
+
+    assert scores[0] == pytest.approx(matches["3"], abs=1e-5)
+
+
+def test_score_candidates_without_candidates_or_model():
+    assert len(model_registry.score_candidates(features(1, 2, 3, 4, 5), [])) == 0
+    np.testing.assert_array_equal(
+        model_registry.score_candidates(features(1, 2, 3, 4, 5), [{}, {}], model_name='missing'), [0, 0]
+    )
+
+
+def test_upsert_and_remove_vector(restore_models):
+    query = features(30, 170, 60, 90, 70)
+
+    assert model_registry.upsert_vector('new', query)
+    assert model_registry.find_matches(query, 'similarity', top_n=1)[0] == {"id": "new", "score": pytest.approx(1.0)}
+
+    assert model_registry.remove_vector('new')
+    assert 'new' not in [match["id"] for match in model_registry.find_matches(query, 'similarity', top_n=10)]
+    assert not model_registry.remove_vector('new')
+
+
+def test_upsert_racing_a_compaction_lands_on_the_new_index(restore_models):
+    old_index = model_registry.get_model('similarity')['index']
+    model_registry.upsert_vector('warmup', features(1, 1, 1, 1, 1))
+
+    with old_index.lock:
+        # The upsert reads the active model, then blocks on the index lock
+        # while the compaction swaps in a copy of the index
+        writer = threading.Thread(target=model_registry.upsert_vector, args=('late', features(2, 2, 2, 2, 2)))
+        writer.start()
+        time.sleep(0.05)
+        assert model_registry.compact_index(min_changes=1)
+    writer.join(timeout=5)
+
+    new_index = model_registry.get_model('similarity')['index']
+    assert new_index is not old_index
+    assert 'late' in set(new_index.search(np.ones(5), len(new_index))[0])
+
+
+def test_upsert_keeps_the_cached_results_it_cannot_affect(restore_models):
+    query = features(21, 177, 80, 72, 81)
+    first = model_registry.find_matches(query, 'similarity', top_n=2)
+
+    # Points the other way: scores far below the cached top 2
+    model_registry.upsert_vector('far', features(-21, -177, -80, -72, -81))
+    assert model_registry.find_matches(query, 'similarity', top_n=2) is first
+
+    model_registry.upsert_vector('twin', query)
+    assert model_registry.find_matches(query, 'similarity', top_n=2)[0]["id"] == 'twin'
+
+
+@pytest.fixture
+def random_similarity_model(restore_models):
+    """A 300-row similarity model over eight features, with its raw vectors"""
+    from app.ml.vector_index import SimilarityIndex
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((300, 8))
+    names = [f"f{i}" for i in range(8)]
+    ids = np.array([f"p{i}" for i in range(300)])
+    model_registry._models = dict(model_registry._models, similarity={
+        'feature_names': names, 'index': SimilarityIndex(ids, vectors), 'version': 'random',
+    })
+    return names, ids, vectors
+
+
+def test_find_matches_ranks_by_cosine_over_the_whole_index(random_similarity_model):
+    names, ids, vectors = random_similarity_model
+    query = np.random.default_rng(1).standard_normal(8)
+
+    matches = model_registry.find_matches(dict(zip(names, query)), 'similarity', top_n=10)
+
+    cosine = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    order = np.argsort(-cosine)[:10]
+    assert [match["id"] for match in matches] == list(ids[order])
+    np.testing.assert_allclose([match["score"] for match in matches], (cosine[order] + 1) / 2, atol=1e-5)
+    assert len(model_registry.find_matches(dict(zip(names, query)), 'similarity', top_n=500)) == 300
+
+
+@pytest.mark.parametrize("model_name", ['knn', 'similarity'])
+def test_find_matches_batch_equals_one_call_per_user(model_name):
+    users = [features(20 + i, 170 + 3 * i, 60 + 5 * i, 90 - 4 * i, 70 + i) for i in range(7)]
+
+    batch = model_registry.find_matches_batch(users, top_n=3, model_name=model_name)
+
+    assert len(batch) == len(users)
+    for user, matches in zip(users, batch):
+        single = model_registry.find_matches(user, model_name, top_n=3)
+        assert [m["id"] for m in matches] == [m["id"] for m in single]
+        np.testing.assert_allclose([m["score"] for m in matches], [m["score"] for m in single], atol=1e-6)
+
+
+def test_find_matches_batch_without_users_or_model():
+    assert model_registry.find_matches_batch([], top_n=3) == []
+    assert model_registry.find_matches_batch([{}, {}], top_n=2, model_name='missing') == [
+        model_registry._fallback_matches(2)
+    ] * 2
+
+
+def test_find_matches_batch_serves_and_fills_the_cache_when_asked(random_similarity_model):
+    from app.ml.result_cache import result_cache
+
+    names, _, vectors = random_similarity_model
+    users = [dict(zip(names, row)) for row in vectors[:4]]
+    before = result_cache.snapshot()
+
+    first = model_registry.find_matches_batch(users, top_n=5, model_name='similarity', use_cache=True)
+    again = model_registry.find_matches_batch(users, top_n=5, model_name='similarity', use_cache=True)
+
+    assert again == first
+    after = result_cache.snapshot()
+    assert (after["misses"] - before["misses"], after["hits"] - before["hits"]) == (4, 4)
@@ -0,0 +1,74 @@
+
+import os
+
+import numpy as np
+import pytest
+
+from app.api.dependencies import get_current_user
+from app.core.config import settings
+from app.ml.artifacts import manifest_path, save_artifact
+from app.ml.model_loader import model_registry
+from app.ml.result_cache import result_cache
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch, restore_models):
+    """An empty model directory the registry reloads from"""
+    monkeypatch.setattr(settings, "MODEL_ARTIFACT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "KNN_MODEL_PATH", str(tmp_path / "knn_model.pkl"))
+    monkeypatch.setattr(settings, "SIMILARITY_MODEL_PATH", str(tmp_path / "similarity_model.pkl"))
+    fingerprint = model_registry._fingerprint
+    yield tmp_path
+    model_registry._fingerprint = fingerprint
+
+
+def publish(directory, model_name, version):
+    vectors = np.random.default_rng(0).random((4, 3), dtype=np.float32)
+    save_artifact(
+        str(directory), model_name, vectors=vectors, ids=[f"id{i}" for i in range(4)],
+        feature_names=['a', 'b', 'c'], metric='cosine', version=version,
+    )
+
+
+def test_reload_swaps_in_new_versions_once(model_dir):
+    publish(model_dir, 'knn', "v1")
+    publish(model_dir, 'similarity', "v1")
+    query = result_cache.query(np.ones(3), 'similarity', "v0", 2)
+    result_cache.set(query, [{"id": "a", "score": 1.0}])
+
+    assert model_registry.reload() is True
+    assert model_registry.model_versions() == {'knn': "v1", 'similarity': "v1"}
+    assert result_cache.get(query) is None
+    # Nothing changed on disk since
+    assert model_registry.reload() is False
+    assert model_registry.reload(force=True) is True
+
+
+def test_broken_files_keep_the_current_models(model_dir):
+    publish(model_dir, 'knn', "v1")
+    publish(model_dir, 'similarity', "v1")
+    model_registry.reload()
+
+    path = manifest_path(str(model_dir), 'similarity')
+    with open(path, "w") as f:
+        f.write("{not json")
+    os.utime(path, ns=(0, 0))
+
+    assert model_registry.reload() is False
+    assert model_registry.model_versions() == {'knn': "v1", 'similarity': "v1"}
+    # The broken files are only retried once they change again
+    assert model_registry._fingerprint == model_registry._artifact_fingerprint()
+
+
+@pytest.mark.parametrize("is_superuser,status", [(True, 202), (False, 403)])
+def test_reload_route_runs_in_the_background(app, client, make_user, monkeypatch, is_superuser, status):
+    calls = []
+    monkeypatch.setattr(model_registry, "reload", lambda force: calls.append(force))
+    app.dependency_overrides[get_current_user] = lambda: make_user(is_superuser=is_superuser)
+
+    response = client.post("/api/models/reload", params={"force": True})
+
+    assert response.status_code == status
+    assert calls == ([True] if is_superuser else [])
+    if is_superuser:
+        assert response.json()["status"] == "reloading"
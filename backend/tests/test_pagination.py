@@ -0,0 +1,63 @@
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.api.dependencies import get_db
+from app.db.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.models.player import PlayerProfile
+
+
+def test_cursor_round_trips_the_key_types():
+    key = [datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc), uuid.uuid4()]
+
+    cursor = encode_cursor(key)
+
+    assert decode_cursor(cursor, [PlayerProfile.created_at, PlayerProfile.id]) == key
+    assert "=" not in cursor
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor(["2024-05-01"]), encode_cursor(["x", "y"])])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, [PlayerProfile.created_at, PlayerProfile.id])
+
+
+@pytest.fixture
+def players(db):
+    """25 players of one position; created_at ties in groups of five"""
+    position = f"pager-{uuid.uuid4().hex}"
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = [
+        PlayerProfile(position=position, age=20, created_at=start + timedelta(minutes=i // 5))
+        for i in range(25)
+    ]
+    db.add_all(rows)
+    db.flush()
+    return position, rows
+
+
+def test_pages_walk_every_row_once_newest_first(app, client, db, players):
+    position, rows = players
+    app.dependency_overrides[get_db] = lambda: db
+    seen, cursor, pages = [], None, 0
+
+    while True:
+        response = client.get("/api/players/", params={"position": position, "limit": 7, "cursor": cursor})
+        assert response.status_code == 200
+        seen += [player["id"] for player in response.json()]
+        pages += 1
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    expected = sorted(rows, key=lambda row: (row.created_at, row.id), reverse=True)
+    assert seen == [str(row.id) for row in expected]
+    assert pages == 4
+
+
+def test_invalid_cursor_is_a_bad_request(app, client, db):
+    app.dependency_overrides[get_db] = lambda: db
+
+    assert client.get("/api/players/", params={"cursor": "garbage"}).status_code == 400
@@ -0,0 +1,90 @@
+
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app.api.dependencies import get_db
+from app.models.player import PlayerProfile
+from app.models.player_experience import PlayerExperience
+from app.models.player_highlight import PlayerHighlight
+
+
+@pytest.fixture
+def players(db):
+    """Players of one position, each with two experiences and one highlight"""
+    def make(count):
+        position = f"expand-{uuid.uuid4().hex}"
+        rows = [
+            PlayerProfile(
+                position=position, age=20,
+                experiences=[
+                    PlayerExperience(club=f"Club {i}-{j}", position="cb", from_date=datetime(2020, 1, 1))
+                    for j in range(2)
+                ],
+                highlights=[PlayerHighlight(title=f"Goal {i}", media_url="https://x", media_type="video")],
+            )
+            for i in range(count)
+        ]
+        db.add_all(rows)
+        db.flush()
+        db.expire_all()
+        return position
+    return make
+
+
+@pytest.fixture
+def selects(app, db, pg_engine):
+    """SELECT statements run while serving requests against the test session"""
+    app.dependency_overrides[get_db] = lambda: db
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(pg_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(pg_engine, "before_cursor_execute", record)
+
+
+@pytest.mark.parametrize("count", [2, 10])
+def test_expanded_page_loads_relations_in_one_query_each(client, players, selects, count):
+    position = players(count)
+
+    response = client.get("/api/players/", params={"position": position, "expand": "experiences,highlights"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body) == count
+    assert all(len(player["experiences"]) == 2 and len(player["highlights"]) == 1 for player in body)
+    # The page, then one SELECT ... IN per relationship, however many players
+    assert len(selects) == 3
+
+
+def test_unexpanded_responses_leave_the_relations_out(client, players, selects):
+    position = players(3)
+
+    body = client.get("/api/players/", params={"position": position}).json()
+
+    assert len(body) == 3
+    assert not any("experiences" in player or "highlights" in player for player in body)
+    assert len(selects) == 1
+
+
+def test_single_player_expands_only_what_was_asked(client, players, selects, db):
+    position = players(1)
+    player_id = db.query(PlayerProfile.id).filter(PlayerProfile.position == position).scalar()
+
+    body = client.get(f"/api/players/{player_id}", params={"expand": "highlights"}).json()
+
+    assert body["highlights"][0]["title"] == "Goal 0"
+    assert "experiences" not in body
+
+
+def test_unknown_expand_field_is_a_bad_request(client, selects):
+    response = client.get("/api/players/", params={"expand": "experiences,agents"})
+
+    assert response.status_code == 400
+    assert "agents" in response.json()["detail"]
@@ -0,0 +1,129 @@
+
+import io
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.api.dependencies import get_current_active_superuser, get_db
+from app.db.player_import import import_players
+from app.ml.model_loader import model_registry
+from app.ml.result_cache import result_cache
+from app.models.player import PlayerProfile
+from app.models.player_experience import PlayerExperience
+from app.models.profile import Profile
+from app.models.user import UserRole
+
+
+@pytest.fixture
+def import_db(pg_engine):
+    """
+    Session that really commits, as the import relies on ON COMMIT DELETE ROWS
+    staging tables; the imported rows are deleted afterwards
+    """
+    db = Session(pg_engine)
+    yield db
+    db.rollback()
+    db.execute(text("DELETE FROM player_experiences"))
+    db.execute(text("DELETE FROM player_profiles"))
+    db.execute(text("DELETE FROM profiles"))
+    db.commit()
+    db.close()
+
+
+def player(**fields):
+    return {"position": "Forward", "age": 21, **fields}
+
+
+def jsonl(*rows):
+    return "".join((row if isinstance(row, str) else json.dumps(row)) + "\n" for row in rows)
+
+
+def test_jsonl_rows_are_merged_and_rejected_rows_reported(import_db):
+    profile = Profile()
+    import_db.add(profile)
+    import_db.commit()
+    existing = PlayerProfile(position="Defender", age=30)
+    import_db.add(existing)
+    import_db.commit()
+
+    report = import_players(import_db, io.StringIO(jsonl(
+        player(profile_id=str(profile.id), experiences=[{"club": "A", "position": "ST", "from_date": "2020-01-01"}]),
+        player(age="old"),
+        player(id=str(existing.id), position="Midfielder", age=31),
+        player(profile_id="00000000-0000-0000-0000-000000000000"),
+        player(market_value=2 ** 40),
+        "[1, 2]",
+    )), "jsonl", batch_size=2)
+
+    assert (report["rows"], report["inserted"], report["updated"], report["failed"]) == (6, 1, 1, 4)
+    assert [error["line"] for error in report["errors"]] == [2, 4, 5, 6]
+    assert "rejected by the database" in report["errors"][2]["error"]
+    import_db.expire_all()
+    assert import_db.get(PlayerProfile, existing.id).position == "Midfielder"
+    new = import_db.query(PlayerProfile).filter(PlayerProfile.profile_id == profile.id).one()
+    assert [e.club for e in import_db.query(PlayerExperience).filter(PlayerExperience.player_id == new.id)] == ["A"]
+
+
+def test_csv_rows_with_json_columns(import_db):
+    csv = (
+        "position,age,skills,stats\n"
+        'Forward,19,"[""dribbling""]","{""speed"": 90}"\n'
+        "Keeper,notanumber,,\n"
+    )
+
+    report = import_players(import_db, io.StringIO(csv, newline=""), "csv")
+
+    assert (report["inserted"], report["failed"]) == (1, 1)
+    assert report["errors"][0]["line"] == 3
+    assert import_db.query(PlayerProfile).one().skills == ["dribbling"]
+
+
+def raw_jsonl(errors):
+    data = (jsonl(player(age=18), player(age=19)) + '{"position": "Forward", "age": 20, "nationality": "\xff"}\n'
+            + jsonl(player(age=21))).encode("utf-8")
+    # A Latin-1 byte on line 3, invalid in UTF-8
+    data = data.replace("\xff".encode("utf-8"), b"\xff")
+    return io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", errors=errors, newline="")
+
+
+def test_invalid_utf8_rows_are_reported_one_by_one(import_db):
+    report = import_players(import_db, raw_jsonl("surrogateescape"), "jsonl", batch_size=1)
+
+    assert (report["rows"], report["inserted"], report["failed"]) == (4, 3, 1)
+    assert report["errors"] == [{"line": 3, "error": "not valid UTF-8"}]
+
+
+def test_strictly_decoded_stream_keeps_the_partial_report(import_db):
+    stream = raw_jsonl("strict")
+    # Small reads, so the rows before the bad byte are decoded on their own
+    stream._CHUNK_SIZE = 16
+
+    report = import_players(import_db, stream, "jsonl", batch_size=1)
+
+    assert report["inserted"] == 2
+    assert report["errors"] == [{"line": 3, "error": "not valid UTF-8, the rest of the file was not read"}]
+    assert import_db.query(PlayerProfile).count() == 2
+
+
+def test_import_route_indexes_players_and_drops_cached_results(app, client, import_db, make_user,
+                                                                 restore_models):
+    app.dependency_overrides[get_current_active_superuser] = lambda: make_user(UserRole.ADMIN, is_superuser=True)
+    app.dependency_overrides[get_db] = lambda: import_db
+    query = {'age': 21, 'height': 177, 'speed': 80, 'strength': 72, 'skill': 81}
+    cached = result_cache.query(
+        model_registry._preprocess_features(query, 'similarity'), 'similarity',
+        model_registry.get_model_version('similarity'), 3,
+    )
+    model_registry.find_matches(query, 'similarity', top_n=3)
+    assert result_cache.get(cached) is not None
+
+    upload = jsonl(player(age=21, height=177, stats={"speed": 80, "strength": 72, "skill": 81}))
+    response = client.post("/api/players/import", files={"file": ("players.jsonl", upload.encode())})
+
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 1
+    imported = str(import_db.query(PlayerProfile.id).scalar())
+    assert result_cache.get(cached) is None
+    assert model_registry.find_matches(query, 'similarity', top_n=1)[0]["id"] == imported
@@ -0,0 +1,59 @@
+
+import pytest
+
+from app.api.dependencies import get_current_active_user, get_db
+from app.ml.feature_store import feature_store, player_features
+from app.ml.model_loader import model_registry
+from app.models.player import PlayerProfile
+from app.models.profile import Profile
+
+
+@pytest.fixture
+def writer(app, db, make_user, restore_models):
+    """A user with a profile, signed in against the test session, and one existing player"""
+    user = make_user()
+    profile = Profile(user_id=user.id)
+    existing = PlayerProfile(profile=Profile(), position="Defender", age=24, height=185.0, weight=80.0)
+    db.add_all([user, profile, existing])
+    db.flush()
+    model_registry.upsert_vector(str(existing.id), player_features(existing))
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    app.dependency_overrides[get_db] = lambda: db
+    # The store holds a matrix from before the writes
+    feature_store.invalidate()
+    feature_store.get(db)
+    yield profile, existing
+    feature_store.invalidate()
+
+
+def similar_ids(client, player_id, **params):
+    response = client.get(f"/api/players/{player_id}/similar", params=params)
+    assert response.status_code == 200
+    return [match["player"]["id"] for match in response.json()]
+
+
+def test_created_player_is_matchable_right_away(client, writer):
+    profile, existing = writer
+
+    created = client.post("/api/players/", json={
+        "profile_id": str(profile.id), "position": "Defender", "age": 23, "height": 186.0, "weight": 81.0,
+    })
+
+    assert created.status_code == 200
+    player_id = created.json()["id"]
+    assert str(existing.id) in similar_ids(client, player_id)
+    assert player_id in similar_ids(client, existing.id)
+
+
+def test_updated_player_is_filtered_on_its_new_attributes(client, writer):
+    profile, existing = writer
+    player_id = client.post("/api/players/", json={
+        "profile_id": str(profile.id), "position": "Defender", "age": 23, "height": 186.0, "weight": 81.0,
+    }).json()["id"]
+    assert player_id in similar_ids(client, existing.id, position="defender")
+
+    updated = client.put(f"/api/players/{player_id}", json={"position": "Forward"})
+
+    assert updated.status_code == 200
+    assert player_id not in similar_ids(client, existing.id, position="defender")
+    assert player_id in similar_ids(client, existing.id, position="forward")
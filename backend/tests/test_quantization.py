@@ -0,0 +1,63 @@
+
+import numpy as np
+import pytest
+
+from app.ml.ann_index import recall_at_k
+from app.ml.quantization import QuantizedMatrix, quantization_report
+from app.ml.vector_index import SimilarityIndex
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).standard_normal((2000, 16)).astype(np.float32)
+
+
+def test_int8_error_is_at_most_half_a_step(vectors):
+    quantized = QuantizedMatrix.quantize(vectors, 'int8')
+
+    error = np.abs(quantized.dequantize() - vectors)
+
+    assert quantized.codes.dtype == np.int8
+    assert (error <= quantized.scale / 2 + 1e-6).all()
+
+
+def test_dot_scores_the_stored_rows_without_dequantizing(vectors):
+    queries = np.random.default_rng(1).standard_normal((5, 16)).astype(np.float32)
+
+    for mode in ('float16', 'int8'):
+        quantized = QuantizedMatrix.quantize(vectors, mode)
+        np.testing.assert_allclose(quantized.dot(queries), queries @ quantized.dequantize().T, rtol=1e-4, atol=1e-3)
+
+
+def test_append_keeps_codes_and_saturates_out_of_range_rows(vectors):
+    quantized = QuantizedMatrix.quantize(vectors[:100], 'int8')
+
+    appended = quantized.append(np.stack([vectors[100], np.full(16, 1e6)]))
+
+    np.testing.assert_array_equal(appended.codes[:100], quantized.codes)
+    assert (appended.codes[101] == 127).all()
+    # A constant dimension encodes exactly to its offset
+    constant = QuantizedMatrix.quantize(np.ones((3, 2)), 'int8')
+    np.testing.assert_array_equal(constant.dequantize(), np.ones((3, 2)))
+
+
+def test_report_bounds_recall_and_score_error(vectors):
+    queries = np.random.default_rng(1).standard_normal((50, 16))
+
+    report = {row["mode"]: row for row in quantization_report(vectors, queries, k=10)}
+
+    assert report["float16"]["recall"] >= 0.99 and report["float16"]["max_abs_error"] < 1e-3
+    assert report["int8"]["recall"] >= 0.9 and report["int8"]["max_abs_error"] < 0.05
+    assert report["float16"]["compression"] == pytest.approx(2, rel=0.01)
+    assert report["int8"]["compression"] == pytest.approx(4, rel=0.01)
+
+
+@pytest.mark.parametrize("storage", ['float16', 'int8'])
+def test_quantized_index_search_recall(vectors, storage):
+    ids = np.arange(len(vectors))
+    queries = np.random.default_rng(2).standard_normal((20, 16))
+    exact, _ = SimilarityIndex(ids, vectors).search_batch(queries, 10)
+
+    found, _ = SimilarityIndex(ids, vectors, storage=storage).search_batch(queries, 10)
+
+    assert recall_at_k(found.astype(int), exact.astype(int)) >= 0.9
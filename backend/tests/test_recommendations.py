@@ -0,0 +1,126 @@
+
+import uuid
+from types import SimpleNamespace
+
+from app.api.dependencies import get_current_active_user, get_db
+from app.core.config import settings
+from app.db.supabase_client import get_supabase_client
+
+
+class FakeQuery:
+    """The subset of a supabase-py table query the recommendations route uses"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, column, value):
+        return FakeQuery([row for row in self.rows if row.get(column) == value])
+
+    def neq(self, column, value):
+        return FakeQuery([row for row in self.rows if row.get(column) != value])
+
+    def limit(self, count):
+        return FakeQuery(self.rows[:count])
+
+    def execute(self):
+        return SimpleNamespace(data=self.rows)
+
+
+class FakeSupabase:
+    def __init__(self, profiles):
+        self.profiles = profiles
+
+    def table(self, name):
+        return FakeQuery(self.profiles)
+
+
+def player_profile(profile_id, age, height, speed, strength, skill, position="forward"):
+    return {
+        "id": str(profile_id),
+        "user_type": "player",
+        "full_name": f"Player {age}",
+        "player_details": {
+            "age": age, "height": height, "position": position,
+            "stats": {"speed": speed, "strength": strength, "skill": skill},
+        },
+    }
+
+
+def recommend(app, client, profiles, user, **params):
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[get_supabase_client] = lambda: FakeSupabase(profiles)
+    return client.get("/api/recommendations/", params={"recommendation_type": "players", **params})
+
+
+def test_recommendations_rank_candidates_by_model_score(app, client, make_user):
+    user = make_user()
+    twin, near, far = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    profiles = [
+        player_profile(user.id, 20, 180, 85, 75, 80),
+        player_profile(far, 35, 150, 10, 90, 5),
+        player_profile(near, 22, 178, 80, 70, 78),
+        player_profile(twin, 20, 180, 85, 75, 80),
+    ]
+
+    response = recommend(app, client, profiles, user)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 3
+    assert body["model_version"] == "default"
+    items = body["items"]
+    assert [item["id"] for item in items] == [str(twin), str(near), str(far)]
+    assert items[0]["score"] >= items[1]["score"] >= items[2]["score"]
+
+
+def test_recommendations_page_with_skip_and_limit(app, client, make_user):
+    user = make_user()
+    profiles = [player_profile(user.id, 20, 180, 85, 75, 80)] + [
+        player_profile(uuid.uuid4(), 20 + i, 180 - i, 85 - i, 75, 80) for i in range(6)
+    ]
+
+    everything = recommend(app, client, profiles, user, limit=6).json()["items"]
+    second_page = recommend(app, client, profiles, user, skip=2, limit=2).json()["items"]
+
+    assert [item["id"] for item in second_page] == [item["id"] for item in everything[2:4]]
+
+
+def test_recommendations_reject_unknown_type(app, client, make_user):
+    app.dependency_overrides[get_current_active_user] = lambda: make_user()
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[get_supabase_client] = lambda: FakeSupabase([])
+
+    response = client.get("/api/recommendations/", params={"recommendation_type": "teams"})
+
+    assert response.status_code == 400
+
+
+def test_recommendation_scores_are_in_unit_range(app, client, make_user):
+    user = make_user()
+    profiles = [player_profile(user.id, 20, 180, 85, 75, 80)] + [
+        player_profile(uuid.uuid4(), age, 190 - age, 90 - age, 60 + age, 70) for age in range(16, 36, 4)
+    ]
+
+    items = recommend(app, client, profiles, user).json()["items"]
+
+    assert len(items) == 5
+    assert all(0.0 <= item["score"] <= 1.0 for item in items)
+
+
+def test_pages_beyond_the_window_are_rejected(app, client, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "RECOMMENDATION_WINDOW", 5)
+    user = make_user()
+    profiles = [player_profile(user.id, 20, 180, 85, 75, 80)] + [
+        player_profile(uuid.uuid4(), 20 + i, 180 - i, 85 - i, 75, 80) for i in range(10)
+    ]
+
+    within = recommend(app, client, profiles, user, skip=3, limit=2)
+    assert within.status_code == 200
+    assert within.json()["total"] == 5
+    assert recommend(app, client, profiles, user, skip=4, limit=2).status_code == 400
+    assert recommend(app, client, profiles, user, limit=10_000).status_code == 400
+    assert recommend(app, client, profiles, user, skip=-1).status_code == 422
@@ -0,0 +1,76 @@
+
+import numpy as np
+import pytest
+
+from app.ml.feature_store import PlayerFeatureMatrix
+from app.ml.requirements import club_match_rows, compile_requirements, compiled_for
+
+USER_IDS = [
+    "00000000-0000-0000-0000-000000000001", "00000000-0000-0000-0000-000000000002",
+    "", "00000000-0000-0000-0000-000000000004", "00000000-0000-0000-0000-000000000005",
+]
+
+
+@pytest.fixture
+def matrix():
+    #              height  age  market_value  skill.heading
+    values = np.array([
+        [190, 21, 1_000_000, 1],
+        [186, 22, 5_000_000, 1],
+        [191, 20, 500_000, 1],
+        [180, 21, 100_000, 1],
+        [192, np.nan, 200_000, 0],
+    ], dtype=np.float32)
+    return PlayerFeatureMatrix(
+        np.array([f"p{i}" for i in range(5)]), np.array(USER_IDS),
+        ['height', 'age', 'market_value', 'skill.heading'], values,
+        categories={
+            'position': np.array(["cb", "cb", "cb", "lb", "cb"], dtype=object),
+            'preferred_foot': np.array(["left", "right", "left", "left", "left"], dtype=object),
+            'nationality': np.full(5, "", dtype=object),
+        },
+    )
+
+
+def test_compiled_mask_matches_each_requirement(matrix):
+    compiled = compile_requirements(
+        {"positions": ["CB"], "age": {"max": 22}, "height": {"min": 185}, "skills": ["heading"], "style": "press"},
+        budget={"transfer_budget": 2_000_000},
+    )
+
+    # p1 is over budget, p3 plays lb, p4's age is unknown
+    np.testing.assert_array_equal(compiled.mask(matrix), [True, False, True, False, False])
+    assert compiled.ignored == ["style"]
+
+
+def test_top_k_ranks_by_weighted_fit(matrix):
+    compiled = compile_requirements({"position": "cb", "weights": {"height": 1, "market_value": -1}})
+
+    rows, scores = compiled.top_k(matrix, 2)
+
+    height = (np.array([190, 186, 191, 192]) - 180) / 12
+    cheap = 1 - (np.array([1_000_000, 5_000_000, 500_000, 200_000]) - 100_000) / 4_900_000
+    expected = (height + cheap) / 2
+    assert list(rows) == [4, 2]
+    np.testing.assert_allclose(scores, expected[[3, 2]], rtol=1e-5)
+
+
+@pytest.mark.parametrize("requirements", [{"position": 3}, {"skills": "heading"}, {"weights": [1]}])
+def test_wrongly_shaped_requirements_are_rejected(requirements):
+    with pytest.raises(ValueError):
+        compile_requirements(requirements)
+
+
+def test_compiled_for_memoizes_equal_documents():
+    first = compiled_for({"age": {"max": 23}, "position": "cb"}, {"max_market_value": 10})
+
+    assert compiled_for({"position": "cb", "age": {"max": 23}}, {"max_market_value": 10}) is first
+    assert compiled_for({"position": "cb"}, None) is not first
+
+
+def test_match_rows_skip_players_without_a_user(matrix):
+    rows = club_match_rows(matrix, compile_requirements({"position": "cb", "weights": {"height": 1}}), 3)
+
+    # p2 ranks second by height but has no user to match
+    assert [row["match_data"]["player_id"] for row in rows] == ["p4", "p0"]
+    assert str(rows[0]["target_id"]) == USER_IDS[4]
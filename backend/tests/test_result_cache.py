@@ -0,0 +1,168 @@
+
+import numpy as np
+import pytest
+
+from app.ml.result_cache import CHANGE_LOG_SIZE, MatchResultCache
+
+X, Y = np.array([1.0, 0.0, 0.0]), np.array([0.0, 1.0, 0.0])
+
+
+def results(*pairs):
+    return [{"id": row_id, "score": score} for row_id, score in pairs]
+
+
+def cached(cache, vector, value, top_n=2):
+    query = cache.query(vector, 'similarity', 'v1', top_n)
+    cache.set(query, value)
+    return query
+
+
+def test_row_changes_evict_only_the_results_they_can_affect():
+    cache = MatchResultCache()
+    near_x = cached(cache, X, results(("a", 0.99), ("b", 0.95)))
+    near_y = cached(cache, Y, results(("c", 0.99), ("d", 0.95)))
+    short = cached(cache, -X, results(("e", 0.9)))
+
+    # Far from both queries, but the short result list has room for it
+    cache.row_changed('similarity', "new", -Y)
+    assert cache.get(near_x) is not None and cache.get(near_y) is not None
+    assert cache.get(short) is None
+
+    # Scores 1.0 against X, above its weakest cached score
+    cache.row_changed('similarity', "new", X)
+    assert cache.get(near_x) is None and cache.get(near_y) is not None
+
+    # Removing a row only matters to results that contain it
+    cache.row_changed('similarity', "elsewhere")
+    assert cache.get(near_y) is not None
+    cache.row_changed('similarity', "d")
+    assert cache.get(near_y) is None
+
+
+def test_results_computed_across_an_affecting_change_are_not_stored():
+    cache = MatchResultCache()
+    query = cache.query(X, 'similarity', 'v1', 2)
+    unaffected = cache.query(Y, 'similarity', 'v1', 2)
+
+    # The search ran on the index before the row changed
+    cache.row_changed('similarity', "b")
+    cache.set(query, results(("a", 0.99), ("b", 0.95)))
+    cache.set(unaffected, results(("c", 0.99), ("d", 0.95)))
+
+    assert cache.get(query) is None
+    assert cache.get(unaffected) is not None
+
+
+def test_invalidate_drops_every_entry_of_the_model():
+    cache = MatchResultCache()
+    query = cached(cache, X, results(("a", 0.99), ("b", 0.95)))
+    knn = cache.query(X, 'knn', 'v1', 2)
+    cache.set(knn, results(("a", 0.5), ("b", 0.4)))
+
+    cache.invalidate('similarity')
+
+    assert cache.get(query) is None
+    assert cache.get(knn) is not None
+    assert cache.snapshot()["invalidations"] == 1
+
+
+class CountingRedis:
+    """A fakeredis client that counts the round trips of plain GETs"""
+
+    def __init__(self, client):
+        self.client = client
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        return self.client.get(key)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+@pytest.fixture
+def workers():
+    """Two caches, as in two API workers, sharing one Redis"""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    # sync_interval=0 reads other workers' changes on every lookup
+    return [
+        MatchResultCache(redis_client=CountingRedis(fakeredis.FakeRedis(server=server)), sync_interval=0)
+        for _ in range(2)
+    ]
+
+
+def test_lookups_do_not_read_the_generation_from_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = CountingRedis(fakeredis.FakeRedis())
+    cache = MatchResultCache(redis_client=redis, sync_interval=60)
+    query = cached(cache, X, results(("a", 0.99), ("b", 0.95)))
+
+    for _ in range(10):
+        assert cache.get(cache.query(X, 'similarity', 'v1', 2)) is not None
+
+    # Local hits never touch Redis, and the change stream is read once per interval
+    assert redis.gets == 0
+    assert cache.query(X, 'similarity', 'v1', 2).key == query.key
+
+
+def test_changes_reach_the_other_workers(workers):
+    a, b = workers
+    b.query(X, 'similarity', 'v1', 2)
+    near_x = cached(b, X, results(("a", 0.99), ("b", 0.95)))
+    near_y = cached(b, Y, results(("c", 0.99), ("d", 0.95)))
+
+    a.row_changed('similarity', "new", X)
+
+    assert b.get(b.query(X, 'similarity', 'v1', 2)) is None
+    assert b.get(near_y) is not None
+    assert near_x.key not in b._entries
+
+
+def test_shared_entries_are_checked_against_later_changes(workers):
+    a, b = workers
+    near_x = cached(a, X, results(("a", 0.99), ("b", 0.95)))
+    cached(a, Y, results(("c", 0.99), ("d", 0.95)))
+
+    # b has only the shared tier; the change happens before b reads it
+    b.query(X, 'similarity', 'v1', 2)
+    a.row_changed('similarity', "a")
+
+    assert b.get(b.query(X, 'similarity', 'v1', 2)) is None
+    assert b.get(b.query(Y, 'similarity', 'v1', 2)) == results(("c", 0.99), ("d", 0.95))
+    assert b.snapshot()["redis_hits"] == 1
+    assert near_x.key not in b._entries
+
+
+def test_invalidate_reaches_the_other_workers(workers):
+    a, b = workers
+    query = cached(b, X, results(("a", 0.99), ("b", 0.95)))
+
+    a.invalidate('similarity')
+
+    assert b.get(b.query(X, 'similarity', 'v1', 2)) is None
+    assert query.key not in b._entries
+
+
+def test_trimmed_changes_drop_the_local_entries(workers):
+    a, b = workers
+    b.query(X, 'similarity', 'v1', 2)
+    query = cached(b, X, results(("a", 0.99), ("b", 0.95)))
+
+    # More removals of unrelated rows than the stream keeps: b cannot tell what it missed
+    for i in range(CHANGE_LOG_SIZE + 1):
+        a.row_changed('similarity', f"gone-{i}")
+
+    b.query(X, 'similarity', 'v1', 2)
+    assert query.key not in b._entries
+
+
+def test_changes_evict_queries_over_other_features():
+    cache = MatchResultCache()
+    # Cached before a reload changed the model's feature count
+    query = cached(cache, np.array([1.0, 0.0]), results(("a", 0.99), ("b", 0.95)))
+
+    cache.row_changed('similarity', "new", -X)
+
+    assert cache.get(query) is None
@@ -0,0 +1,71 @@
+
+import threading
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.ml import model_loader
+from app.ml.model_loader import model_registry
+from app.ml.scoring_pool import ShardedScoringPool
+from app.ml.vector_index import SimilarityIndex
+
+
+def test_sharded_search_matches_inline_search():
+    rng = np.random.default_rng(0)
+    vectors = {f"u{i}": rng.standard_normal(16) for i in range(3000)}
+    vectors["zero"] = np.zeros(16)
+    index = SimilarityIndex.from_vectors(vectors)
+    index.remove("u7")
+    index.upsert("u8", rng.standard_normal(16))
+    queries = rng.standard_normal((6, 16))
+    queries[0] = 0
+
+    pool = ShardedScoringPool(2, min_rows=1)
+    try:
+        sharded_ids, sharded_scores = index.search_batch(queries, 20, pool=pool)
+    finally:
+        pool.shutdown()
+    inline_ids, inline_scores = index.search_batch(queries, 20)
+
+    np.testing.assert_allclose(sharded_scores, inline_scores, atol=1e-5)
+    # Ties (e.g. the all-zero query) may order differently; the rest must agree
+    np.testing.assert_array_equal(sharded_ids[1:], inline_ids[1:])
+    assert "u7" not in set(sharded_ids.ravel())
+
+
+def test_concurrent_first_calls_create_one_pool(monkeypatch):
+    created = []
+
+    class SlowPool:
+        def __init__(self, n_workers, min_rows=0):
+            time.sleep(0.05)
+            created.append(self)
+
+        def shutdown(self):
+            pass
+
+    monkeypatch.setattr(model_loader, "ShardedScoringPool", SlowPool)
+    monkeypatch.setattr(settings, "SCORING_WORKERS", 2)
+    model_registry.stop_scoring_pool()
+
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(model_registry.scoring_pool())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    try:
+        assert len(created) == 1
+        assert all(pool is created[0] for pool in pools)
+    finally:
+        model_registry.stop_scoring_pool()
+    assert model_registry._scoring_pool is None
+
+
+def test_no_pool_without_workers(monkeypatch):
+    monkeypatch.setattr(settings, "SCORING_WORKERS", 0)
+    model_registry.stop_scoring_pool()
+
+    assert model_registry.scoring_pool() is None
@@ -0,0 +1,77 @@
+
+import pytest
+
+from app.api.dependencies import get_db
+from app.ml.set_index import MinHashLSH, set_index_store, set_tokens
+from app.models.coach import CoachProfile
+from app.models.profile import Profile
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+def test_set_tokens_are_prefixed_and_normalized():
+    assert set_tokens({"languages": [" English", "SPANISH", ""], "regions": None}) == {
+        "languages:english", "languages:spanish",
+    }
+
+
+def test_estimates_track_jaccard_similarity():
+    base = {f"skill:{i}" for i in range(20)}
+    sets = [base, set(list(base)[:15]) | {"skill:x"}, set(list(base)[:5]) | {f"other:{i}" for i in range(15)}]
+    index = MinHashLSH(num_perm=256, bands=64).fit(["same", "close", "far"], sets)
+
+    estimates = dict(index.query(base, top_n=3))
+
+    assert estimates["same"] == 1.0
+    assert estimates["close"] == pytest.approx(jaccard(base, sets[1]), abs=0.1)
+    # Rarely shares a band at this similarity; estimated fairly when it does
+    if "far" in estimates:
+        assert estimates["far"] == pytest.approx(jaccard(base, sets[2]), abs=0.1)
+    assert index.query(base, top_n=1, exclude="same")[0][0] == "close"
+    assert index.query(set(), top_n=3) == []
+
+
+def test_save_and_load_round_trip(tmp_path):
+    sets = [{"a", "b", "c"}, {"c", "d"}, {"x", "y"}]
+    index = MinHashLSH(num_perm=64, bands=16).fit(["1", "2", "3"], sets)
+    path = str(tmp_path / "index.npz")
+
+    index.save(path)
+    loaded = MinHashLSH.load(path)
+
+    assert loaded.query({"a", "b", "c"}, top_n=3) == index.query({"a", "b", "c"}, top_n=3)
+
+
+@pytest.fixture
+def coaches(db):
+    rows = {
+        "uefa-pro": CoachProfile(profile=Profile(), certifications=["UEFA Pro"], preferred_formations=["4-3-3"]),
+        "uefa-a": CoachProfile(profile=Profile(), certifications=["UEFA A"], preferred_formations=["4-4-2"]),
+    }
+    db.add_all(rows.values())
+    db.flush()
+    set_index_store.invalidate("coach_credentials")
+    yield rows
+    set_index_store.invalidate("coach_credentials")
+
+
+def test_coaches_by_credentials(app, client, db, coaches):
+    app.dependency_overrides[get_db] = lambda: db
+
+    response = client.get("/api/coaches/credentials", params={
+        "certifications": ["uefa pro"], "formations": ["4-3-3"],
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body[0]["coach"]["id"] == str(coaches["uefa-pro"].id)
+    assert body[0]["score"] == 1.0
+    assert str(coaches["uefa-a"].id) not in [match["coach"]["id"] for match in body]
+
+
+def test_coaches_by_credentials_needs_a_token(app, client):
+    app.dependency_overrides[get_db] = lambda: None
+
+    assert client.get("/api/coaches/credentials").status_code == 400
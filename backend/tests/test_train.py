@@ -0,0 +1,71 @@
+
+import os
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.ml.ann_index import IVFIndex, matrix_digest
+from app.ml.artifacts import load_artifact
+from app.ml.model_loader import model_registry
+from app.ml.train import train_models
+from app.models.player import PlayerProfile
+
+
+@pytest.fixture
+def players(db):
+    rng = np.random.default_rng(0)
+    rows = [
+        PlayerProfile(
+            position="forward", age=int(rng.integers(16, 38)), height=float(rng.normal(180, 8)),
+            weight=float(rng.normal(75, 6)), market_value=int(rng.integers(10_000, 50_000_000)),
+            stats={"goals": int(rng.integers(0, 30)), "season": {"assists": int(rng.integers(0, 15))}},
+            skills=list(rng.choice(["dribbling", "passing", "heading"], size=int(rng.integers(0, 3)), replace=False)),
+        )
+        for _ in range(300)
+    ]
+    db.add_all(rows)
+    db.flush()
+    return rows
+
+
+def test_train_writes_scaled_similarity_vectors_and_ivf_index(db, players, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ANN_INDEX_PATH", str(tmp_path / "ivf.npz"))
+    monkeypatch.setattr(settings, "ANN_N_LISTS", 8)
+
+    result = train_models(db, str(tmp_path), batch_size=64, build_ivf=True, version="v1")
+
+    assert result["rows"] == 300
+    knn = load_artifact(str(tmp_path), 'knn')
+    similarity = load_artifact(str(tmp_path), 'similarity')
+    assert similarity["scaler"] is not None
+    np.testing.assert_allclose(similarity["scaler"].mean_, knn["scaler"].mean_)
+
+    # Similarity rows are the standardized KNN rows, L2-normalized
+    scaled = np.asarray(knn["vectors"])
+    np.testing.assert_allclose(np.abs(scaled.mean(axis=0)), 0, atol=1e-3)
+    norms = np.linalg.norm(scaled, axis=1, keepdims=True)
+    np.testing.assert_allclose(similarity["vectors"], scaled / np.where(norms > 0, norms, 1), atol=1e-5)
+
+    ivf = IVFIndex.load(settings.ANN_INDEX_PATH)
+    assert ivf.source == matrix_digest(knn["vectors"])
+    assert not [name for name in os.listdir(tmp_path / "knn") if name.startswith("ivf-")]
+
+
+def test_trained_similarity_model_scales_queries(db, players, tmp_path, monkeypatch):
+    train_models(db, str(tmp_path), batch_size=64, version="v1")
+    monkeypatch.setattr(settings, "MODEL_ARTIFACT_DIR", str(tmp_path))
+    model = model_registry._load_similarity_artifact()
+    player = players[7]
+    features = {
+        "height": player.height, "weight": player.weight, "age": player.age,
+        "market_value": player.market_value, "goals": player.stats["goals"],
+        "season.assists": player.stats["season"]["assists"],
+        **{f"skill.{skill}": 1.0 for skill in player.skills},
+    }
+
+    vector = model_registry._preprocess_features(features, 'similarity', model)
+    ids, scores = model['index'].search(vector, 1)
+
+    assert ids[0] == str(player.id)
+    assert scores[0] == pytest.approx(1.0, abs=1e-5)
@@ -0,0 +1,76 @@
+
+import asyncio
+
+import pytest
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.crud.user import user as user_crud
+from app.models.user import UserRole
+from app.schemas.user import UserCreate
+
+
+@pytest.fixture
+def run_in_async_db(pg_engine):
+    """Run `test(db)` with an AsyncSession whose work, commits included, is rolled back"""
+    url = make_url(pg_engine.url).set(drivername="postgresql+asyncpg")
+
+    def run(test):
+        async def main():
+            engine = create_async_engine(url)
+            try:
+                async with engine.connect() as connection:
+                    transaction = await connection.begin()
+                    db = AsyncSession(
+                        bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False
+                    )
+                    try:
+                        return await test(db)
+                    finally:
+                        await db.close()
+                        await transaction.rollback()
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+def test_create_and_authenticate(run_in_async_db):
+    async def test(db):
+        created = await user_crud.create(db, obj_in=UserCreate(
+            email="coach@example.com", password="s3cret-pass", full_name="A Coach", role=UserRole.COACH,
+        ))
+        return (
+            created,
+            await user_crud.authenticate(db, email="coach@example.com", password="s3cret-pass"),
+            await user_crud.authenticate(db, email="coach@example.com", password="wrong"),
+            await user_crud.get_by_email(db, email="nobody@example.com"),
+        )
+
+    created, authenticated, wrong_password, missing = run_in_async_db(test)
+
+    assert created.id is not None and created.hashed_password != "s3cret-pass"
+    assert authenticated.id == created.id
+    assert wrong_password is None
+    assert missing is None
+
+
+def test_update_rehashes_password(run_in_async_db):
+    async def test(db):
+        created = await user_crud.create(db, obj_in=UserCreate(
+            email="agent@example.com", password="first-pass", full_name="An Agent", role=UserRole.AGENT,
+        ))
+        await user_crud.update(db, db_obj=created, obj_in={"password": "second-pass", "full_name": "Renamed"})
+        return (
+            await user_crud.authenticate(db, email="agent@example.com", password="second-pass"),
+            await user_crud.authenticate(db, email="agent@example.com", password="first-pass"),
+            await user_crud.get_users_by_role(db, role=UserRole.AGENT),
+        )
+
+    authenticated, old_password, agents = run_in_async_db(test)
+
+    assert authenticated.full_name == "Renamed"
+    assert old_password is None
+    assert [agent.email for agent in agents] == ["agent@example.com"]
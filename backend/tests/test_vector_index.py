@@ -0,0 +1,136 @@
+
+import numpy as np
+import pytest
+
+from app.ml.vector_index import SimilarityIndex
+
+
+def random_index(rows=200, dims=8, storage='float32', seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = {f"u{i}": rng.standard_normal(dims) for i in range(rows)}
+    return SimilarityIndex.from_vectors(vectors, storage=storage), vectors
+
+
+def brute_force(vectors, query, top_n):
+    ids = list(vectors)
+    matrix = np.array([vectors[user_id] for user_id in ids], dtype=np.float64)
+    scores = (matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)) + 1) / 2
+    order = np.argsort(-scores)[:top_n]
+    return [ids[i] for i in order], scores[order]
+
+
+def test_search_matches_brute_force_cosine():
+    index, vectors = random_index()
+    query = np.random.default_rng(1).standard_normal(8)
+
+    ids, scores = index.search(query, 10)
+    expected_ids, expected_scores = brute_force(vectors, query, 10)
+
+    assert list(ids) == expected_ids
+    np.testing.assert_allclose(scores, expected_scores, atol=1e-5)
+
+
+def test_upsert_replaces_and_remove_hides_a_vector():
+    index, vectors = random_index()
+    query = np.random.default_rng(2).standard_normal(8)
+
+    index.upsert("u5", query * 3)
+    index.upsert("new", -query)
+    ids, scores = index.search(query, 1)
+    assert list(ids) == ["u5"]
+    assert scores[0] == pytest.approx(1.0, abs=1e-6)
+    assert len(index) == len(vectors) + 1
+
+    assert index.remove("u5")
+    assert not index.remove("u5")
+    ids, _ = index.search(query, len(vectors) + 1)
+    assert "u5" not in ids
+    assert ids[-1] == "new"
+    assert len(index) == len(vectors)
+
+
+def test_upsert_many_matches_single_upserts():
+    rng = np.random.default_rng(4)
+    batched, vectors = random_index()
+    single, _ = random_index()
+    ids = ["u1", "new", "u7", "u1", "zero"]
+    rows = rng.standard_normal((5, 8))
+    rows[4] = 0
+
+    batched.upsert_many(ids, rows)
+    for user_id, row in zip(ids, rows):
+        single.upsert(user_id, row)
+
+    assert len(batched) == len(single) == len(vectors) + 2
+    assert batched.pending_changes == 4
+    for query in rng.standard_normal((3, 8)):
+        expected_ids, expected_scores = single.search(query, len(single))
+        found_ids, found_scores = batched.search(query, len(batched))
+        np.testing.assert_allclose(found_scores, expected_scores, atol=1e-6)
+        assert set(found_ids[:10]) == set(expected_ids[:10])
+    # The last row of a repeated id wins
+    assert batched.search(rows[3], 1)[0][0] == "u1"
+
+
+def test_compaction_preserves_results_and_clears_changes():
+    index, vectors = random_index()
+    rng = np.random.default_rng(3)
+    for i in range(0, 40, 2):
+        index.upsert(f"u{i}", rng.standard_normal(8))
+    for i in range(1, 20, 2):
+        index.remove(f"u{i}")
+    index.upsert("extra", rng.standard_normal(8))
+    queries = rng.standard_normal((5, 8))
+
+    before = index.search_batch(queries, 15)
+    compacted = index.compacted()
+    after = compacted.search_batch(queries, 15)
+
+    assert compacted.pending_changes == 0
+    assert len(compacted) == len(index) == len(compacted.ids)
+    np.testing.assert_array_equal(before[0], after[0])
+    np.testing.assert_allclose(before[1], after[1], atol=1e-6)
+
+
+def test_zero_vectors_score_zero():
+    index = SimilarityIndex.from_vectors({"a": [1.0, 0.0], "zero": [0.0, 0.0]})
+
+    ids, scores = index.search(np.array([1.0, 0.0]), 2)
+    assert dict(zip(ids, scores)) == {"a": pytest.approx(1.0), "zero": 0.0}
+    _, scores = index.search(np.zeros(2), 2)
+    assert list(scores) == [0.0, 0.0]
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8"])
+def test_repeated_compaction_keeps_quantized_rows_unchanged(storage):
+    index, _ = random_index(storage=storage)
+    codes = index.matrix.codes.copy()
+
+    for round_ in range(5):
+        # Axis vectors stretch the per-dimension range the codes were fitted on
+        vector = np.zeros(8)
+        vector[round_] = (-1) ** round_
+        index.upsert(f"delta{round_}", vector)
+        index = index.compacted()
+
+    # Base rows are carried over code for code instead of drifting through
+    # dequantize/requantize cycles
+    np.testing.assert_array_equal(index.matrix.codes[:len(codes)], codes)
+    assert index.storage == storage
+    assert list(index.ids[-5:]) == [f"delta{i}" for i in range(5)]
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8"])
+def test_quantized_compaction_scores_like_before(storage):
+    index, _ = random_index(storage=storage)
+    rng = np.random.default_rng(5)
+    index.upsert("u3", rng.standard_normal(8))
+    index.remove("u4")
+    queries = rng.standard_normal((4, 8))
+
+    before_ids, before_scores = index.search_batch(queries, 10)
+    compacted = index.compacted()
+    after_ids, after_scores = compacted.search_batch(queries, 10)
+
+    assert "u4" not in set(after_ids.ravel())
+    np.testing.assert_allclose(before_scores, after_scores, atol=0.02)